@@ -0,0 +1,92 @@
+"""
+Archivos de modelos que se pueden compartir entre procesos (memory-mapped).
+
+Cada worker de gunicorn/uvicorn que carga un modelo con joblib o np.load tiene
+su propia copia en memoria. Aqui guardamos los arreglos en un .npz sin comprimir
+y alineado a 64 bytes, y al cargar no leemos los datos: los mapeamos de solo
+lectura con mmap. Asi todos los workers del servidor usan la misma copia fisica
+(la del cache de paginas del sistema operativo) y cargar tarda lo que tarda
+leer los encabezados.
+
+El archivo sigue siendo un .npz normal: np.load lo puede abrir igual.
+"""
+
+import io
+import mmap
+import struct
+import zipfile
+
+import numpy as np
+
+# Alineacion de los datos de cada arreglo dentro del archivo (igual que la de los .npy)
+ALINEACION = 64
+
+# Largo fijo del encabezado local de cada archivo dentro de un zip
+ENCABEZADO_ZIP = 30
+
+# Id del campo "extra" que usamos como relleno (los lectores de zip ignoran los ids desconocidos)
+ID_RELLENO = 0x6D6D
+
+
+# Funcion para guardar un diccionario de arreglos en un .npz que se puede mapear en memoria
+def guardar_npz(ruta, arreglos):
+    with zipfile.ZipFile(ruta, "w", compression=zipfile.ZIP_STORED, allowZip64=False) as zf:
+        for nombre, arreglo in arreglos.items():
+            contenido = io.BytesIO()
+            np.lib.format.write_array(contenido, np.asanyarray(arreglo), allow_pickle=False)
+
+            info = zipfile.ZipInfo(nombre + ".npy", date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_STORED
+
+            # Rellenamos el campo extra para que el .npy empiece en una posicion alineada;
+            # como el encabezado del .npy tambien mide un multiplo de 64, los datos quedan alineados
+            inicio = zf.fp.tell() + ENCABEZADO_ZIP + len(info.filename.encode("utf-8")) + 4
+            relleno = -inicio % ALINEACION
+            info.extra = struct.pack("<HH", ID_RELLENO, relleno) + b"\0" * relleno
+
+            zf.writestr(info, contenido.getvalue())
+
+
+# Funcion para leer la posicion donde empiezan los datos de cada archivo del zip
+def _posiciones(archivo, zf):
+    for info in zf.infolist():
+        archivo.seek(info.header_offset)
+        encabezado = archivo.read(ENCABEZADO_ZIP)
+        largo_nombre, largo_extra = struct.unpack("<HH", encabezado[26:30])
+        yield info, info.header_offset + ENCABEZADO_ZIP + largo_nombre + largo_extra
+
+
+# Funcion para cargar un .npz mapeando sus arreglos en memoria (solo lectura)
+# Devuelve un diccionario {nombre: arreglo}; los arreglos no se pueden modificar
+def cargar_npz(ruta):
+    arreglos = {}
+    with open(ruta, "rb") as archivo, zipfile.ZipFile(archivo) as zf:
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        for info, inicio in _posiciones(archivo, zf):
+            nombre = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+
+            # Un .npz comprimido (np.savez_compressed) no se puede mapear: se lee normal
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as contenido:
+                    arreglos[nombre] = np.lib.format.read_array(contenido, allow_pickle=False)
+                continue
+
+            archivo.seek(inicio)
+            version = np.lib.format.read_magic(archivo)
+            if version == (1, 0):
+                forma, fortran, dtype = np.lib.format.read_array_header_1_0(archivo)
+            else:
+                forma, fortran, dtype = np.lib.format.read_array_header_2_0(archivo)
+            if dtype.hasobject:
+                raise ValueError(f"El arreglo {nombre} tiene objetos de Python y no se puede mapear")
+
+            # Los escalares y textos cortos (ndim 0) se copian; lo demas queda mapeado
+            cantidad = int(np.prod(forma))
+            if not forma or cantidad == 0:
+                archivo.seek(inicio)
+                arreglos[nombre] = np.lib.format.read_array(archivo, allow_pickle=False)
+                continue
+
+            arreglo = np.frombuffer(mapa, dtype=dtype, count=cantidad, offset=archivo.tell())
+            arreglos[nombre] = arreglo.reshape(forma, order="F" if fortran else "C")
+    return arreglos
@@ -0,0 +1,186 @@
+"""
+Trabajo de CPU para las vistas async (ASGI), fuera del event loop.
+
+Con ASGI, una vista async que predice o busca una ruta directamente bloquea el
+event loop: mientras tanto el worker no atiende a nadie mas. Y una vista sync
+corre en un hilo que Django crea por peticion (sync_to_async), sin limite.
+Las vistas async usan ejecutar(), que:
+
+- Manda la funcion a un pool acotado: EJECUCION_HILOS hilos o, con en_proceso=True
+  y EJECUCION_PROCESOS > 0, un pool de procesos. Los procesos sirven para el
+  trabajo que retiene el GIL (TensorFlow, NumPy con arreglos chicos): con hilos
+  solo avanza uno a la vez.
+- Limita el trabajo en curso a EJECUCION_MAXIMO_CONCURRENTES por worker. Si no hay
+  lugar espera hasta EJECUCION_ESPERA_S y, si sigue lleno, lanza Saturado (503).
+- Corta la espera a los EJECUCION_TIMEOUT_S segundos con TiempoAgotado (504).
+  Un hilo o proceso no se puede interrumpir: la tarea sigue hasta terminar y
+  su lugar no se libera antes, asi el limite cuenta lo que de verdad esta corriendo.
+  La excepcion es predecir_async (sentimientos/modelo_sentimientos.py): el texto
+  espera en la cola del agrupador de lotes, no en el pool, y esa cola tiene su
+  propio limite (SENTIMIENTOS_LOTE_COLA_MAXIMA); al agotarse el tiempo libera el lugar.
+
+Asi un worker atiende muchos clientes a la vez: la espera no ocupa hilos y el
+trabajo de CPU tiene un techo. Las funciones que se mandan a un proceso deben
+poder serializarse con pickle (funciones de modulo, argumentos simples), y lo que
+midan en metricas.py queda en el proceso del pool, no en el /metrics del worker.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+
+
+class Saturado(Exception):
+    """No hay lugar para mas trabajo en este worker (responder 503)"""
+
+
+class TiempoAgotado(Exception):
+    """El trabajo no termino a tiempo (responder 504)"""
+
+
+def _configuracion(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+# Pools del proceso (se crean la primera vez que se usan)
+_hilos = None
+_procesos = None
+_pools_lock = threading.Lock()
+
+# Un semaforo por event loop (en un worker ASGI hay uno solo)
+_semaforos = weakref.WeakKeyDictionary()
+
+
+def _iniciar_proceso():
+    # Los procesos arrancan con "spawn" (sin los hilos del servidor): hay que configurar Django
+    import django
+    django.setup()
+
+
+def _pool_hilos():
+    global _hilos
+    if _hilos is None:
+        with _pools_lock:
+            if _hilos is None:
+                _hilos = ThreadPoolExecutor(max_workers=max(1, int(_configuracion("EJECUCION_HILOS", 4))),
+                                            thread_name_prefix="vistas-async")
+    return _hilos
+
+
+def _pool_procesos():
+    global _procesos
+    if _procesos is None:
+        with _pools_lock:
+            if _procesos is None:
+                import multiprocessing
+                # "spawn" y no "fork": el servidor ya tiene hilos (agrupador, cola de puntuacion)
+                _procesos = ProcessPoolExecutor(
+                    max_workers=int(_configuracion("EJECUCION_PROCESOS", 0)),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_iniciar_proceso,
+                )
+    return _procesos
+
+
+def _semaforo():
+    loop = asyncio.get_running_loop()
+    semaforo = _semaforos.get(loop)
+    if semaforo is None:
+        semaforo = _semaforos[loop] = asyncio.Semaphore(max(1, int(_configuracion("EJECUCION_MAXIMO_CONCURRENTES", 32))))
+    return semaforo
+
+
+# Funcion que corre en los hilos del pool: si la funcion uso la base, cierra la conexion
+# de ese hilo (Django solo las cierra en los hilos de sus peticiones)
+def _en_hilo(funcion):
+    from django.db import connections
+    try:
+        return funcion()
+    finally:
+        connections.close_all()
+
+
+async def reservar_lugar():
+    """
+    Reserva un lugar del limite de trabajo en curso y devuelve la funcion que lo libera
+    (llamarla de nuevo no hace nada)
+
+    Lanza Saturado si no se libera ninguno en EJECUCION_ESPERA_S segundos.
+    """
+    semaforo = _semaforo()
+    try:
+        await asyncio.wait_for(semaforo.acquire(), _configuracion("EJECUCION_ESPERA_S", 1))
+    except asyncio.TimeoutError:
+        raise Saturado("Demasiadas peticiones en curso, reintentar mas tarde") from None
+    loop = asyncio.get_running_loop()
+    una_vez = threading.Lock()
+
+    # Se puede liberar desde otro hilo (callback de un Future de concurrent.futures)
+    # y mas de una vez: solo la primera llamada devuelve el lugar
+    def liberar(*_):
+        if una_vez.acquire(blocking=False) and not loop.is_closed():
+            loop.call_soon_threadsafe(semaforo.release)
+    return liberar
+
+
+async def esperar(futuro, timeout=None):
+    """
+    Espera un Future (de concurrent.futures o de asyncio) hasta timeout segundos
+
+    Si se agota el tiempo lanza TiempoAgotado sin cancelar el Future.
+    """
+    if timeout is None:
+        timeout = _configuracion("EJECUCION_TIMEOUT_S", 30)
+    try:
+        # shield: al agotarse el tiempo no se cancela el trabajo (no se puede interrumpir)
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), timeout)
+    except asyncio.TimeoutError:
+        raise TiempoAgotado(f"El trabajo no termino en {timeout} segundos") from None
+
+
+async def ejecutar(funcion, *args, en_proceso=False, timeout=None, **kwargs):
+    """
+    Corre funcion(*args, **kwargs) en el pool y devuelve su resultado sin bloquear el event loop
+
+    Parametros:
+    - en_proceso: usar el pool de procesos si EJECUCION_PROCESOS > 0 (si no, hilos)
+    - timeout: segundos maximos de espera (por defecto EJECUCION_TIMEOUT_S)
+
+    Lanza Saturado si no hay lugar y TiempoAgotado si no termina a tiempo.
+    """
+    liberar = await reservar_lugar()
+    try:
+        if en_proceso and _configuracion("EJECUCION_PROCESOS", 0) > 0:
+            futuro = _pool_procesos().submit(funcion, *args, **kwargs)
+        else:
+            futuro = _pool_hilos().submit(_en_hilo, partial(funcion, *args, **kwargs))
+    except BaseException:
+        liberar()
+        raise
+    # El lugar se libera cuando el trabajo termina de verdad, aunque se agote el tiempo
+    futuro.add_done_callback(liberar)
+    return await esperar(futuro, timeout)
+
+
+def vista_async(vista):
+    """
+    Decorador para vistas async que usan ejecutar(): convierte Saturado en 503
+    (con Retry-After) y TiempoAgotado en 504, con el JSON de error de las APIs
+    """
+    from django.http import JsonResponse
+
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        try:
+            return await vista(request, *args, **kwargs)
+        except Saturado as error:
+            respuesta = JsonResponse({"ok": False, "error": str(error)}, status=503)
+            respuesta["Retry-After"] = str(max(1, int(_configuracion("EJECUCION_ESPERA_S", 1))))
+            return respuesta
+        except TiempoAgotado as error:
+            return JsonResponse({"ok": False, "error": str(error)}, status=504)
+    return envoltura
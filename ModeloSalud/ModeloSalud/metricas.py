@@ -0,0 +1,317 @@
+"""
+Metricas de rendimiento del servidor en el formato de texto de Prometheus (/metrics).
+
+Se miden:
+- Cada peticion: segundos por vista y metodo (histograma) y peticiones por codigo.
+- La base de datos en cada peticion: cuantas consultas hizo y cuanto tardaron.
+- Los modelos: cuanto tarda cargarlos (joblib.load, load_model, np.load) y predecir.
+- El A* de rutas: cuantos nodos expande cada busqueda.
+
+Las metricas viven en memoria, en cada proceso: con varios workers (gunicorn)
+cada scrape ve las del worker que lo atiende, asi que conviene sumarlas en
+Prometheus con sum() o rate() sin la etiqueta de la instancia.
+
+Con METRICAS_ACTIVAS = False el middleware no se instala, /metrics responde 404
+y cada medicion es una sola comparacion: no cuesta nada tenerlas en el codigo.
+
+Cada modulo declara sus metricas con histograma() o contador() (una vez, al
+importarse) y las actualiza con observar(), incrementar() o medir().
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.signals import setting_changed
+
+# Prefijo de todas las metricas
+PREFIJO = "modelosalud_"
+
+# Limites (segundos) de los histogramas de tiempo: de 1 ms a 30 s
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Limites de los histogramas de cantidades (consultas por peticion, nodos expandidos)
+LIMITES_CANTIDAD = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Metricas registradas: {nombre: metrica}
+REGISTRO = {}
+_registro_lock = threading.Lock()
+
+# Si se mide o no (se lee de settings la primera vez)
+_activas = None
+
+
+def activas():
+    global _activas
+    if _activas is None:
+        from django.conf import settings
+        _activas = bool(getattr(settings, "METRICAS_ACTIVAS", True))
+    return _activas
+
+
+# Funcion que escapa el valor de una etiqueta para el formato de texto
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquetas_texto(nombres, valores, extra=""):
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """
+    Valor que solo crece (por ejemplo, peticiones atendidas), uno por combinacion de etiquetas
+
+    Parametros:
+    - nombre: nombre de la metrica (sin el prefijo; termina en _total)
+    - ayuda: descripcion que se muestra en /metrics
+    - etiquetas: nombres de las etiquetas
+    """
+
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def incrementar(self, cantidad=1, *valores):
+        if not activas():
+            return
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            yield f"{self.nombre}{_etiquetas_texto(self.etiquetas, clave)} {_numero(valor)}"
+
+
+class Histograma:
+    """
+    Distribucion de valores (por ejemplo, segundos por peticion) en cubetas acumuladas
+
+    Parametros:
+    - nombre: nombre de la metrica (sin el prefijo)
+    - ayuda: descripcion que se muestra en /metrics
+    - etiquetas: nombres de las etiquetas
+    - limites: limites superiores de las cubetas, de menor a mayor
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._lock = threading.Lock()
+        # {valores de etiquetas: [conteo de cada cubeta (sin acumular) + la de +Inf, suma]}
+        self._series = {}
+
+    def observar(self, valor, *valores):
+        if not activas():
+            return
+        cubeta = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][cubeta] += 1
+            serie[1] += valor
+
+    def lineas(self):
+        with self._lock:
+            series = sorted((clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items())
+        for clave, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (float("inf"),), conteos):
+                acumulado += conteo
+                le = f'le="{_numero(float(limite))}"'
+                yield f"{self.nombre}_bucket{_etiquetas_texto(self.etiquetas, clave, le)} {acumulado}"
+            etiquetas = _etiquetas_texto(self.etiquetas, clave)
+            yield f"{self.nombre}_sum{etiquetas} {_numero(suma)}"
+            yield f"{self.nombre}_count{etiquetas} {acumulado}"
+
+
+def _registrar(clase, nombre, *args, **kwargs):
+    with _registro_lock:
+        metrica = REGISTRO.get(PREFIJO + nombre)
+        if metrica is None:
+            metrica = REGISTRO[PREFIJO + nombre] = clase(nombre, *args, **kwargs)
+        return metrica
+
+
+# Funciones para declarar metricas (si ya existe una con ese nombre se devuelve la misma)
+def contador(nombre, ayuda, etiquetas=()):
+    return _registrar(Contador, nombre, ayuda, etiquetas)
+
+
+def histograma(nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+    return _registrar(Histograma, nombre, ayuda, etiquetas, limites)
+
+
+# Mide los segundos que tarda el bloque "with" y los agrega al histograma
+@contextmanager
+def medir(metrica, *valores):
+    if not activas():
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrica.observar(time.perf_counter() - inicio, *valores)
+
+
+# Metricas de los modelos (las comparten sentimientos y prediccion)
+CARGA_MODELO = histograma(
+    "modelo_carga_segundos", "Segundos que tarda leer un modelo de disco", ("modelo",),
+)
+INFERENCIA_MODELO = histograma(
+    "modelo_inferencia_segundos", "Segundos por llamada de prediccion (un lote de filas)", ("modelo",),
+)
+FILAS_PREDICHAS = contador(
+    "modelo_filas_predichas_total", "Filas (comentarios, fechas) predichas por cada modelo", ("modelo",),
+)
+
+# Metricas de las peticiones (las actualiza MetricasMiddleware)
+PETICION_SEGUNDOS = histograma(
+    "peticion_segundos", "Segundos por peticion, por vista y metodo", ("vista", "metodo"),
+)
+PETICIONES = contador(
+    "peticiones_total", "Peticiones atendidas por vista, metodo y codigo de respuesta", ("vista", "metodo", "codigo"),
+)
+CONSULTAS_POR_PETICION = histograma(
+    "db_consultas_por_peticion", "Consultas a la base por peticion", ("vista",), LIMITES_CANTIDAD,
+)
+SEGUNDOS_DB_POR_PETICION = histograma(
+    "db_segundos_por_peticion", "Segundos de consultas a la base por peticion", ("vista",),
+)
+
+
+def texto_prometheus():
+    """
+    Devuelve todas las metricas en el formato de texto de Prometheus (version 0.0.4)
+    """
+    lineas = []
+    with _registro_lock:
+        metricas = sorted(REGISTRO.values(), key=lambda metrica: metrica.nombre)
+    for metrica in metricas:
+        lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+        lineas.extend(metrica.lineas())
+    return "\n".join(lineas) + "\n"
+
+
+class _ConsultasPeticion:
+    """
+    Envoltorio de connection.execute_wrapper: cuenta las consultas de una peticion y su tiempo
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+class MetricasMiddleware:
+    """
+    Mide cada peticion: segundos por vista, codigo de respuesta y consultas a la base
+
+    La vista se identifica por el nombre de su URL (las peticiones a URLs que no
+    existen van juntas en "sin_ruta"), asi las series no crecen con cada URL distinta.
+    Si METRICAS_ACTIVAS es False, Django no instala el middleware.
+
+    Funciona con WSGI y con ASGI: si fuera solo sync, Django pasaria cada vista async
+    por un hilo. Con ASGI no se cuentan las consultas, porque el contador es del hilo
+    y las consultas corren en los hilos de sync_to_async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+        from django.core.exceptions import MiddlewareNotUsed
+        if not activas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        from django.db import connection
+
+        if self.es_async:
+            return self.__acall__(request)
+
+        consultas = _ConsultasPeticion()
+        inicio = time.perf_counter()
+        codigo = 500
+        try:
+            with connection.execute_wrapper(consultas):
+                respuesta = self.get_response(request)
+            codigo = respuesta.status_code
+            return respuesta
+        finally:
+            self.registrar(request, time.perf_counter() - inicio, codigo, consultas)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        codigo = 500
+        try:
+            respuesta = await self.get_response(request)
+            codigo = respuesta.status_code
+            return respuesta
+        finally:
+            self.registrar(request, time.perf_counter() - inicio, codigo)
+
+    @staticmethod
+    def registrar(request, segundos, codigo, consultas=None):
+        coincidencia = getattr(request, "resolver_match", None)
+        vista = coincidencia.view_name if coincidencia else "sin_ruta"
+        PETICION_SEGUNDOS.observar(segundos, vista, request.method)
+        PETICIONES.incrementar(1, vista, request.method, str(codigo))
+        if consultas is not None:
+            CONSULTAS_POR_PETICION.observar(consultas.consultas, vista)
+            SEGUNDOS_DB_POR_PETICION.observar(consultas.segundos, vista)
+
+
+# Vista /metrics para que Prometheus lea las metricas
+def vista_metricas(request):
+    from django.http import Http404, HttpResponse
+    if not activas():
+        raise Http404("Metricas desactivadas")
+    return HttpResponse(texto_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _configuracion_cambiada(setting, **kwargs):
+    # Para override_settings en pruebas
+    global _activas
+    if setting == "METRICAS_ACTIVAS":
+        _activas = None
+
+
+setting_changed.connect(_configuracion_cambiada)
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que mida la peticion completa (ver ModeloSalud/metricas.py)
+    'ModeloSalud.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -146,3 +148,51 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, "modelos")
 os.makedirs(MODELS_DIR, exist_ok=True)
+
+# Agrupacion de predicciones de sentimiento (micro-batching)
+# Las peticiones que llegan dentro de SENTIMIENTOS_LOTE_ESPERA_MS se procesan juntas,
+# hasta SENTIMIENTOS_LOTE_MAXIMO comentarios por lote (1 = sin agrupar)
+SENTIMIENTOS_LOTE_MAXIMO = 64
+SENTIMIENTOS_LOTE_ESPERA_MS = 5
+# Segundos que una prediccion sincronica espera su lote antes de responder con error
+SENTIMIENTOS_LOTE_TIMEOUT_S = 30
+# Comentarios que pueden esperar en la cola del agrupador; con la cola llena se
+# responde 503 (vistas async) o un error (vista de prediccion)
+SENTIMIENTOS_LOTE_COLA_MAXIMA = 1024
+# Maximo de comentarios aceptados en una sola llamada al endpoint de lote
+SENTIMIENTOS_LOTE_API_MAXIMO = 10000
+
+# Motor de clasificacion de sentimientos: "mlp" (red neuronal de Keras), "numpy" (la misma
+# red servida sin TensorFlow), "lineal" (regresion logistica) o "hashing" (regresion
+# logistica que se entrena leyendo los comentarios en bloques, con memoria constante)
+# "numpy" e "int8" mapean sus pesos en memoria: todos los workers del servidor comparten una copia
+SENTIMIENTOS_MOTOR = 'mlp'
+
+# Comentarios por pagina en la busqueda
+SENTIMIENTOS_BUSQUEDA_POR_PAGINA = 50
+
+# Segundos maximos que se guardan en cache los contadores de la pagina principal
+# (se invalidan solos al guardar o borrar comentarios)
+SENTIMIENTOS_CONTADORES_SEGUNDOS = 300
+
+# API de ingesta en JSON Lines (kioscos): lineas que se insertan juntas, comentarios que
+# pueden esperar en la cola de puntuacion en segundo plano (y cuantos se puntuan juntos) y
+# segundos que una peticion espera lugar en la cola antes de responder 503
+SENTIMIENTOS_INGESTA_LOTE = 1000
+SENTIMIENTOS_COLA_PUNTUACION_MAXIMO = 50000
+SENTIMIENTOS_COLA_PUNTUACION_LOTE = 2000
+SENTIMIENTOS_INGESTA_ESPERA_S = 2
+
+# Metricas de rendimiento en /metrics (formato de Prometheus, ver ModeloSalud/metricas.py)
+# Con False no se mide nada y /metrics responde 404
+METRICAS_ACTIVAS = True
+
+# Vistas async (ASGI, ver ModeloSalud/ejecucion.py): hilos para la prediccion y la busqueda de
+# rutas, procesos para el trabajo que retiene el GIL (0 = todo en hilos; cada proceso carga
+# su propia copia de los modelos), trabajos en curso por worker, segundos que una peticion
+# espera lugar antes de responder 503 y segundos maximos de trabajo antes de responder 504
+EJECUCION_HILOS = 4
+EJECUCION_PROCESOS = 0
+EJECUCION_MAXIMO_CONCURRENTES = 32
+EJECUCION_ESPERA_S = 1
+EJECUCION_TIMEOUT_S = 30
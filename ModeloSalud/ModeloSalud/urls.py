@@ -18,15 +18,25 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
 from sentimientos import views
+from ModeloSalud import metricas
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metricas.vista_metricas, name='metricas'),
     path('', TemplateView.as_view(template_name='index.html'), name='index'),
     path('sentimientos/', views.home, name='sentimientos_home'),
     path('entrenar/', views.entrenar, name='entrenar'),
     path('predecir/', views.predecir, name='predecir'),
+    path('api/predecir-lote/', views.predecir_lote, name='predecir_lote'),
+    path('api/async/predecir/', views.predecir_async, name='predecir_async'),
+    path('api/async/predecir-lote/', views.predecir_lote_async, name='predecir_lote_async'),
     path('buscar/', views.buscar, name='buscar'),
     path('comentarios/', views.listar_comentarios, name='listar_comentarios'),
+    path('api/comentarios/', views.api_comentarios, name='api_comentarios'),
+    path('api/comentarios/exportar/', views.exportar_comentarios, name='exportar_comentarios'),
+    path('api/comentarios/ingesta/', views.ingesta_comentarios, name='ingesta_comentarios'),
+    path('api/tendencias/', views.api_tendencias, name='api_tendencias'),
+    path('api/frases/', views.api_frases, name='api_frases'),
     path('rutas/', include('rutas.urls')),
     path('prediccion/', include('prediccion.urls')),
 ]
@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento del proyecto.
+
+La suite completa (con JSON y comparacion con la linea base) se corre con
+python manage.py correr_benchmarks (ver suite.py).
+"""
@@ -0,0 +1,102 @@
+"""
+Benchmark del tiempo de arranque del proyecto.
+
+Mide cuanto tarda un proceso nuevo en hacer django.setup() y cargar todas las URLs
+(lo mismo que hace manage.py o un worker de gunicorn/uvicorn al iniciar), y revisa
+que ninguna libreria pesada (TensorFlow, matplotlib, etc.) se haya cargado en ese momento.
+
+Uso:
+    cd ModeloSalud
+    python benchmarks/arranque.py
+    python benchmarks/arranque.py --repeticiones 10 --limite 1.5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROYECTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modulos que NO deben cargarse al arrancar el servidor
+MODULOS_PESADOS = [
+    'tensorflow', 'keras', 'matplotlib', 'seaborn', 'nltk', 'sklearn', 'pandas',
+]
+
+# Codigo que corre cada proceso hijo: arranca Django, carga las URLs y reporta
+CODIGO_HIJO = """
+import json, os, sys, time
+inicio = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ModeloSalud.settings')
+import django
+django.setup()
+import ModeloSalud.urls
+duracion = time.perf_counter() - inicio
+pesados = [m for m in %r if m in sys.modules]
+print(json.dumps({'segundos': duracion, 'pesados': pesados}))
+""" % (MODULOS_PESADOS,)
+
+
+def medir_arranque():
+    """
+    Lanza un proceso nuevo de Python y devuelve su tiempo de arranque
+    """
+    salida = subprocess.run(
+        [sys.executable, '-c', CODIGO_HIJO],
+        cwd=PROYECTO_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir(rapido=False):
+    """
+    Mediciones para la suite (ver suite.py): mediana del arranque y modulos pesados cargados
+    """
+    from .comun import medicion
+
+    resultados = [medir_arranque() for _ in range(1 if rapido else 5)]
+    pesados = {modulo for resultado in resultados for modulo in resultado['pesados']}
+    return [
+        medicion('arranque.mediana_segundos', statistics.median(r['segundos'] for r in resultados), 's'),
+        medicion('arranque.modulos_pesados_cargados', len(pesados), 'modulos'),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el tiempo de arranque de Django + URLs')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--limite', type=float, default=None,
+                        help='Segundos maximos permitidos (mediana); si se supera, termina con error')
+    args = parser.parse_args()
+
+    tiempos = []
+    pesados = set()
+    for _ in range(args.repeticiones):
+        resultado = medir_arranque()
+        tiempos.append(resultado['segundos'])
+        pesados.update(resultado['pesados'])
+
+    resumen = {
+        'repeticiones': args.repeticiones,
+        'mediana_segundos': statistics.median(tiempos),
+        'min_segundos': min(tiempos),
+        'max_segundos': max(tiempos),
+        'modulos_pesados_cargados': sorted(pesados),
+    }
+    print(json.dumps(resumen, indent=2))
+
+    if pesados:
+        print(f'ERROR: se cargaron modulos pesados al arrancar: {", ".join(sorted(pesados))}', file=sys.stderr)
+        sys.exit(1)
+    if args.limite is not None and resumen['mediana_segundos'] > args.limite:
+        print(f'ERROR: el arranque tardo {resumen["mediana_segundos"]:.2f}s (limite {args.limite}s)', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Funciones comunes de los benchmarks de la suite (ver suite.py).
+
+Cada grupo de benchmarks devuelve una lista de mediciones: un diccionario con el
+nombre, el valor, la unidad y si es mejor que el valor sea "menor" (segundos,
+memoria) o "mayor" (filas por segundo, accuracy). Asi la comparacion con la
+linea base sabe en que direccion esta la regresion.
+"""
+
+import os
+import statistics
+import time
+
+PROYECTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medicion(nombre, valor, unidad, mejor='menor'):
+    return {'nombre': nombre, 'valor': float(valor), 'unidad': unidad, 'mejor': mejor}
+
+
+def cronometrar(funcion, minimo_segundos=0.2, maximo_repeticiones=1000):
+    """
+    Corre la funcion varias veces y devuelve la mediana de segundos por llamada
+
+    Repite hasta juntar minimo_segundos (o maximo_repeticiones llamadas): las
+    funciones rapidas se repiten mucho y las lentas una sola vez.
+    """
+    tiempos = []
+    total = 0.0
+    while total < minimo_segundos and len(tiempos) < maximo_repeticiones:
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        total += tiempos[-1]
+    return statistics.median(tiempos)
+
+
+class Omitido(Exception):
+    """
+    Un grupo de benchmarks no se puede correr aca (por ejemplo, no hay modelo entrenado)
+    """
@@ -0,0 +1,34 @@
+"""
+Benchmark de la prediccion de demanda: una fecha por llamada (predecir_demanda)
+contra todas las fechas juntas (predecir_demanda_lote). Usa el modelo publicado.
+"""
+
+import datetime
+
+from .comun import Omitido, cronometrar, medicion
+
+# Fechas que se predicen (un año)
+FECHAS = 365
+
+
+def medir(rapido=False):
+    from prediccion import modelo_prediccion
+
+    if not modelo_prediccion.predecir_demanda_lote([datetime.date.today()]):
+        raise Omitido('El modelo de demanda no esta entrenado.')
+
+    inicio = datetime.date.today()
+    fechas = [inicio + datetime.timedelta(days=dia) for dia in range(FECHAS)]
+    feriados = [dia % 15 == 0 for dia in range(FECHAS)]
+
+    def una_por_una():
+        for fecha, feriado in zip(fechas, feriados):
+            modelo_prediccion.predecir_demanda(fecha, feriado)
+
+    segundos_una = cronometrar(una_por_una)
+    segundos_lote = cronometrar(lambda: modelo_prediccion.predecir_demanda_lote(fechas, feriados))
+    return [
+        medicion('demanda.una_fecha.ms', segundos_una / FECHAS * 1000, 'ms'),
+        medicion(f'demanda.lote_{FECHAS}.fechas_por_segundo', FECHAS / segundos_lote, 'fechas/s', 'mayor'),
+        medicion(f'demanda.una_por_una_{FECHAS}.fechas_por_segundo', FECHAS / segundos_una, 'fechas/s', 'mayor'),
+    ]
@@ -0,0 +1,65 @@
+"""
+Benchmark del entrenamiento de sentimientos (modelo_sentimientos.ajustar_modelo)
+con distintas cantidades de comentarios de la base.
+
+Se usan los mismos comentarios que para entrenar de verdad (sin casi duplicados
+ni comentarios sin etiqueta, ver reentrenamiento.leer_comentarios), los primeros
+por id. ajustar_modelo no guarda nada: los modelos publicados no se tocan.
+Los motores que entrenan en flujo ("hashing") leen la base por su cuenta y no se miden aca.
+"""
+
+import time
+
+from .comun import Omitido, medicion
+
+TAMANOS = (1000, 10000, 50000)
+TAMANOS_RAPIDO = (1000, 5000)
+
+MOTORES = ('lineal',)
+
+
+def leer_corpus(cantidad):
+    from sentimientos import limpieza, reentrenamiento
+    from sentimientos.models import Comment
+
+    # El entrenamiento usa el texto limpio guardado en la base
+    limpieza.actualizar_textos_limpios()
+    ids = list(
+        Comment.objects.filter(duplicado_de=None, etiqueta__in=reentrenamiento.ETIQUETAS)
+        .order_by('pk').values_list('pk', flat=True)[:cantidad]
+    )
+    if not ids:
+        return None
+    return reentrenamiento.leer_comentarios(Comment.objects.filter(pk__lte=ids[-1]))
+
+
+def medir(rapido=False, motores=None):
+    from sentimientos import modelo_sentimientos
+
+    tamanos = TAMANOS_RAPIDO if rapido else TAMANOS
+    corpus = leer_corpus(max(tamanos))
+    if corpus is None:
+        raise Omitido('No hay comentarios etiquetados en la base.')
+
+    mediciones = []
+    for nombre in motores or MOTORES:
+        motor = modelo_sentimientos.obtener_motor(nombre)
+        # "numpy" e "int8" no entrenan (usan la red de "mlp")
+        if motor.en_flujo or hasattr(motor, 'motor_mlp'):
+            continue
+        for cantidad in tamanos:
+            # Sin comentarios suficientes no se inventan: se salta el tamaño
+            if cantidad > len(corpus):
+                continue
+            inicio = time.perf_counter()
+            ajuste = modelo_sentimientos.ajustar_modelo(corpus.head(cantidad), motor)
+            segundos = time.perf_counter() - inicio
+
+            y_pred = (ajuste['y_pred_prob'] > 0.5).astype(int)
+            prefijo = f'entrenamiento.{nombre}.n={cantidad}'
+            mediciones += [
+                medicion(f'{prefijo}.segundos', segundos, 's'),
+                medicion(f'{prefijo}.segundos_ajuste', ajuste['segundos_entrenamiento'], 's'),
+                medicion(f'{prefijo}.accuracy', float((y_pred == ajuste['y_test']).mean()), 'fraccion', 'mayor'),
+            ]
+    return mediciones
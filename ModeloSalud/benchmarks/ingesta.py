@@ -0,0 +1,61 @@
+"""
+Benchmark de la carga de comentarios desde CSV (sentimientos.ingesta.cargar_comentarios_csv),
+en filas por segundo.
+
+Se arma un CSV con los comentarios del proyecto repetidos (cada copia con un
+numero al final, para que no sean duplicados exactos) y se carga dentro de una
+transaccion que se deshace al terminar: la base queda como estaba.
+Se mide con y sin la busqueda de casi duplicados (MinHash, ver duplicados.py).
+"""
+
+import csv
+import os
+import tempfile
+
+from .comun import PROYECTO_DIR, medicion
+
+COMENTARIOS_CSV = os.path.join(PROYECTO_DIR, '..', 'Comentarios_de_pacientes.csv')
+
+FILAS = 50000
+FILAS_RAPIDO = 5000
+
+
+class _Deshacer(Exception):
+    pass
+
+
+def escribir_csv(ruta, filas):
+    with open(COMENTARIOS_CSV, encoding='utf-8', newline='') as archivo:
+        originales = list(csv.DictReader(archivo))
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(['fecha', 'texto', 'etiqueta'])
+        for i in range(filas):
+            original = originales[i % len(originales)]
+            escritor.writerow([original['fecha'], f"{original['texto']} #{i}", original['etiqueta']])
+
+
+def cargar_y_deshacer(ruta, casi_duplicados):
+    from django.db import transaction
+    from sentimientos import ingesta
+
+    try:
+        with transaction.atomic():
+            resultado = ingesta.cargar_comentarios_csv(ruta, casi_duplicados=casi_duplicados)
+            raise _Deshacer
+    except _Deshacer:
+        pass
+    return resultado
+
+
+def medir(rapido=False):
+    filas = FILAS_RAPIDO if rapido else FILAS
+    mediciones = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'comentarios.csv')
+        escribir_csv(ruta, filas)
+        for nombre, casi_duplicados in (('csv', False), ('csv_con_casi_duplicados', True)):
+            resultado = cargar_y_deshacer(ruta, casi_duplicados)
+            mediciones.append(medicion(f'ingesta.{nombre}.n={filas}.filas_por_segundo',
+                                       resultado['filas_por_segundo'], 'filas/s', 'mayor'))
+    return mediciones
@@ -0,0 +1,198 @@
+"""
+Benchmark comparativo de los motores de sentimiento ("mlp", "numpy" y "lineal").
+
+Para cada motor mide:
+- accuracy sobre el 20% de prueba
+- tiempo de entrenamiento
+- latencia de inferencia (un comentario y un lote)
+- memoria residente maxima del proceso al entrenar y al servir
+
+Cada medicion corre en un proceso nuevo, asi la memoria de un motor
+(por ejemplo TensorFlow) no contamina la del otro. Los modelos se guardan
+en una carpeta temporal: los modelos publicados del servidor no se tocan.
+
+Uso:
+    cd ModeloSalud
+    python benchmarks/motores_sentimiento.py
+    python benchmarks/motores_sentimiento.py --csv ../Comentarios_de_pacientes.csv --replicar 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROYECTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_POR_DEFECTO = os.path.join(PROYECTO_DIR, '..', 'Comentarios_de_pacientes.csv')
+
+
+def preparar_django():
+    sys.path.insert(0, PROYECTO_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ModeloSalud.settings')
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    import django
+    django.setup()
+
+
+def memoria_maxima_mb():
+    """
+    Memoria residente maxima del proceso actual, en MB
+    """
+    import resource
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux la entrega en KB y macOS en bytes
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+
+def cargar_corpus(csv_path, replicar):
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    if replicar > 1:
+        df = pd.concat([df] * replicar, ignore_index=True)
+    return df
+
+
+def fase_entrenar(motor_nombre, csv_path, replicar, carpeta):
+    """
+    Entrena el motor, guarda sus archivos en la carpeta temporal y reporta metricas
+    """
+    preparar_django()
+    from sentimientos import modelo_sentimientos
+
+    motor = modelo_sentimientos.obtener_motor(motor_nombre)
+    df = cargar_corpus(csv_path, replicar)
+    ajuste = modelo_sentimientos.ajustar_modelo(df, motor)
+
+    y_pred = (ajuste['y_pred_prob'] > 0.5).astype(int)
+    accuracy = float((y_pred == ajuste['y_test']).mean())
+
+    for ruta, guardar in motor.archivos(ajuste['modelo'], ajuste['vectorizador']):
+        guardar(os.path.join(carpeta, os.path.basename(ruta)))
+
+    return {
+        'comentarios': len(df),
+        'accuracy': accuracy,
+        'segundos_entrenamiento': ajuste['segundos_entrenamiento'],
+        'memoria_entrenar_mb': memoria_maxima_mb(),
+    }
+
+
+def fase_servir(motor_nombre, csv_path, carpeta, repeticiones):
+    """
+    Carga el motor como lo haria un worker web y mide la latencia de inferencia
+    """
+    import statistics
+    import time
+
+    preparar_django()
+    from sentimientos import modelo_sentimientos
+
+    motor = modelo_sentimientos.obtener_motor(motor_nombre)
+
+    inicio = time.perf_counter()
+    modelo = motor.cargar(os.path.join(carpeta, os.path.basename(motor.modelo_path)))
+    vectorizador = motor.cargar_vectorizador(os.path.join(carpeta, os.path.basename(motor.vectorizador_path)))
+    segundos_carga = time.perf_counter() - inicio
+
+    textos = cargar_corpus(csv_path, 1)['texto'].astype(str).tolist()
+
+    def inferir(lote):
+        X = vectorizador.transform([modelo_sentimientos.limpiar_texto(t) for t in lote])
+        return motor.probabilidades(modelo, X)
+
+    # Calentamiento (la primera llamada de Keras compila el grafo)
+    inferir(textos[:1])
+
+    individuales = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        inferir([textos[i % len(textos)]])
+        individuales.append(time.perf_counter() - inicio)
+
+    lote = (textos * (1000 // len(textos) + 1))[:1000]
+    inicio = time.perf_counter()
+    inferir(lote)
+    segundos_lote = time.perf_counter() - inicio
+
+    return {
+        'segundos_carga': segundos_carga,
+        'latencia_un_comentario_ms': statistics.median(individuales) * 1000,
+        'comentarios_por_segundo_lote_1000': len(lote) / segundos_lote,
+        'memoria_servir_mb': memoria_maxima_mb(),
+        'tensorflow_cargado': 'tensorflow' in sys.modules,
+    }
+
+
+def correr_fase(argumentos):
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__)] + argumentos,
+        cwd=PROYECTO_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def comparar_motores(motores, csv_path=CSV_POR_DEFECTO, replicar=1, repeticiones=200):
+    """
+    Entrena y sirve cada motor en procesos nuevos y devuelve {motor: resultados}
+    """
+    resultados = {}
+    for motor in motores:
+        with tempfile.TemporaryDirectory() as carpeta:
+            comunes = ['--motor', motor, '--csv', csv_path, '--carpeta', carpeta]
+            resultado = correr_fase(['--fase', 'entrenar', '--replicar', str(replicar)] + comunes)
+            resultado.update(correr_fase(['--fase', 'servir', '--repeticiones', str(repeticiones)] + comunes))
+        resultados[motor] = resultado
+    return resultados
+
+
+# Unidad de cada resultado y si es mejor que sea menor o mayor (para la suite, ver suite.py)
+UNIDADES = {
+    'accuracy': ('fraccion', 'mayor'),
+    'segundos_entrenamiento': ('s', 'menor'),
+    'memoria_entrenar_mb': ('MB', 'menor'),
+    'segundos_carga': ('s', 'menor'),
+    'latencia_un_comentario_ms': ('ms', 'menor'),
+    'comentarios_por_segundo_lote_1000': ('comentarios/s', 'mayor'),
+    'memoria_servir_mb': ('MB', 'menor'),
+}
+
+
+def medir(rapido=False, motores=None):
+    from .comun import medicion
+
+    resultados = comparar_motores(motores or ['mlp', 'numpy', 'lineal'], repeticiones=50 if rapido else 200)
+    return [
+        medicion(f'motores.{motor}.{clave}', valor, *UNIDADES[clave])
+        for motor, resultado in resultados.items()
+        for clave, valor in resultado.items() if clave in UNIDADES
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara los motores de sentimiento')
+    parser.add_argument('--motores', default='mlp,numpy,lineal')
+    parser.add_argument('--csv', default=CSV_POR_DEFECTO)
+    parser.add_argument('--replicar', type=int, default=1,
+                        help='Repite el corpus N veces para simular mas datos')
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--fase', choices=['entrenar', 'servir'], help=argparse.SUPPRESS)
+    parser.add_argument('--motor', help=argparse.SUPPRESS)
+    parser.add_argument('--carpeta', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Modo proceso hijo: corre una sola fase e imprime su resultado
+    if args.fase == 'entrenar':
+        print(json.dumps(fase_entrenar(args.motor, args.csv, args.replicar, args.carpeta)))
+        return
+    if args.fase == 'servir':
+        print(json.dumps(fase_servir(args.motor, args.csv, args.carpeta, args.repeticiones)))
+        return
+
+    resultados = comparar_motores(args.motores.split(','), args.csv, args.replicar, args.repeticiones)
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark del A* de rutas (rutas.algoritmo_busqueda.buscar_ruta_optima) en grafos sinteticos.
+
+- Grilla: lado x lado nodos con costo 1 entre vecinos; se busca de una esquina a la opuesta.
+- Aleatorio: puntos al azar unidos con sus vecinos mas cercanos; el costo de cada
+  arista es su largo por un factor entre 1 y 1.5 (la heuristica en linea recta
+  sigue siendo admisible). Se busca entre los dos puntos mas alejados que estan conectados.
+
+Los grafos no se arman como diccionarios (un millon de nodos serian millones de
+objetos): se guardan en arreglos de NumPy y cada nodo arma sus conexiones cuando
+el A* las pide.
+"""
+
+import math
+from collections.abc import Mapping
+
+import numpy as np
+
+from .comun import cronometrar, medicion
+
+TAMANOS = (10, 100, 1000, 10000, 100000, 1000000)
+TAMANOS_RAPIDO = (10, 100, 1000, 10000)
+
+# Vecinos mas cercanos de cada punto en el grafo aleatorio
+VECINOS = 4
+
+
+class _Coordenadas(Mapping):
+    """{nodo: {"x", "y"}} a partir de dos arreglos"""
+
+    def __init__(self, x, y):
+        self._x = np.asarray(x, dtype=np.float64).tolist()
+        self._y = np.asarray(y, dtype=np.float64).tolist()
+
+    def __getitem__(self, nodo):
+        return {'x': self._x[nodo], 'y': self._y[nodo]}
+
+    def __contains__(self, nodo):
+        return 0 <= nodo < len(self._x)
+
+    def __iter__(self):
+        return iter(range(len(self._x)))
+
+    def __len__(self):
+        return len(self._x)
+
+
+class _Conexiones(Mapping):
+    """{nodo: [{"destino", "costo"}]} a partir de un grafo CSR (indptr, destinos, costos)"""
+
+    def __init__(self, indptr, destinos, costos):
+        self._indptr = indptr
+        self._destinos = destinos.tolist()
+        self._costos = costos.tolist()
+
+    def __getitem__(self, nodo):
+        desde, hasta = self._indptr[nodo], self._indptr[nodo + 1]
+        return [{'destino': destino, 'costo': costo}
+                for destino, costo in zip(self._destinos[desde:hasta], self._costos[desde:hasta])]
+
+    def __contains__(self, nodo):
+        return 0 <= nodo < len(self._indptr) - 1
+
+    def __iter__(self):
+        return iter(range(len(self._indptr) - 1))
+
+    def __len__(self):
+        return len(self._indptr) - 1
+
+
+# Funcion que arma el grafo CSR de aristas no dirigidas (origenes, destinos, costos)
+def _csr(n, origenes, destinos, costos):
+    # Cada arista en los dos sentidos, ordenadas por nodo de origen
+    origenes, destinos = np.concatenate([origenes, destinos]), np.concatenate([destinos, origenes])
+    costos = np.concatenate([costos, costos])
+    orden = np.argsort(origenes, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(origenes, minlength=n))]).tolist()
+    return _Conexiones(indptr, destinos[orden], costos[orden])
+
+
+def grilla(n):
+    """
+    Devuelve (ubicaciones, conexiones, inicio, objetivo) de una grilla de unos n nodos
+    """
+    lado = max(2, round(math.sqrt(n)))
+    nodos = np.arange(lado * lado)
+    filas, columnas = np.divmod(nodos, lado)
+    derecha = nodos[columnas < lado - 1]
+    abajo = nodos[filas < lado - 1]
+    origenes = np.concatenate([derecha, abajo])
+    destinos = np.concatenate([derecha + 1, abajo + lado])
+    conexiones = _csr(lado * lado, origenes, destinos, np.ones(len(origenes)))
+    return _Coordenadas(columnas, filas), conexiones, 0, lado * lado - 1
+
+
+def aleatorio(n, semilla=42):
+    """
+    Devuelve (ubicaciones, conexiones, inicio, objetivo) de un grafo aleatorio de n nodos
+    """
+    import scipy.sparse as sp
+    from scipy.sparse.csgraph import connected_components
+    from scipy.spatial import cKDTree
+
+    rng = np.random.default_rng(semilla)
+    # Un punto por unidad de area, como la grilla
+    puntos = rng.random((n, 2)) * math.sqrt(n)
+    vecinos = min(VECINOS, n - 1)
+    _, indices = cKDTree(puntos).query(puntos, k=vecinos + 1)
+    origenes = np.repeat(np.arange(n), vecinos)
+    destinos = indices[:, 1:].ravel()
+
+    # Cada arista una sola vez (si a es vecino de b y b de a)
+    claves = np.unique(np.minimum(origenes, destinos).astype(np.int64) * n + np.maximum(origenes, destinos))
+    pares = np.stack(np.divmod(claves, n), axis=1)
+    largos = np.linalg.norm(puntos[pares[:, 0]] - puntos[pares[:, 1]], axis=1)
+    costos = largos * (1 + 0.5 * rng.random(len(pares)))
+
+    # Los extremos se eligen dentro de la componente conexa mas grande (siempre hay ruta)
+    adyacencia = sp.coo_matrix((np.ones(len(pares)), (pares[:, 0], pares[:, 1])), shape=(n, n))
+    _, componentes = connected_components(adyacencia, directed=False)
+    suma = puntos.sum(axis=1)
+    suma[componentes != np.bincount(componentes).argmax()] = np.nan
+
+    conexiones = _csr(n, pares[:, 0], pares[:, 1], costos)
+    return _Coordenadas(puntos[:, 0], puntos[:, 1]), conexiones, int(np.nanargmin(suma)), int(np.nanargmax(suma))
+
+
+def medir(rapido=False):
+    from rutas.algoritmo_busqueda import buscar_ruta_optima
+
+    mediciones = []
+    for nombre, armar in (('grilla', grilla), ('aleatorio', aleatorio)):
+        for n in TAMANOS_RAPIDO if rapido else TAMANOS:
+            ubicaciones, conexiones, inicio, objetivo = armar(n)
+            resultado = {}
+
+            def buscar():
+                resultado.update(buscar_ruta_optima(inicio, objetivo, ubicaciones, conexiones))
+
+            segundos = cronometrar(buscar)
+            prefijo = f'rutas.{nombre}.n={n}'
+            mediciones.append(medicion(f'{prefijo}.segundos', segundos, 's'))
+            # Cambia solo si cambia el algoritmo (mismo grafo y misma semilla)
+            mediciones.append(medicion(f'{prefijo}.nodos_expandidos', len(resultado['pasos']), 'nodos'))
+    return mediciones
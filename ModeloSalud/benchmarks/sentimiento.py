@@ -0,0 +1,124 @@
+"""
+Benchmark de modelo_sentimientos.predecir en frio y en caliente, con los modelos publicados.
+
+- Frio: un proceso nuevo arranca Django y predice un comentario. Se mide el
+  arranque y la primera prediccion (que carga el modelo, y TensorFlow en "mlp").
+- Caliente: en ese mismo proceso, la mediana de predecir() (pasa por el
+  agrupador de peticiones, ver lotes.py), de predecir_lote() con un comentario
+  y los comentarios por segundo en un lote de 1000.
+
+Cada motor se mide en su propio proceso, asi uno no le deja nada cargado al otro.
+Tambien se puede correr solo:
+
+    cd ModeloSalud
+    python benchmarks/sentimiento.py --motor numpy
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROYECTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXTOS = [
+    "Excelente atencion, el doctor fue muy amable",
+    "Pesimo servicio, espere mas de 3 horas",
+    "La enfermera me explico todo con paciencia",
+    "Nunca mas vuelvo, la comida estaba fria",
+]
+
+# Unidad de cada resultado de medir_motor y si es mejor que sea menor o mayor
+UNIDADES = {
+    'frio_arranque_segundos': ('s', 'menor'),
+    'frio_primera_prediccion_segundos': ('s', 'menor'),
+    'caliente_predecir_ms': ('ms', 'menor'),
+    'caliente_lote_1_ms': ('ms', 'menor'),
+    'caliente_lote_1000_comentarios_por_segundo': ('comentarios/s', 'mayor'),
+}
+
+
+def medir_motor(motor_nombre, repeticiones=50):
+    """
+    Mide un motor en este proceso (tiene que ser un proceso nuevo para medir en frio)
+    """
+    import statistics
+
+    inicio = time.perf_counter()
+    sys.path.insert(0, PROYECTO_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ModeloSalud.settings')
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    import django
+    django.setup()
+    from django.conf import settings
+    from sentimientos import modelo_sentimientos
+
+    settings.SENTIMIENTOS_MOTOR = motor_nombre
+    segundos_arranque = time.perf_counter() - inicio
+    if not modelo_sentimientos.modelo_disponible(motor_nombre):
+        return {'omitido': f'El motor "{motor_nombre}" no esta entrenado.'}
+
+    inicio = time.perf_counter()
+    modelo_sentimientos.predecir(TEXTOS[0])
+    segundos_primera = time.perf_counter() - inicio
+
+    def mediana_ms(funcion):
+        tiempos = []
+        for i in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion(TEXTOS[i % len(TEXTOS)])
+            tiempos.append(time.perf_counter() - inicio)
+        return statistics.median(tiempos) * 1000
+
+    lote = (TEXTOS * 250)[:1000]
+    inicio = time.perf_counter()
+    modelo_sentimientos.predecir_lote(lote, motor_nombre)
+    segundos_lote = time.perf_counter() - inicio
+
+    return {
+        'frio_arranque_segundos': segundos_arranque,
+        'frio_primera_prediccion_segundos': segundos_primera,
+        'caliente_predecir_ms': mediana_ms(modelo_sentimientos.predecir),
+        'caliente_lote_1_ms': mediana_ms(lambda texto: modelo_sentimientos.predecir_lote([texto], motor_nombre)),
+        'caliente_lote_1000_comentarios_por_segundo': len(lote) / segundos_lote,
+    }
+
+
+def medir(rapido=False, motores=None):
+    from django.conf import settings
+
+    from .comun import Omitido, medicion
+
+    if motores is None:
+        motores = [getattr(settings, 'SENTIMIENTOS_MOTOR', 'mlp')]
+    mediciones = []
+    omitidos = []
+    for motor in motores:
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--motor', motor],
+            cwd=PROYECTO_DIR, capture_output=True, text=True, check=True,
+        )
+        resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+        if 'omitido' in resultado:
+            omitidos.append(resultado['omitido'])
+            continue
+        for clave, valor in resultado.items():
+            unidad, mejor = UNIDADES[clave]
+            mediciones.append(medicion(f'sentimiento.{motor}.{clave}', valor, unidad, mejor))
+    if not mediciones:
+        raise Omitido(' '.join(omitidos))
+    return mediciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide predecir() en frio y en caliente')
+    parser.add_argument('--motor', default='mlp')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(medir_motor(args.motor, args.repeticiones)))
+
+
+if __name__ == '__main__':
+    main()
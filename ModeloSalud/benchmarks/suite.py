@@ -0,0 +1,141 @@
+"""
+Suite de benchmarks: corre los grupos elegidos, arma un resultado en JSON y lo
+compara con una linea base guardada (lo usa el comando correr_benchmarks).
+
+Grupos:
+- rutas: A* en grillas y grafos aleatorios de 10 a 10^6 nodos (rutas.py)
+- demanda: predecir_demanda de a una fecha contra el lote (demanda.py)
+- sentimiento: predecir() en frio y en caliente (sentimiento.py)
+- entrenamiento: ajustar_modelo con varios tamaños de corpus (entrenamiento.py)
+- ingesta: carga de comentarios desde CSV en filas por segundo (ingesta.py)
+- arranque: django.setup() + URLs en un proceso nuevo (arranque.py)
+- motores: comparacion completa de motores, entrena la red (motores_sentimiento.py)
+
+Una medicion es una regresion si empeora mas que la tolerancia (por ejemplo, 0.25
+= 25%) respecto de la linea base, en la direccion de su campo "mejor". Los numeros
+dependen de la maquina: la linea base se tiene que generar en la misma maquina
+(o el mismo tipo de runner de CI) con la que se compara.
+"""
+
+import datetime
+import json
+import os
+import platform
+
+from . import arranque, demanda, entrenamiento, ingesta, motores_sentimiento, rutas, sentimiento
+from .comun import PROYECTO_DIR, Omitido
+
+GRUPOS = {
+    'rutas': rutas.medir,
+    'demanda': demanda.medir,
+    'sentimiento': sentimiento.medir,
+    'entrenamiento': entrenamiento.medir,
+    'ingesta': ingesta.medir,
+    'arranque': arranque.medir,
+    'motores': motores_sentimiento.medir,
+}
+
+# Grupos que corren si no se eligen otros ("motores" entrena la red y tarda varios minutos)
+GRUPOS_POR_DEFECTO = ('rutas', 'demanda', 'sentimiento', 'entrenamiento', 'ingesta', 'arranque')
+
+# Grupos que aceptan una lista de motores de sentimiento
+GRUPOS_CON_MOTORES = ('sentimiento', 'entrenamiento', 'motores')
+
+LINEA_BASE_PATH = os.path.join(PROYECTO_DIR, 'benchmarks', 'linea_base.json')
+
+TOLERANCIA = 0.25
+
+
+def entorno():
+    from django.db import connection
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'base_de_datos': connection.vendor,
+    }
+
+
+def correr(grupos=GRUPOS_POR_DEFECTO, rapido=False, motores=None, informar=None):
+    """
+    Corre los grupos y devuelve el resultado: {"fecha", "rapido", "entorno", "mediciones", "omitidos"}
+
+    mediciones: {nombre: {"valor", "unidad", "mejor"}}
+    omitidos: {grupo: motivo} de los grupos que no se pudieron correr
+    informar: funcion opcional que recibe (grupo, mediciones del grupo)
+    """
+    mediciones = {}
+    omitidos = {}
+    for grupo in grupos:
+        extra = {'motores': motores} if motores and grupo in GRUPOS_CON_MOTORES else {}
+        try:
+            resultado = GRUPOS[grupo](rapido=rapido, **extra)
+        except Omitido as motivo:
+            omitidos[grupo] = str(motivo)
+            continue
+        for m in resultado:
+            mediciones[m['nombre']] = {'valor': m['valor'], 'unidad': m['unidad'], 'mejor': m['mejor']}
+        if informar is not None:
+            informar(grupo, resultado)
+
+    return {
+        'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'rapido': rapido,
+        'entorno': entorno(),
+        'mediciones': mediciones,
+        'omitidos': omitidos,
+    }
+
+
+def comparar(resultado, linea_base, tolerancia=TOLERANCIA):
+    """
+    Compara las mediciones con las de la linea base (solo las que estan en las dos)
+
+    Devuelve una lista de {"nombre", "base", "actual", "cambio", "estado"}, donde cambio
+    es actual / base - 1 (None si la base es 0) y estado es "regresion", "mejora" o "igual"
+    """
+    comparacion = []
+    base = linea_base.get('mediciones', {})
+    for nombre, actual in sorted(resultado['mediciones'].items()):
+        if nombre not in base:
+            continue
+        valor_base, valor = base[nombre]['valor'], actual['valor']
+        if valor_base:
+            cambio = valor / valor_base - 1
+            # Para "mayor" (filas por segundo) bajar es empeorar
+            empeora = -cambio if actual['mejor'] == 'mayor' else cambio
+        else:
+            # Con base 0 (por ejemplo, modulos pesados al arrancar) cualquier cambio supera la tolerancia
+            cambio = None
+            if valor == valor_base:
+                empeora = 0.0
+            else:
+                empeora = float('inf') if (valor > valor_base) == (actual['mejor'] == 'menor') else float('-inf')
+        if empeora > tolerancia:
+            estado = 'regresion'
+        elif empeora < -tolerancia:
+            estado = 'mejora'
+        else:
+            estado = 'igual'
+        comparacion.append({'nombre': nombre, 'base': valor_base, 'actual': valor,
+                            'cambio': cambio, 'estado': estado})
+    return comparacion
+
+
+def leer_linea_base(ruta=LINEA_BASE_PATH):
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return None
+
+
+def guardar_json(ruta, datos):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, indent=2, ensure_ascii=False, sort_keys=True)
+        archivo.write('\n')
+
+
+def guardar_linea_base(resultado, ruta=LINEA_BASE_PATH):
+    # La linea base se versiona en el repositorio: sin la comparacion de la corrida
+    guardar_json(ruta, {clave: valor for clave, valor in resultado.items() if clave != 'comparacion'})
@@ -0,0 +1,71 @@
+"""
+Carga masiva de la demanda historica desde un CSV
+(columnas fecha, dia_semana, mes, pacientes, es_feriado).
+
+Igual que la carga de comentarios: se lee de a bloques, las fechas repetidas se
+descartan en memoria y las que ya estan en la base las descarta la restriccion
+UNIQUE de fecha.
+"""
+
+import time
+
+from ModeloSalud.carga_masiva import insertar_sin_duplicados
+
+from .models import DemandaPacientes
+
+TAMANO_BLOQUE = 50000
+
+VALORES_VERDADEROS = ["true", "1", "yes", "si"]
+
+
+def cargar_demanda_csv(ruta, tamano_bloque=TAMANO_BLOQUE, usar_copy=True, informar=None):
+    """
+    Carga la demanda diaria de un CSV sin fechas repetidas
+
+    informar: funcion opcional que recibe (filas leidas, segundos) despues de cada bloque
+    """
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    leidas = invalidas = repetidas = insertadas = 0
+    vistas = set()
+
+    columnas = ["fecha", "dia_semana", "mes", "pacientes", "es_feriado"]
+    for bloque in pd.read_csv(ruta, usecols=columnas, dtype=str, chunksize=tamano_bloque):
+        leidas += len(bloque)
+
+        fechas = pd.to_datetime(bloque["fecha"], errors="coerce", format="%Y-%m-%d")
+        numeros = bloque[["dia_semana", "mes", "pacientes"]].apply(pd.to_numeric, errors="coerce")
+        es_feriado = bloque["es_feriado"].str.strip().str.lower().isin(VALORES_VERDADEROS)
+
+        validas = fechas.notna() & numeros.notna().all(axis=1)
+        invalidas += int((~validas).sum())
+
+        filas = []
+        for fecha, dia_semana, mes, pacientes, feriado in zip(
+            fechas[validas].dt.date, numeros["dia_semana"][validas], numeros["mes"][validas],
+            numeros["pacientes"][validas], es_feriado[validas],
+        ):
+            if fecha in vistas:
+                repetidas += 1
+                continue
+            vistas.add(fecha)
+            filas.append((fecha, int(dia_semana), int(mes), int(pacientes), bool(feriado)))
+
+        insertadas += insertar_sin_duplicados(
+            DemandaPacientes, columnas, filas, ["fecha"], usar_copy=usar_copy,
+        )
+        if informar is not None:
+            informar(leidas, time.perf_counter() - inicio)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "ok": True,
+        "leidas": leidas,
+        "insertadas": insertadas,
+        "repetidas_en_archivo": repetidas,
+        "invalidas": invalidas,
+        "total": DemandaPacientes.objects.count(),
+        "segundos": segundos,
+        "filas_por_segundo": leidas / segundos if segundos > 0 else 0.0,
+    }
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:25
+
+from django.db import migrations, models
+
+
+# Si quedaron dias repetidos (cargas antiguas), se deja solo el primero cargado de cada fecha
+def quitar_fechas_repetidas(apps, schema_editor):
+    DemandaPacientes = apps.get_model('prediccion', 'DemandaPacientes')
+    vistas = set()
+    repetidos = []
+    for pk, fecha in DemandaPacientes.objects.order_by('pk').values_list('pk', 'fecha').iterator():
+        if fecha in vistas:
+            repetidos.append(pk)
+        vistas.add(fecha)
+    DemandaPacientes.objects.filter(pk__in=repetidos).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediccion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_fechas_repetidas, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='demandapacientes',
+            name='fecha',
+            field=models.DateField(unique=True),
+        ),
+    ]
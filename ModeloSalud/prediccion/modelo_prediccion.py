@@ -3,10 +3,6 @@
 # Utilizamos regresion lineal porque es simple y funciona bien para este caso
 
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import os
 from datetime import datetime, timedelta
@@ -14,16 +10,71 @@ from django.conf import settings
 import base64
 from io import BytesIO
 
-# Para generar gráficos
-import matplotlib
-matplotlib.use('Agg')  # Backend sin interfaz gráfica
-import matplotlib.pyplot as plt
-import seaborn as sns
+from ModeloSalud import metricas
+from ModeloSalud.artefactos import cargar_npz, guardar_npz
+
+# scikit-learn y matplotlib se importan dentro de entrenar_modelo_prediccion
+# para que el servidor no los cargue al arrancar (este archivo lo importan las vistas)
 
 # Rutas donde guardamos los modelos entrenados
 MODELO_DIR = os.path.join(settings.BASE_DIR, 'modelos')
 MODELO_PATH = os.path.join(MODELO_DIR, 'prediccion_demanda.joblib')
 SCALER_PATH = os.path.join(MODELO_DIR, 'scaler_demanda.joblib')
+# Residuos del entrenamiento (real - predicho), los usa la simulacion Monte Carlo
+RESIDUOS_PATH = os.path.join(MODELO_DIR, 'residuos_demanda.joblib')
+# Coeficientes del modelo, del scaler y los residuos en un .npz que se mapea en memoria:
+# los workers del servidor lo leen sin cargar scikit-learn y comparten la misma copia
+PARAMETROS_PATH = os.path.join(MODELO_DIR, 'prediccion_demanda.npz')
+
+# Parametros ya cargados en este proceso: (identificador del archivo, arreglos mapeados)
+_parametros_cargados = None
+
+
+class RegresionCompartida:
+    """
+    Regresion lineal ya entrenada, leida del .npz mapeado en memoria
+    Predice igual que LinearRegression.predict
+    """
+
+    def __init__(self, coeficientes, intercepto):
+        self.coef_ = coeficientes
+        self.intercept_ = float(intercepto)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+class EscaladorCompartido:
+    """
+    StandardScaler ya ajustado, leido del .npz mapeado en memoria
+    Transforma igual que StandardScaler.transform
+    """
+
+    def __init__(self, media, escala):
+        self.mean_ = media
+        self.scale_ = escala
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def exportar_parametros(modelo, scaler, residuos, ruta=None):
+    """
+    Guarda los parametros del modelo y del scaler en el .npz compartido
+    Se escribe a un archivo temporal y se reemplaza de una vez, asi los workers
+    que tienen mapeado el archivo anterior lo siguen leyendo sin problemas
+    """
+    ruta = ruta or PARAMETROS_PATH
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    guardar_npz(temporal, {
+        'coeficientes': np.asarray(modelo.coef_, dtype=np.float64),
+        'intercepto': np.float64(modelo.intercept_),
+        'media': np.asarray(scaler.mean_, dtype=np.float64),
+        # StandardScaler deja scale_ en 1 para columnas sin variacion
+        'escala': np.asarray(scaler.scale_, dtype=np.float64),
+        'residuos': np.asarray(residuos, dtype=np.float64),
+    })
+    os.replace(temporal, ruta)
 
 
 def entrenar_modelo_prediccion(datos_historicos):
@@ -31,6 +82,15 @@ def entrenar_modelo_prediccion(datos_historicos):
     Esta funcion entrena el modelo con datos historicos del hospital
     Aprende los patrones de cuantos pacientes vienen segun el dia, mes, etc.
     """
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    # Para generar gráficos
+    import matplotlib
+    matplotlib.use('Agg')  # Backend sin interfaz gráfica
+    import matplotlib.pyplot as plt
     
     # Primero verificamos que tengamos suficientes datos para entrenar
     # Si tenemos muy pocos datos, el modelo no va a aprender bien
@@ -136,7 +196,13 @@ def entrenar_modelo_prediccion(datos_historicos):
     os.makedirs(MODELO_DIR, exist_ok=True)
     joblib.dump(modelo, MODELO_PATH)
     joblib.dump(scaler, SCALER_PATH)
-    
+
+    # Guardamos los errores del modelo en entrenamiento
+    # La simulacion los usa para generar escenarios de demanda realistas
+    residuos = y_train - modelo.predict(X_train)
+    joblib.dump(residuos.astype(np.float64), RESIDUOS_PATH)
+    exportar_parametros(modelo, scaler, residuos)
+
     # Retornamos los resultados del entrenamiento
     return {
         'ok': True,
@@ -157,14 +223,43 @@ def entrenar_modelo_prediccion(datos_historicos):
     }
 
 
+def cargar_parametros():
+    """
+    Lee el .npz compartido (mapeado en memoria) y lo guarda para este proceso
+    Se vuelve a leer solo si el archivo cambio (otro proceso re-entreno)
+    Si no existe, devuelve None
+    """
+    global _parametros_cargados
+    try:
+        estado = os.stat(PARAMETROS_PATH)
+    except FileNotFoundError:
+        return None
+    identificador = (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+    if _parametros_cargados is None or _parametros_cargados[0] != identificador:
+        with metricas.medir(metricas.CARGA_MODELO, "demanda"):
+            datos = cargar_npz(PARAMETROS_PATH)
+        _parametros_cargados = (identificador, datos)
+    return _parametros_cargados[1]
+
+
 def cargar_modelo_prediccion():
     """
     Carga el modelo que ya entrenamos anteriormente
     Si no existe, devuelve None
     """
+    datos = cargar_parametros()
+    if datos is not None:
+        return (
+            RegresionCompartida(datos['coeficientes'], datos['intercepto']),
+            EscaladorCompartido(datos['media'], datos['escala']),
+        )
+
+    # Modelos entrenados antes de que existiera el .npz
     if os.path.exists(MODELO_PATH) and os.path.exists(SCALER_PATH):
-        modelo = joblib.load(MODELO_PATH)
-        scaler = joblib.load(SCALER_PATH)
+        with metricas.medir(metricas.CARGA_MODELO, "demanda"):
+            modelo = joblib.load(MODELO_PATH)
+            scaler = joblib.load(SCALER_PATH)
         return modelo, scaler
     return None, None
 
@@ -174,47 +269,67 @@ def predecir_demanda(fecha, es_feriado=False):
     Esta es la funcion principal que predice cuantos pacientes vendran
     Le pasamos una fecha y nos dice cuantos pacientes esperar
     """
-    
-    # Intentamos cargar el modelo entrenado
-    modelo, scaler = cargar_modelo_prediccion()
-    
-    if modelo is None:
+    resultados = predecir_demanda_lote([fecha], [es_feriado])
+    if not resultados:
         return {
             'ok': False,
             'error': 'Primero hay que entrenar el modelo con datos historicos'
         }
+    return resultados[0]
+
+
+def predecir_demanda_lote(fechas, feriados=None):
+    """
+    Predice la demanda de muchas fechas de una vez (una sola llamada al modelo)
     
-    # Si la fecha viene como texto, la convertimos a formato de fecha
-    if isinstance(fecha, str):
-        fecha = datetime.strptime(fecha, '%Y-%m-%d')
+    Parametros:
+    - fechas: lista de fechas (datetime, date o texto 'AAAA-MM-DD')
+    - feriados: lista de booleanos, uno por fecha (por defecto ninguna es feriado)
+    
+    Retorna una lista con un resultado como el de predecir_demanda por fecha
+    (vacia si el modelo no esta entrenado)
+    """
+    
+    # Intentamos cargar el modelo entrenado
+    modelo, scaler = cargar_modelo_prediccion()
     
-    # Extraemos la informacion que necesitamos de la fecha
-    dia_semana = fecha.weekday()  # 0 = Lunes, 6 = Domingo
-    mes = fecha.month  # Numero del mes (1-12)
-    feriado = 1 if es_feriado else 0
+    if modelo is None or not fechas:
+        return []
+    if feriados is None:
+        feriados = [False] * len(fechas)
     
-    # Preparamos los datos igual que cuando entrenamos
-    X = np.array([[dia_semana, mes, feriado]])
-    X_normalizado = scaler.transform(X)
+    # Si la fecha viene como texto, la convertimos a formato de fecha
+    fechas = [datetime.strptime(fecha, '%Y-%m-%d') if isinstance(fecha, str) else fecha for fecha in fechas]
     
-    # Hacemos la prediccion!
-    prediccion = modelo.predict(X_normalizado)[0]
+    # Extraemos la informacion que necesitamos de cada fecha:
+    # dia de la semana (0 = Lunes, 6 = Domingo), mes (1-12) y si es feriado
+    X = np.array([[fecha.weekday(), fecha.month, 1 if feriado else 0]
+                  for fecha, feriado in zip(fechas, feriados)], dtype=np.float64).reshape(-1, 3)
     
-    # Redondeamos y nos aseguramos que no sea negativo
-    prediccion = max(0, round(prediccion))
+    with metricas.medir(metricas.INFERENCIA_MODELO, "demanda"):
+        # Preparamos los datos igual que cuando entrenamos
+        X_normalizado = scaler.transform(X)
+        
+        # Hacemos la prediccion de todas las fechas juntas
+        predicciones = modelo.predict(X_normalizado)
+    metricas.FILAS_PREDICHAS.incrementar(len(fechas), "demanda")
     
     # Lista con los nombres de los dias para mostrar mejor
     dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
     
-    # Devolvemos toda la informacion de la prediccion
-    return {
-        'ok': True,
-        'fecha': fecha.strftime('%Y-%m-%d'),
-        'dia_nombre': dias_semana[dia_semana],
-        'mes': mes,
-        'es_feriado': es_feriado,
-        'pacientes_predichos': int(prediccion)
-    }
+    # Devolvemos toda la informacion de cada prediccion
+    # (redondeada y sin valores negativos)
+    return [
+        {
+            'ok': True,
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'dia_nombre': dias_semana[fecha.weekday()],
+            'mes': fecha.month,
+            'es_feriado': feriado,
+            'pacientes_predichos': int(max(0, round(prediccion)))
+        }
+        for fecha, feriado, prediccion in zip(fechas, feriados, predicciones)
+    ]
 
 
 def generar_datos_ejemplo():
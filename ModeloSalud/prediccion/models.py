@@ -2,7 +2,7 @@ from django.db import models
 
 # Modelo para guardar historico de demanda
 class DemandaPacientes(models.Model):
-    fecha = models.DateField()
+    fecha = models.DateField(unique=True)
     dia_semana = models.IntegerField()  # 0=Lunes, 6=Domingo
     mes = models.IntegerField()
     pacientes = models.IntegerField()
@@ -0,0 +1,211 @@
+# Simulacion Monte Carlo de demanda y dotacion de personal
+# predecir_demanda solo entrega un numero redondeado, pero para decidir cuantos
+# medicos poner cada dia necesitamos saber que tan probable es que la demanda
+# supere la capacidad y cuanto se acumula la cola de espera.
+#
+# La idea es simple:
+# 1. El modelo de regresion da la demanda media de cada dia del mes
+# 2. A esa media le sumamos errores sacados de los residuos reales del modelo
+#    (bootstrap), generando miles de escenarios posibles por dia
+# 3. Con esos escenarios calculamos cobertura, cola y tiempo de espera
+#
+# Todo se calcula con matrices de NumPy (dias x escenarios), sin recorrer
+# escenario por escenario, asi un mes completo se simula en milisegundos.
+
+import calendar
+import os
+from datetime import date
+
+import joblib
+import numpy as np
+
+from . import modelo_prediccion
+
+# Cantidad de escenarios por dia si no se indica otra
+ESCENARIOS_POR_DEFECTO = 20000
+
+# Percentiles que se reportan para cada dia
+PERCENTILES = (5, 25, 50, 75, 95)
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def cargar_residuos(modelo, scaler):
+    """
+    Devuelve los residuos (real - predicho) del modelo de demanda
+    Si el modelo se entreno antes de que guardaramos los residuos,
+    los calculamos con los datos historicos de la base de datos
+    """
+    parametros = modelo_prediccion.cargar_parametros()
+    if parametros is not None:
+        return parametros['residuos']
+
+    if os.path.exists(modelo_prediccion.RESIDUOS_PATH):
+        return np.asarray(joblib.load(modelo_prediccion.RESIDUOS_PATH), dtype=np.float64)
+
+    from .models import DemandaPacientes
+
+    datos = np.array(
+        list(DemandaPacientes.objects.values_list('dia_semana', 'mes', 'es_feriado', 'pacientes')),
+        dtype=np.float64,
+    )
+    if len(datos) == 0:
+        return None
+
+    X = scaler.transform(datos[:, :3])
+    return datos[:, 3] - modelo.predict(X)
+
+
+def fechas_del_mes(anio, mes):
+    """
+    Lista con todas las fechas de un mes
+    """
+    _, total_dias = calendar.monthrange(anio, mes)
+    return [date(anio, mes, dia) for dia in range(1, total_dias + 1)]
+
+
+def _por_dia(valor, total_dias):
+    """
+    Acepta un numero o una lista con un valor por dia y devuelve un arreglo de largo total_dias
+    """
+    arreglo = np.asarray(valor, dtype=np.float64)
+    if arreglo.ndim == 0:
+        return np.full(total_dias, float(arreglo))
+    if arreglo.shape != (total_dias,):
+        raise ValueError(f'Se esperaban {total_dias} valores (uno por dia), llegaron {arreglo.size}')
+    return arreglo
+
+
+def simular_demanda(modelo, scaler, residuos, fechas, feriados=(), n_escenarios=ESCENARIOS_POR_DEFECTO, rng=None):
+    """
+    Genera la matriz de escenarios de demanda (dias x escenarios)
+    Cada valor es una cantidad entera de pacientes (nunca negativa)
+    """
+    rng = np.random.default_rng(rng)
+    feriados = set(feriados)
+
+    # Caracteristicas de todos los dias en una sola matriz
+    X = np.array(
+        [[f.weekday(), f.month, 1 if f in feriados else 0] for f in fechas],
+        dtype=np.float64,
+    )
+    medias = modelo.predict(scaler.transform(X))
+
+    # Bootstrap de los residuos: cada escenario toma un error real del modelo
+    errores = rng.choice(residuos, size=(len(fechas), n_escenarios), replace=True)
+    demanda = np.rint(medias[:, None] + errores)
+    np.maximum(demanda, 0, out=demanda)
+    return medias, demanda
+
+
+def simular_cola(demanda, capacidad):
+    """
+    Calcula los pacientes que quedan sin atender al final de cada dia
+
+    La cola sigue la recursion de Lindley: cola[d] = max(0, cola[d-1] + demanda[d] - capacidad[d]).
+    En vez de recorrer los dias usamos su forma cerrada con sumas acumuladas:
+    cola[d] = S[d] - min(0, min(S[0..d])), donde S es la suma acumulada de (demanda - capacidad).
+    """
+    exceso = demanda - capacidad[:, None]
+    acumulado = np.cumsum(exceso, axis=0)
+    minimo = np.minimum.accumulate(np.minimum(acumulado, 0), axis=0)
+    return acumulado - minimo
+
+
+def simular_mes(anio, mes, medicos, pacientes_por_medico=8, horas_jornada=8,
+                feriados=(), nivel_servicio=0.9, n_escenarios=ESCENARIOS_POR_DEFECTO, semilla=None):
+    """
+    Simula un mes completo de demanda y dotacion de personal
+
+    Parametros:
+    - anio, mes: mes a simular
+    - medicos: medicos de turno (un numero o una lista con un valor por dia)
+    - pacientes_por_medico: pacientes que atiende un medico en una jornada
+    - horas_jornada: duracion de la jornada en horas
+    - feriados: fechas del mes que son feriado
+    - nivel_servicio: probabilidad objetivo de cubrir toda la demanda del dia
+    - n_escenarios: escenarios simulados por dia
+    - semilla: semilla aleatoria para poder repetir la simulacion
+
+    Retorna un diccionario con bandas de percentiles por dia
+    """
+    modelo, scaler = modelo_prediccion.cargar_modelo_prediccion()
+    if modelo is None:
+        return {
+            'ok': False,
+            'error': 'Primero hay que entrenar el modelo con datos historicos'
+        }
+
+    residuos = cargar_residuos(modelo, scaler)
+    if residuos is None or len(residuos) == 0:
+        return {
+            'ok': False,
+            'error': 'No hay datos historicos para estimar la variabilidad de la demanda'
+        }
+
+    fechas = fechas_del_mes(anio, mes)
+    total_dias = len(fechas)
+
+    medicos = _por_dia(medicos, total_dias)
+    capacidad = medicos * pacientes_por_medico
+    atencion_por_hora = np.maximum(capacidad / horas_jornada, 1e-9)
+
+    medias, demanda = simular_demanda(modelo, scaler, residuos, fechas, feriados, n_escenarios, semilla)
+
+    # Cola al final de cada dia y la que venia del dia anterior
+    cola = simular_cola(demanda, capacidad)
+    cola_previa = np.vstack([np.zeros((1, n_escenarios)), cola[:-1]])
+
+    # Cobertura: fraccion de los pacientes del dia (incluida la cola previa) que se alcanzan a atender
+    por_atender = demanda + cola_previa
+    cobertura = np.minimum(1.0, capacidad[:, None] / np.maximum(por_atender, 1.0))
+
+    # Espera: horas extra que se necesitan para atender a los pacientes que quedaron en cola
+    espera_horas = cola / atencion_por_hora[:, None]
+
+    # Percentiles de todos los dias de una vez (eje 1 = escenarios)
+    bandas_demanda = np.percentile(demanda, PERCENTILES, axis=1)
+    bandas_cola = np.percentile(cola, PERCENTILES, axis=1)
+    bandas_espera = np.percentile(espera_horas, PERCENTILES, axis=1)
+    bandas_cobertura = np.percentile(cobertura, PERCENTILES, axis=1)
+    prob_saturacion = (por_atender > capacidad[:, None]).mean(axis=1)
+
+    # Medicos necesarios para cubrir la demanda del dia con el nivel de servicio pedido
+    demanda_objetivo = np.quantile(demanda, nivel_servicio, axis=1)
+    medicos_recomendados = np.ceil(demanda_objetivo / pacientes_por_medico).astype(int)
+
+    def bandas(matriz, d):
+        return {f'p{p}': float(matriz[i, d]) for i, p in enumerate(PERCENTILES)}
+
+    dias = []
+    feriados = set(feriados)
+    for d, fecha in enumerate(fechas):
+        dias.append({
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'dia_nombre': DIAS_SEMANA[fecha.weekday()],
+            'es_feriado': fecha in feriados,
+            'demanda_media': float(medias[d]),
+            'demanda': bandas(bandas_demanda, d),
+            'cola': bandas(bandas_cola, d),
+            'espera_horas': bandas(bandas_espera, d),
+            'cobertura': bandas(bandas_cobertura, d),
+            'prob_saturacion': float(prob_saturacion[d]),
+            'medicos': float(medicos[d]),
+            'medicos_recomendados': int(medicos_recomendados[d]),
+        })
+
+    return {
+        'ok': True,
+        'anio': anio,
+        'mes': mes,
+        'escenarios': n_escenarios,
+        'percentiles': list(PERCENTILES),
+        'nivel_servicio': nivel_servicio,
+        'dias': dias,
+        'resumen': {
+            'pacientes_mes_p50': float(np.median(demanda.sum(axis=0))),
+            'pacientes_mes_p95': float(np.percentile(demanda.sum(axis=0), 95)),
+            'dias_con_saturacion_esperados': float(prob_saturacion.sum()),
+            'cola_fin_de_mes_p95': float(np.percentile(cola[-1], 95)),
+        }
+    }
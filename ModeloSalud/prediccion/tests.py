@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import DemandaPacientes
+
+
+class SimulacionParametrosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Historico para estimar la variabilidad de la demanda (residuos del modelo)
+        inicio = date(2025, 1, 1)
+        for dia in range(60):
+            fecha = inicio + timedelta(days=dia)
+            DemandaPacientes.objects.create(fecha=fecha, dia_semana=fecha.weekday(), mes=fecha.month,
+                                            pacientes=40 + (dia * 7) % 15)
+
+    def pedir(self, nombre, **parametros):
+        return self.client.get(reverse(nombre), {"anio": 2026, "mes": 3, "escenarios": 200, **parametros})
+
+    def test_parametros_invalidos_responden_400(self):
+        invalidos = [
+            {"anio": 0},
+            {"anio": 10000},
+            {"mes": 13},
+            {"escenarios": 0},
+            {"medicos": -1},
+            {"medicos": "nan"},
+            {"pacientes_por_medico": 0},
+            {"pacientes_por_medico": -3},
+            {"pacientes_por_medico": "inf"},
+            {"feriados": "2026-02-30"},
+        ]
+        for nombre in ("simular_dotacion", "simular_dotacion_async"):
+            for parametros in invalidos:
+                with self.subTest(vista=nombre, **parametros):
+                    respuesta = self.pedir(nombre, **parametros)
+                    self.assertEqual(respuesta.status_code, 400)
+                    self.assertFalse(respuesta.json()["ok"])
+
+    def test_simulacion_valida(self):
+        respuesta = self.pedir("simular_dotacion", medicos=0, pacientes_por_medico=8)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()["ok"])
+
+
+class DemandaAsyncTests(TestCase):
+
+    def test_parametros_invalidos_responden_400(self):
+        invalidos = [
+            {"fecha": "2026-13-01"},
+            {"fecha": "9999-12-30", "dias": 7},
+            {"dias": 0},
+            {"dias": 367},
+            {"dias": "siete"},
+            {"feriados": "ayer"},
+        ]
+        for parametros in invalidos:
+            with self.subTest(**parametros):
+                respuesta = self.client.get(reverse("api_demanda_async"), parametros)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertFalse(respuesta.json()["ok"])
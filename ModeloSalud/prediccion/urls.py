@@ -7,4 +7,7 @@ urlpatterns = [
     path('entrenar/', views.entrenar_prediccion, name='entrenar_prediccion'),
     path('predecir/', views.hacer_prediccion, name='hacer_prediccion'),
     path('historico/', views.ver_historico, name='ver_historico'),
+    path('simular/', views.simular_dotacion, name='simular_dotacion'),
+    path('api/async/simular/', views.simular_dotacion_async, name='simular_dotacion_async'),
+    path('api/async/demanda/', views.api_demanda_async, name='api_demanda_async'),
 ]
@@ -1,9 +1,12 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.http import JsonResponse
+from ModeloSalud import ejecucion
 from .models import DemandaPacientes
 from . import modelo_prediccion
-import pandas as pd
+from . import simulacion
 from datetime import datetime, timedelta
+import math
 
 
 # Vista principal de prediccion de demanda
@@ -61,6 +64,7 @@ def entrenar_prediccion(request):
             return redirect('prediccion_home')
         
         # Convertir a DataFrame
+        import pandas as pd
         datos = list(registros.values('dia_semana', 'mes', 'es_feriado', 'pacientes'))
         df = pd.DataFrame(datos)
         
@@ -152,3 +156,93 @@ def ver_historico(request):
         'minimo': minimo,
     }
     return render(request, 'prediccion/historico.html', context)
+
+
+# Funcion que convierte 'AAAA-MM-DD,AAAA-MM-DD' en una lista de fechas (ValueError si alguna es invalida)
+def leer_fechas(texto):
+    return [datetime.strptime(f.strip(), '%Y-%m-%d').date() for f in texto.split(',') if f.strip()]
+
+
+# Funcion que lee los parametros GET de la simulacion de dotacion
+# Devuelve un diccionario con los argumentos de simulacion.simular_mes (None si son invalidos)
+def leer_parametros_simulacion(request):
+    hoy = datetime.now()
+    try:
+        anio = int(request.GET.get('anio', hoy.year))
+        mes = int(request.GET.get('mes', hoy.month))
+        medicos = float(request.GET.get('medicos', 4))
+        pacientes_por_medico = float(request.GET.get('pacientes_por_medico', 8))
+        escenarios = min(int(request.GET.get('escenarios', simulacion.ESCENARIOS_POR_DEFECTO)), 200000)
+        feriados = leer_fechas(request.GET.get('feriados', ''))
+    except ValueError:
+        return None
+
+    # anio 0 no existe para datetime y con 0 pacientes por medico no hay dotacion posible
+    if not 1 <= anio <= 9999 or not 1 <= mes <= 12 or escenarios < 1:
+        return None
+    if not (math.isfinite(medicos) and medicos >= 0):
+        return None
+    if not (math.isfinite(pacientes_por_medico) and pacientes_por_medico > 0):
+        return None
+    return {
+        'anio': anio,
+        'mes': mes,
+        'medicos': medicos,
+        'pacientes_por_medico': pacientes_por_medico,
+        'feriados': feriados,
+        'n_escenarios': escenarios,
+    }
+
+
+# Vista para simular la dotacion de personal de un mes (responde JSON)
+def simular_dotacion(request):
+    """
+    Simula miles de escenarios de demanda por dia y devuelve bandas de percentiles
+    Parametros GET: anio, mes, medicos, pacientes_por_medico, escenarios, feriados (YYYY-MM-DD separados por coma)
+    """
+    parametros = leer_parametros_simulacion(request)
+    if parametros is None:
+        return JsonResponse({'ok': False, 'error': 'Parametros invalidos'}, status=400)
+
+    resultado = simulacion.simular_mes(**parametros)
+    return JsonResponse(resultado, status=200 if resultado['ok'] else 400)
+
+
+# Version async (ASGI) de simular_dotacion: la simulacion corre en el pool de
+# ModeloSalud/ejecucion.py (en un proceso aparte si EJECUCION_PROCESOS > 0)
+# Responde 503 si hay demasiado trabajo en curso y 504 si no termina a tiempo
+@ejecucion.vista_async
+async def simular_dotacion_async(request):
+    parametros = leer_parametros_simulacion(request)
+    if parametros is None:
+        return JsonResponse({'ok': False, 'error': 'Parametros invalidos'}, status=400)
+
+    resultado = await ejecucion.ejecutar(simulacion.simular_mes, en_proceso=True, **parametros)
+    return JsonResponse(resultado, status=200 if resultado['ok'] else 400)
+
+
+# API async de prediccion de demanda (responde JSON)
+# Parametros GET: fecha (AAAA-MM-DD), dias (1 a 366, por defecto 7), feriados (AAAA-MM-DD separados por coma)
+# Todas las fechas se predicen en una sola llamada al modelo, en el pool de hilos
+@ejecucion.vista_async
+async def api_demanda_async(request):
+    try:
+        inicio = datetime.strptime(request.GET.get('fecha', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d')
+        dias = int(request.GET.get('dias', 7))
+        feriados = set(leer_fechas(request.GET.get('feriados', '')))
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'Parametros invalidos'}, status=400)
+    if not 1 <= dias <= 366:
+        return JsonResponse({'ok': False, 'error': 'dias debe estar entre 1 y 366'}, status=400)
+
+    try:
+        fechas = [inicio + timedelta(days=i) for i in range(dias)]
+    except OverflowError:
+        return JsonResponse({'ok': False, 'error': 'Las fechas no pueden pasar del anio 9999'}, status=400)
+    predicciones = await ejecucion.ejecutar(
+        modelo_prediccion.predecir_demanda_lote, fechas, [fecha.date() in feriados for fecha in fechas]
+    )
+    if not predicciones:
+        return JsonResponse({'ok': False, 'error': 'Primero hay que entrenar el modelo con datos historicos'},
+                            status=503)
+    return JsonResponse({'ok': True, 'predicciones': predicciones})
@@ -4,6 +4,14 @@
 import heapq
 import math
 
+from ModeloSalud import metricas
+
+# Nodos que expande cada busqueda y busquedas por resultado (ver ModeloSalud/metricas.py)
+NODOS_EXPANDIDOS = metricas.histograma(
+    "astar_nodos_expandidos", "Nodos que saca de la cola cada busqueda A*", ("resultado",),
+    metricas.LIMITES_CANTIDAD,
+)
+
 # Definir el grafo de ubicaciones (nodos) y sus conexiones (aristas)
 # Cada ubicacion tiene coordenadas X,Y para calcular la heuristica
 UBICACIONES = {
@@ -49,13 +57,15 @@ CONEXIONES = {
 
 # Funcion para calcular la heuristica (distancia estimada)
 # Usa distancia euclidiana entre dos puntos
-def calcular_heuristica(origen, destino):
+def calcular_heuristica(origen, destino, ubicaciones=None):
     """
     Calcula la distancia en linea recta entre dos ubicaciones
     Esto ayuda al algoritmo a priorizar caminos prometedores
     """
-    x1, y1 = UBICACIONES[origen]['x'], UBICACIONES[origen]['y']
-    x2, y2 = UBICACIONES[destino]['x'], UBICACIONES[destino]['y']
+    if ubicaciones is None:
+        ubicaciones = UBICACIONES
+    x1, y1 = ubicaciones[origen]['x'], ubicaciones[origen]['y']
+    x2, y2 = ubicaciones[destino]['x'], ubicaciones[destino]['y']
     
     # Formula de distancia euclidiana: raiz((x2-x1)^2 + (y2-y1)^2)
     distancia = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
@@ -63,7 +73,7 @@ def calcular_heuristica(origen, destino):
 
 
 # Algoritmo A* para buscar la ruta mas corta
-def buscar_ruta_optima(inicio, objetivo):
+def buscar_ruta_optima(inicio, objetivo, ubicaciones=None, conexiones=None):
     """
     Implementacion del algoritmo A* (A estrella)
     Encuentra el camino mas corto entre dos ubicaciones
@@ -71,6 +81,8 @@ def buscar_ruta_optima(inicio, objetivo):
     Parametros:
     - inicio: ubicacion de partida
     - objetivo: ubicacion de destino
+    - ubicaciones, conexiones: otro grafo con el mismo formato que UBICACIONES y
+      CONEXIONES (por defecto el de insumos; los benchmarks usan grafos sinteticos)
     
     Retorna:
     - camino: lista con las ubicaciones en orden
@@ -78,6 +90,11 @@ def buscar_ruta_optima(inicio, objetivo):
     - pasos: lista con detalles de cada paso del algoritmo
     """
     
+    if ubicaciones is None:
+        ubicaciones = UBICACIONES
+    if conexiones is None:
+        conexiones = CONEXIONES
+
     # Lista de pasos para mostrar como funciona el algoritmo
     pasos = []
     
@@ -106,7 +123,7 @@ def buscar_ruta_optima(inicio, objetivo):
             'paso': paso_numero,
             'nodo_explorado': nodo_actual,
             'costo_acumulado': costo_acumulado[nodo_actual],
-            'heuristica': calcular_heuristica(nodo_actual, objetivo),
+            'heuristica': calcular_heuristica(nodo_actual, objetivo, ubicaciones),
         })
         paso_numero += 1
         
@@ -118,6 +135,7 @@ def buscar_ruta_optima(inicio, objetivo):
                 nodo_actual = origen_nodo[nodo_actual]
             camino.reverse()
             
+            NODOS_EXPANDIDOS.observar(len(pasos), "exito")
             return {
                 'exito': True,
                 'camino': camino,
@@ -126,8 +144,8 @@ def buscar_ruta_optima(inicio, objetivo):
             }
         
         # Explorar vecinos del nodo actual
-        if nodo_actual in CONEXIONES:
-            for conexion in CONEXIONES[nodo_actual]:
+        if nodo_actual in conexiones:
+            for conexion in conexiones[nodo_actual]:
                 vecino = conexion['destino']
                 nuevo_costo = costo_acumulado[nodo_actual] + conexion['costo']
                 
@@ -135,11 +153,12 @@ def buscar_ruta_optima(inicio, objetivo):
                 if vecino not in costo_acumulado or nuevo_costo < costo_acumulado[vecino]:
                     costo_acumulado[vecino] = nuevo_costo
                     # f(n) = g(n) + h(n)
-                    prioridad = nuevo_costo + calcular_heuristica(vecino, objetivo)
+                    prioridad = nuevo_costo + calcular_heuristica(vecino, objetivo, ubicaciones)
                     heapq.heappush(cola_prioridad, (prioridad, vecino))
                     origen_nodo[vecino] = nodo_actual
     
     # Si no se encontro camino
+    NODOS_EXPANDIDOS.observar(len(pasos), "sin_ruta")
     return {
         'exito': False,
         'error': 'No se encontró una ruta entre las ubicaciones',
@@ -0,0 +1,23 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from . import algoritmo_busqueda
+
+
+class RutaAsyncTests(TestCase):
+
+    def pedir(self, **parametros):
+        return self.client.get(reverse("api_calcular_ruta_async"), parametros)
+
+    def test_ubicaciones_invalidas_responden_400(self):
+        for parametros in ({}, {"origen": "Hospital"}, {"origen": "Hospital", "destino": "Luna"}):
+            with self.subTest(**parametros):
+                respuesta = self.pedir(**parametros)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertFalse(respuesta.json()["ok"])
+
+    def test_calcula_la_ruta(self):
+        origen, destino = algoritmo_busqueda.obtener_ubicaciones()[:2]
+        respuesta = self.pedir(origen=origen, destino=destino)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), {"ok": True, **algoritmo_busqueda.buscar_ruta_optima(origen, destino)})
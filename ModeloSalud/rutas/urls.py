@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.home_rutas, name='rutas_home'),
     path('calcular/', views.calcular_ruta, name='calcular_ruta'),
+    path('api/async/calcular/', views.api_calcular_ruta_async, name='api_calcular_ruta_async'),
 ]
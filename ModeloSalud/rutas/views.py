@@ -1,4 +1,6 @@
+from django.http import JsonResponse
 from django.shortcuts import render
+from ModeloSalud import ejecucion
 from . import algoritmo_busqueda
 
 
@@ -78,3 +80,18 @@ def calcular_ruta(request):
     
     # Si no es POST, redirigir a la pagina principal
     return home_rutas(request)
+
+
+# API async (ASGI) para calcular la ruta optima (responde JSON)
+# Parametros GET: origen, destino. A* corre en el pool de ModeloSalud/ejecucion.py;
+# responde 503 si hay demasiado trabajo en curso y 504 si no termina a tiempo
+@ejecucion.vista_async
+async def api_calcular_ruta_async(request):
+    origen = request.GET.get('origen')
+    destino = request.GET.get('destino')
+    ubicaciones = algoritmo_busqueda.obtener_ubicaciones()
+    if origen not in ubicaciones or destino not in ubicaciones:
+        return JsonResponse({'ok': False, 'error': 'origen y destino deben ser ubicaciones conocidas'}, status=400)
+
+    resultado = await ejecucion.ejecutar(algoritmo_busqueda.buscar_ruta_optima, origen, destino)
+    return JsonResponse({'ok': resultado['exito'], **resultado})
@@ -3,8 +3,8 @@ from .models import Comment
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ('id', 'fecha', 'texto_corto', 'etiqueta')
-    list_filter = ('etiqueta', 'fecha')
+    list_display = ('id', 'fecha', 'texto_corto', 'etiqueta', 'etiqueta_predicha', 'confianza_predicha', 'duplicado_de')
+    list_filter = ('etiqueta', 'etiqueta_predicha', 'fecha')
     search_fields = ('texto',)
     date_hierarchy = 'fecha'
     
@@ -8,3 +8,11 @@ from django.apps import AppConfig
 class SentimientosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sentimientos'
+
+    def ready(self):
+        # Conecta las senales que mantienen al dia los contadores de la pagina principal
+        from . import contadores  # noqa: F401
+        # Y la que revisa si cada comentario nuevo es casi duplicado de otro
+        from . import duplicados  # noqa: F401
+        # Y las que mantienen el resumen de tendencias por dia, semana y mes
+        from . import tendencias  # noqa: F401
@@ -0,0 +1,285 @@
+"""
+Busqueda de comentarios por texto con indice.
+
+- PostgreSQL: columna tsvector generada (configuracion "spanish") con indice GIN
+  para buscar palabras (con raices: "demora" encuentra "demoras") y un indice de
+  trigramas sobre el texto para encontrar partes de palabras con ILIKE.
+  Los resultados se ordenan con ts_rank_cd. Ver migracion 0003.
+- Otras bases (SQLite en desarrollo): un indice invertido en memoria del proceso
+  (palabra -> ids de comentarios), que se completa con los comentarios nuevos en
+  cada busqueda. Todas las palabras buscadas deben aparecer (la ultima puede estar
+  incompleta, como al ir escribiendo) y se ordena por tf-idf.
+
+En los dos casos se devuelve una sola pagina de resultados: nunca se recorren ni
+se cuentan todos los comentarios que coinciden.
+
+La paginacion es por cursor (keyset): la pagina siguiente se pide con el ultimo
+comentario de la anterior, asi pedir la pagina 1000 cuesta lo mismo que la primera.
+Sin texto de busqueda el cursor es el id; con texto es (relevancia, id).
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment
+
+# Configuracion de PostgreSQL para separar palabras y sacar raices
+CONFIGURACION_PG = "spanish"
+
+# Palabras: letras y numeros (sin acentos despues de normalizar)
+PATRON_PALABRA = re.compile(r"\w+")
+
+# Codigo de cada etiqueta en el indice en memoria
+CODIGOS_ETIQUETA = {"positivo": 1, "negativo": 2}
+
+
+# Funcion para normalizar un texto: minusculas y sin acentos ("Atención" -> "atencion")
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(letra for letra in texto if not unicodedata.combining(letra))
+
+
+def palabras(texto):
+    return PATRON_PALABRA.findall(normalizar(texto))
+
+
+# Funcion para escapar los comodines de LIKE en lo que escribio el usuario
+def escapar_like(texto):
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Funciones para pasar el cursor de paginacion a texto (para la URL) y de vuelta
+def cursor_a_texto(cursor):
+    if cursor is None:
+        return None
+    if isinstance(cursor, tuple):
+        rango, pk = cursor
+        return f"{rango!r}_{pk}"
+    return str(cursor)
+
+
+def texto_a_cursor(texto, con_rango):
+    """
+    Devuelve el cursor o None si el texto no es valido
+    """
+    try:
+        if con_rango:
+            rango, pk = texto.split("_")
+            return float(rango), int(pk)
+        return int(texto)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _buscar_postgres(query, filtro, despues, cantidad):
+    coincide = RawSQL(
+        f"(busqueda @@ websearch_to_tsquery('{CONFIGURACION_PG}', %s) OR texto ILIKE %s)",
+        [query, f"%{escapar_like(query)}%"],
+        output_field=BooleanField(),
+    )
+    # ts_rank_cd devuelve real: se pasa a float8 para que el cursor (un float de Python)
+    # se compare con el mismo valor y los empates en el borde de la pagina no se salteen
+    rango = RawSQL(
+        f"ts_rank_cd(busqueda, websearch_to_tsquery('{CONFIGURACION_PG}', %s))::float8",
+        [query],
+        output_field=FloatField(),
+    )
+    comentarios = Comment.objects.filter(coincide).annotate(rango=rango)
+    if filtro:
+        comentarios = comentarios.filter(etiqueta=filtro)
+    if despues is not None:
+        rango_anterior, id_anterior = despues
+        comentarios = comentarios.filter(Q(rango__lt=rango_anterior) | Q(rango=rango_anterior, id__lt=id_anterior))
+    return list(comentarios.order_by("-rango", "-id")[:cantidad])
+
+
+class IndiceInvertido:
+    """
+    Indice invertido en memoria: para cada palabra, los ids de los comentarios donde aparece
+
+    Se construye la primera vez que se busca y despues solo agrega los comentarios
+    con id mayor al ultimo indexado. Si se edita o borra un comentario (senales de
+    Django) se reconstruye en la siguiente busqueda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vaciar()
+
+    def invalidar(self):
+        """Descarta el indice; se vuelve a construir en la siguiente busqueda"""
+        with self._lock:
+            self._vaciar()
+
+    def _vaciar(self):
+        self.postings = {}  # palabra -> array de ids (un id por cada vez que aparece)
+        self.etiquetas = array("b")  # codigo de etiqueta por id
+        self.ultimo_id = 0
+        self.total = 0
+        self._ordenadas = None  # palabras ordenadas, para buscar por prefijo
+
+    def actualizar(self, tamano_bloque=5000):
+        with self._lock:
+            while True:
+                bloque = list(
+                    Comment.objects.filter(pk__gt=self.ultimo_id).order_by("pk")
+                    .values_list("pk", "texto", "etiqueta")[:tamano_bloque]
+                )
+                if not bloque:
+                    return
+                for pk, texto, etiqueta in bloque:
+                    for palabra in palabras(texto):
+                        ids = self.postings.get(palabra)
+                        if ids is None:
+                            ids = self.postings[palabra] = array("q")
+                            self._ordenadas = None
+                        ids.append(pk)
+                    if pk >= len(self.etiquetas):
+                        self.etiquetas.extend(bytes(pk + 1 - len(self.etiquetas)))
+                    self.etiquetas[pk] = CODIGOS_ETIQUETA.get(etiqueta, 0)
+                self.ultimo_id = bloque[-1][0]
+                self.total += len(bloque)
+
+    def _con_prefijo(self, prefijo):
+        if self._ordenadas is None:
+            self._ordenadas = sorted(self.postings)
+        ordenadas = self._ordenadas
+        inicio = bisect_left(ordenadas, prefijo)
+        fin = inicio
+        while fin < len(ordenadas) and ordenadas[fin].startswith(prefijo):
+            fin += 1
+        return ordenadas[inicio:fin]
+
+    def _puntajes(self, palabras_encontradas):
+        # tf-idf de una palabra buscada (sumando todas las palabras que la completan)
+        ids = np.concatenate([np.frombuffer(self.postings[p], dtype=np.int64) for p in palabras_encontradas])
+        unicos, repeticiones = np.unique(ids, return_counts=True)
+        idf = math.log(1 + self.total / len(unicos))
+        return unicos, (1 + np.log(repeticiones)) * idf
+
+    def buscar(self, query, filtro, despues, cantidad):
+        """
+        Devuelve [(id, relevancia)] de la pagina pedida, del mas al menos relevante
+        """
+        terminos = palabras(query)
+        if not terminos:
+            return []
+
+        ids = puntajes = None
+        with self._lock:
+            for posicion, termino in enumerate(terminos):
+                # La ultima palabra puede estar a medio escribir: se busca como prefijo
+                if posicion == len(terminos) - 1:
+                    encontradas = self._con_prefijo(termino)
+                else:
+                    encontradas = [termino] if termino in self.postings else []
+                if not encontradas:
+                    return []
+
+                nuevos_ids, nuevos_puntajes = self._puntajes(encontradas)
+                if ids is None:
+                    ids, puntajes = nuevos_ids, nuevos_puntajes
+                else:
+                    # Todas las palabras deben aparecer (interseccion de ids ordenados)
+                    comunes, en_actual, en_nuevos = np.intersect1d(ids, nuevos_ids, assume_unique=True,
+                                                                  return_indices=True)
+                    ids, puntajes = comunes, puntajes[en_actual] + nuevos_puntajes[en_nuevos]
+                if len(ids) == 0:
+                    return []
+
+            if filtro:
+                seleccion = np.frombuffer(self.etiquetas, dtype=np.int8)[ids] == CODIGOS_ETIQUETA[filtro]
+                ids, puntajes = ids[seleccion], puntajes[seleccion]
+
+        # Solo los que van despues del cursor
+        if despues is not None:
+            rango_anterior, id_anterior = despues
+            seleccion = (puntajes < rango_anterior) | ((puntajes == rango_anterior) & (ids < id_anterior))
+            ids, puntajes = ids[seleccion], puntajes[seleccion]
+
+        # Mas puntaje primero y, si empatan, el mas nuevo
+        orden = np.lexsort((-ids, -puntajes))[:cantidad]
+        return list(zip(ids[orden].tolist(), puntajes[orden].tolist()))
+
+
+# Un indice por proceso (solo se usa si la base no es PostgreSQL)
+indice = IndiceInvertido()
+
+
+@receiver(post_save, sender=Comment)
+def _comentario_guardado(sender, instance, created, **kwargs):
+    # Los comentarios nuevos se agregan solos en la siguiente busqueda
+    if not created:
+        indice.invalidar()
+
+
+@receiver(post_delete, sender=Comment)
+def _comentario_borrado(sender, instance, **kwargs):
+    indice.invalidar()
+
+
+def buscar_comentarios(query, filtro="", despues=None, cantidad=50):
+    """
+    Busca comentarios que contienen las palabras de query, ordenados por relevancia
+
+    Parametros:
+    - query: texto escrito por el usuario
+    - filtro: "positivo", "negativo" o "" (todos)
+    - despues: cursor (relevancia, id) del ultimo comentario de la pagina anterior
+    - cantidad: comentarios por pagina
+
+    Devuelve una lista de Comment, cada uno con su relevancia en el atributo rango
+    """
+    if connection.vendor == "postgresql":
+        return _buscar_postgres(query, filtro, despues, cantidad)
+
+    indice.actualizar()
+    pagina = indice.buscar(query, filtro, despues, cantidad)
+
+    # Se leen de la base solo los comentarios de la pagina (los borrados no vuelven)
+    encontrados = Comment.objects.in_bulk([pk for pk, _ in pagina])
+    comentarios = []
+    for pk, rango in pagina:
+        if pk in encontrados:
+            encontrados[pk].rango = rango
+            comentarios.append(encontrados[pk])
+    return comentarios
+
+
+def pagina_comentarios(query="", filtro="", despues=None, cantidad=50):
+    """
+    Una pagina de comentarios: los que coinciden con query (por relevancia) o,
+    sin query, todos del mas nuevo al mas viejo
+
+    despues es el cursor en texto que devolvio la pagina anterior.
+    Devuelve (comentarios, cursor de la pagina siguiente o None)
+    """
+    cursor = texto_a_cursor(despues, con_rango=bool(query)) if despues else None
+
+    # Pedimos un comentario de mas para saber si hay pagina siguiente sin contar todos
+    if query:
+        comentarios = buscar_comentarios(query, filtro, cursor, cantidad + 1)
+    else:
+        consulta = Comment.objects.all()
+        if filtro:
+            consulta = consulta.filter(etiqueta=filtro)
+        if cursor is not None:
+            consulta = consulta.filter(id__lt=cursor)
+        comentarios = list(consulta.order_by("-id")[:cantidad + 1])
+
+    if len(comentarios) <= cantidad:
+        return comentarios, None
+    ultimo = comentarios[cantidad - 1]
+    siguiente = (ultimo.rango, ultimo.pk) if query else ultimo.pk
+    return comentarios[:cantidad], cursor_a_texto(siguiente)
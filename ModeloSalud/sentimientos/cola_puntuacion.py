@@ -0,0 +1,137 @@
+"""
+Cola de puntuacion en segundo plano para los comentarios que llegan por la API de ingesta.
+
+La vista de ingesta inserta los comentarios y pasa (id, texto) de los nuevos a esta
+cola. Un hilo de fondo los junta en lotes, predice su sentimiento con el modelo
+publicado y guarda la prediccion (igual que puntuar_comentarios). Asi la peticion
+no espera al modelo.
+
+La cola tiene un limite de comentarios pendientes. Si el hilo no da abasto y se
+llena, encolar() espera un poco a que se libere lugar y, si sigue llena, devuelve
+False: la vista deja de leer y responde 503 para que el cliente reintente despues
+(contrapresion). Asi la memoria no crece sin limite.
+
+Los comentarios que quedan en la cola si el proceso termina no se pierden: siguen
+sin prediccion y los puntua el comando puntuar_comentarios.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from . import modelo_sentimientos, puntuacion
+
+
+class ColaPuntuacion:
+    """
+    Puntua en un hilo de fondo los comentarios encolados
+
+    Parametros:
+    - maximo: comentarios pendientes a partir de los que encolar() espera o rechaza
+    - lote_maximo: comentarios que se predicen y guardan juntos
+    - motor: nombre del motor (por defecto el de settings)
+    """
+
+    def __init__(self, maximo=50000, lote_maximo=2000, motor=None):
+        self.maximo = max(1, int(maximo))
+        self.lote_maximo = max(1, int(lote_maximo))
+        self.motor = motor
+        self._condicion = threading.Condition()
+        self._filas = deque()
+        self._hilo = None
+        self._pid = None
+        self.puntuados = 0
+        self.ultimo_error = None
+
+    def _asegurar_hilo(self):
+        # Despues de un fork (gunicorn --preload) el hilo no existe en el proceso hijo,
+        # asi que se crea uno nuevo por proceso (con la cola vacia)
+        if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+            if self._pid != os.getpid():
+                self._filas = deque()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name="puntuacion-sentimientos", daemon=True)
+            self._hilo.start()
+
+    @property
+    def pendientes(self):
+        return len(self._filas)
+
+    def encolar(self, filas, timeout=0.0):
+        """
+        Agrega comentarios [(id, texto)] a la cola
+
+        Si no hay lugar espera hasta timeout segundos. Devuelve False si la cola
+        sigue llena (no se encola nada). Un grupo mas grande que el maximo entra
+        cuando la cola esta vacia.
+        """
+        if not filas:
+            return True
+        limite = time.monotonic() + timeout
+        with self._condicion:
+            self._asegurar_hilo()
+            while self._filas and len(self._filas) + len(filas) > self.maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._condicion.wait(restante)
+            self._filas.extend(filas)
+            self._condicion.notify_all()
+        return True
+
+    def estado(self):
+        return {"pendientes": self.pendientes, "puntuados": self.puntuados, "ultimo_error": self.ultimo_error}
+
+    def _tomar_lote(self):
+        with self._condicion:
+            while not self._filas:
+                self._condicion.wait()
+            lote = [self._filas.popleft() for _ in range(min(self.lote_maximo, len(self._filas)))]
+            # Avisa a los que esperan lugar en la cola
+            self._condicion.notify_all()
+            return lote
+
+    def _puntuar(self, lote):
+        motor = modelo_sentimientos.obtener_motor(self.motor)
+        version, resultados = puntuacion.puntuar_textos([texto for _, texto in lote], motor.nombre)
+        filas = []
+        for (pk, _), resultado in zip(lote, resultados):
+            if not resultado["ok"]:
+                # Sin modelo: quedan sin prediccion para puntuar_comentarios
+                self.ultimo_error = resultado["error"]
+                return
+            filas.append((resultado["etiqueta"], resultado["confianza"],
+                          puntuacion.etiqueta_version(motor, version), pk))
+        puntuacion.guardar_predicciones(filas)
+        self.puntuados += len(filas)
+
+    def _bucle(self):
+        from django.db import close_old_connections
+
+        while True:
+            lote = self._tomar_lote()
+            try:
+                close_old_connections()
+                self._puntuar(lote)
+            except Exception as error:
+                # El hilo sigue con el proximo lote; estos quedan para puntuar_comentarios
+                self.ultimo_error = f"{type(error).__name__}: {error}"
+
+
+# Cola del proceso (se crea la primera vez que se usa)
+_cola = None
+_cola_lock = threading.Lock()
+
+
+def obtener_cola():
+    global _cola
+    if _cola is None:
+        with _cola_lock:
+            if _cola is None:
+                from django.conf import settings
+                _cola = ColaPuntuacion(
+                    maximo=getattr(settings, "SENTIMIENTOS_COLA_PUNTUACION_MAXIMO", 50000),
+                    lote_maximo=getattr(settings, "SENTIMIENTOS_COLA_PUNTUACION_LOTE", 2000),
+                )
+    return _cola
@@ -0,0 +1,52 @@
+"""
+Contadores de comentarios para la pagina principal (total, positivos y negativos).
+
+Se calculan con una sola consulta (COUNT con FILTER) y se guardan en el cache de
+Django. Cuando se crea, edita o borra un comentario, las senales post_save y
+post_delete borran el valor guardado y la siguiente visita lo recalcula. Las
+cargas masivas (bulk_create, update) no envian senales: deben llamar a
+invalidar_contadores() al terminar.
+
+Con el cache por defecto (memoria local) cada proceso tiene su copia; para que
+todos los workers vean la invalidacion hay que usar un cache compartido
+(Redis, Memcached o base de datos) en CACHES. SENTIMIENTOS_CONTADORES_SEGUNDOS
+limita cuanto puede durar un valor viejo en cualquier caso.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment
+
+CLAVE_CONTADORES = "sentimientos:contadores"
+
+
+# Funcion que cuenta los comentarios con una sola consulta
+def contar_comentarios():
+    return Comment.objects.aggregate(
+        total=Count("id"),
+        positivos=Count("id", filter=Q(etiqueta="positivo")),
+        negativos=Count("id", filter=Q(etiqueta="negativo")),
+    )
+
+
+# Funcion que devuelve los contadores desde el cache (solo consulta la base si no estan)
+def obtener_contadores():
+    contadores = cache.get(CLAVE_CONTADORES)
+    if contadores is None:
+        contadores = contar_comentarios()
+        cache.set(CLAVE_CONTADORES, contadores, getattr(settings, "SENTIMIENTOS_CONTADORES_SEGUNDOS", 300))
+    return contadores
+
+
+def invalidar_contadores():
+    cache.delete(CLAVE_CONTADORES)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def _comentario_cambiado(sender, **kwargs):
+    invalidar_contadores()
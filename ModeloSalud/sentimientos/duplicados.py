@@ -0,0 +1,318 @@
+"""
+Deteccion de comentarios casi duplicados con MinHash y LSH.
+
+Cada comentario tiene una firma MinHash (Comment.minhash): NUM_PERMUTACIONES
+minimos de funciones de hash sobre sus pares de palabras seguidas (en minusculas,
+sin acentos ni simbolos). La fraccion de
+posiciones iguales entre dos firmas estima la similitud de Jaccard de los textos.
+
+Para no comparar cada comentario con todos los demas, la firma se corta en BANDAS
+de FILAS valores y cada banda se guarda como una clave en la tabla BandaLSH (con
+indice). Dos comentarios parecidos comparten casi seguro alguna clave, asi que
+revisar un comentario nuevo son unas pocas busquedas por indice y la comparacion
+de su firma con los pocos candidatos que aparecen.
+
+Los comentarios se agrupan alrededor de un representante: los demas apuntan a el
+con duplicado_de y no se usan para entrenar. Solo los representantes se guardan
+en el indice LSH. El representante es el primero que llego, salvo que no tenga
+etiqueta: el primer comentario etiquetado del grupo lo reemplaza, asi su etiqueta
+llega al entrenamiento. Un comentario etiquetado que solo se parece a grupos con
+la otra etiqueta forma su propio grupo (no se descarta por haber llegado despues).
+
+- Los comentarios creados con save() se revisan con la senal post_save.
+- Las cargas masivas no envian senales: llaman a registrar_pendientes(), que
+  revisa los comentarios sin firma (tambien sirve como pasada sobre toda la tabla).
+- reiniciar() borra las firmas y los grupos, para recalcularlos si cambian los
+  parametros (o despues de editar o borrar muchos comentarios).
+"""
+
+import re
+import time
+import unicodedata
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ModeloSalud.carga_masiva import actualizar_por_id, insertar_filas
+
+from .models import BandaLSH, Comment
+
+# Valores de cada firma; BANDAS * FILAS debe ser NUM_PERMUTACIONES
+NUM_PERMUTACIONES = 64
+BANDAS = 16
+FILAS = 4
+
+# Similitud estimada desde la que un comentario es casi duplicado de otro.
+# Con 16 bandas de 4 filas, un par con similitud 0.7 comparte alguna banda el 99% de las veces
+UMBRAL = 0.7
+
+# Comentarios que se revisan y guardan juntos
+TAMANO_BLOQUE = 5000
+
+# Claves o ids que se piden por consulta (SQLite limita los parametros por consulta)
+TAMANO_CONSULTA = 5000
+
+# Pares de palabras que se procesan juntos al calcular firmas (limita la memoria)
+TAMANO_PARTE = 20000
+
+# Palabras: letras y numeros
+PATRON_PALABRA = re.compile(r"\w+")
+
+# Funciones de hash h(x) = (a * x + b) >> 32 (multiplicar y desplazar, con a impar)
+_rng = np.random.default_rng(20261019)
+_A = _rng.integers(1, 2 ** 63, size=NUM_PERMUTACIONES, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, size=NUM_PERMUTACIONES, dtype=np.uint64)
+
+# Multiplicadores para combinar las FILAS valores de una banda en una clave de 64 bits
+_MEZCLA = _rng.integers(1, 2 ** 63, size=FILAS, dtype=np.uint64) | np.uint64(1)
+_DESPLAZAMIENTO_BANDA = _rng.integers(0, 2 ** 63, size=BANDAS, dtype=np.uint64)
+
+
+# Funcion que separa el texto en palabras en minusculas y sin acentos ("Atención" -> "atencion")
+# Pasar a ASCII descarta los acentos y tambien los emojis, que no forman palabras
+def palabras(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    return PATRON_PALABRA.findall(texto)
+
+
+# Funcion que devuelve los hashes de 32 bits de los pares de palabras seguidas del texto
+# (un texto de una sola palabra usa esa palabra)
+def tejas(texto):
+    hashes = np.fromiter((zlib.crc32(palabra.encode("utf-8")) for palabra in palabras(texto)), dtype=np.uint64)
+    if len(hashes) < 2:
+        return hashes
+    return np.unique(((hashes[:-1] << np.uint64(32)) | hashes[1:]) % np.uint64(4294967311))
+
+
+def calcular_firmas(textos):
+    """
+    Calcula la firma MinHash de cada texto
+
+    Devuelve una matriz uint32 de (textos, NUM_PERMUTACIONES). Los textos sin
+    palabras (solo emojis o simbolos) tienen todos los valores en el maximo y
+    quedan en un mismo grupo: no aportan nada para entrenar.
+    """
+    firmas = np.full((len(textos), NUM_PERMUTACIONES), np.iinfo(np.uint32).max, dtype=np.uint32)
+    todas = [tejas(texto) for texto in textos]
+    inicio = 0
+    while inicio < len(todas):
+        # Se juntan los pares de varios textos y se calcula el minimo de cada uno con reduceat
+        fin, cantidad = inicio, 0
+        while fin < len(todas) and (cantidad == 0 or cantidad + len(todas[fin]) <= TAMANO_PARTE):
+            cantidad += len(todas[fin])
+            fin += 1
+        partes = [(fila, hashes) for fila, hashes in enumerate(todas[inicio:fin], inicio) if len(hashes)]
+        if partes:
+            hashes = np.concatenate([h for _, h in partes])
+            valores = ((_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)).astype(np.uint32)
+            comienzos = np.cumsum([0] + [len(h) for _, h in partes[:-1]])
+            firmas[[fila for fila, _ in partes]] = np.minimum.reduceat(valores, comienzos, axis=1).T
+        inicio = fin
+    return firmas
+
+
+# Funcion que devuelve las claves LSH (int64) de cada firma: (firmas, BANDAS)
+def claves_lsh(firmas):
+    bandas = firmas.reshape(len(firmas), BANDAS, FILAS).astype(np.uint64)
+    claves = (bandas * _MEZCLA).sum(axis=2, dtype=np.uint64) + _DESPLAZAMIENTO_BANDA
+    return claves.view(np.int64)
+
+
+# Funcion que estima la similitud de Jaccard entre una firma y varias (fraccion de valores iguales)
+def similitudes(firma, otras):
+    return (np.asarray(otras) == firma).mean(axis=1)
+
+
+def _firma_guardada(valor):
+    return np.frombuffer(bytes(valor), dtype="<u4")
+
+
+# Funcion que busca los representantes que comparten alguna clave: {clave: [ids]}
+def _buscar_claves(claves):
+    encontradas = defaultdict(list)
+    claves = list(set(claves))
+    for inicio in range(0, len(claves), TAMANO_CONSULTA):
+        parte = claves[inicio:inicio + TAMANO_CONSULTA]
+        for clave, comentario_id in BandaLSH.objects.filter(clave__in=parte).values_list("clave", "comentario_id"):
+            encontradas[clave].append(comentario_id)
+    return encontradas
+
+
+# Funcion que lee la firma y la etiqueta de los comentarios: ({id: firma}, {id: etiqueta})
+def _leer_representantes(ids):
+    firmas, etiquetas = {}, {}
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANO_CONSULTA):
+        consulta = Comment.objects.filter(pk__in=ids[inicio:inicio + TAMANO_CONSULTA]).exclude(minhash=None)
+        for pk, valor, etiqueta in consulta.values_list("pk", "minhash", "etiqueta"):
+            firmas[pk] = _firma_guardada(valor)
+            etiquetas[pk] = etiqueta
+    return firmas, etiquetas
+
+
+def buscar_parecidos(texto, umbral=UMBRAL):
+    """
+    Busca los comentarios de los que el texto seria casi duplicado
+
+    Devuelve una lista de (id del representante, similitud estimada), de mayor a menor
+    """
+    firma = calcular_firmas([texto])[0]
+    claves = claves_lsh(firma[None, :])[0].tolist()
+    candidatos = {pk for ids in _buscar_claves(claves).values() for pk in ids}
+    firmas, _ = _leer_representantes(candidatos)
+    if not firmas:
+        return []
+    ids = list(firmas)
+    parecidos = [(pk, float(s)) for pk, s in zip(ids, similitudes(firma, [firmas[pk] for pk in ids])) if s >= umbral]
+    return sorted(parecidos, key=lambda par: (-par[1], par[0]))
+
+
+# Funcion que guarda firmas, representantes y claves de un bloque con pocas sentencias
+# (ver ModeloSalud/carga_masiva.py). reemplazos: {representante anterior: nuevo}
+def _guardar(actualizados, bandas, reemplazos):
+    with transaction.atomic():
+        for anterior, nuevo in reemplazos.items():
+            # El representante anterior y su grupo ya guardado pasan al nuevo
+            Comment.objects.filter(Q(pk=anterior) | Q(duplicado_de=anterior)).update(duplicado_de=nuevo)
+        if reemplazos:
+            BandaLSH.objects.filter(comentario_id__in=list(reemplazos)).delete()
+        actualizar_por_id(Comment, ["minhash", "duplicado_de"], actualizados)
+        insertar_filas(BandaLSH, ["comentario", "clave"], bandas)
+
+
+# Funcion que elige el grupo de un comentario entre los representantes parecidos
+# [(id, similitud)] (del mas al menos parecido) y devuelve (representante, reemplazado):
+# - sin etiqueta: el mas parecido
+# - con etiqueta: el mas parecido con la misma etiqueta; si no hay, el comentario
+#   reemplaza al representante sin etiqueta mas parecido; si solo hay grupos con la
+#   otra etiqueta, es un representante nuevo
+def _elegir_grupo(etiqueta, parecidos, etiquetas):
+    if not etiqueta:
+        return (parecidos[0][0] if parecidos else None), None
+    for candidato, _ in parecidos:
+        if etiquetas[candidato] == etiqueta:
+            return candidato, None
+    for candidato, _ in parecidos:
+        if not etiquetas[candidato]:
+            return None, candidato
+    return None, None
+
+
+# Funcion que revisa un bloque de comentarios [(id, texto, etiqueta)] ordenado por id y
+# devuelve cuantos resultaron casi duplicados. Cada uno se compara con los representantes
+# de menor id (de la base y de este mismo bloque).
+def _registrar_bloque(bloque, umbral):
+    firmas = calcular_firmas([texto for _, texto, _ in bloque])
+    claves = claves_lsh(firmas)
+
+    indice = _buscar_claves(claves.ravel().tolist())
+    firmas_representantes, etiquetas = _leer_representantes({pk for ids in indice.values() for pk in ids})
+
+    actualizados, bandas = [], []
+    reemplazos = {}
+    duplicados = 0
+    for (pk, _, etiqueta), firma, claves_comentario in zip(bloque, firmas, claves.tolist()):
+        # Los representantes reemplazados ya no estan en firmas_representantes
+        candidatos = sorted({
+            candidato for clave in claves_comentario for candidato in indice.get(clave, ())
+            if candidato < pk and candidato in firmas_representantes
+        })
+        parecidos = []
+        if candidatos:
+            valores = similitudes(firma, [firmas_representantes[c] for c in candidatos])
+            parecidos = sorted(((c, s) for c, s in zip(candidatos, valores) if s >= umbral), key=lambda par: -par[1])
+        representante, reemplazado = _elegir_grupo(etiqueta, parecidos, etiquetas)
+
+        if reemplazado is not None:
+            del firmas_representantes[reemplazado]
+            reemplazos[reemplazado] = pk
+            duplicados += 1
+        if representante is None:
+            # Es un representante nuevo: sus claves entran al indice
+            for clave in claves_comentario:
+                indice[clave].append(pk)
+                bandas.append((pk, clave))
+            firmas_representantes[pk] = firma
+            etiquetas[pk] = etiqueta
+        else:
+            duplicados += 1
+        actualizados.append((firma.astype("<u4").tobytes(), representante, pk))
+
+    if reemplazos:
+        # Los del bloque que apuntaban a un representante reemplazado (o lo eran) pasan al nuevo
+        actualizados = [
+            (firma, reemplazos.get(pk, reemplazos.get(representante, representante)), pk)
+            for firma, representante, pk in actualizados
+        ]
+        bandas = [(pk, clave) for pk, clave in bandas if pk not in reemplazos]
+    _guardar(actualizados, bandas, reemplazos)
+    return duplicados
+
+
+def registrar_pendientes(tamano_bloque=TAMANO_BLOQUE, umbral=UMBRAL, informar=None, hasta=None):
+    """
+    Calcula la firma de los comentarios que no la tienen y los agrupa con sus casi duplicados
+
+    Recorre los pendientes por id en bloques (se puede cortar y volver a correr).
+    informar: funcion opcional que recibe (revisados, casi duplicados) despues de cada bloque
+    hasta: ultimo id que se revisa (por defecto toda la tabla)
+    """
+    pendientes = Comment.objects.filter(minhash=None)
+    if hasta is not None:
+        pendientes = pendientes.filter(pk__lte=hasta)
+    inicio = time.perf_counter()
+    revisados = duplicados = 0
+    desde = 0
+    while True:
+        bloque = list(
+            pendientes.filter(pk__gt=desde).order_by("pk").values_list("pk", "texto", "etiqueta")[:tamano_bloque]
+        )
+        if not bloque:
+            break
+        desde = bloque[-1][0]
+        duplicados += _registrar_bloque(bloque, umbral)
+        revisados += len(bloque)
+        if informar is not None:
+            informar(revisados, duplicados)
+
+    return {
+        "ok": True,
+        "revisados": revisados,
+        "casi_duplicados": duplicados,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+# Funcion que borra todas las firmas, grupos y claves (la proxima pasada los recalcula)
+def reiniciar():
+    with transaction.atomic():
+        BandaLSH.objects.all().delete()
+        Comment.objects.exclude(minhash=None).update(minhash=None, duplicado_de=None)
+
+
+# Resumen de los grupos: comentarios, representantes y casi duplicados
+def resumen():
+    total = Comment.objects.count()
+    duplicados = Comment.objects.exclude(duplicado_de=None).count()
+    return {
+        "total": total,
+        "casi_duplicados": duplicados,
+        "unicos": total - duplicados,
+        "sin_revisar": Comment.objects.filter(minhash=None).count(),
+    }
+
+
+@receiver(post_save, sender=Comment)
+def _comentario_guardado(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Solo importa si cambio el texto (no al guardar la prediccion o la etiqueta)
+    if raw or (update_fields is not None and "texto" not in update_fields):
+        return
+    with transaction.atomic():
+        if not created:
+            BandaLSH.objects.filter(comentario=instance).delete()
+        _registrar_bloque([(instance.pk, instance.texto, instance.etiqueta)], UMBRAL)
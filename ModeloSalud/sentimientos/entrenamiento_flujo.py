@@ -0,0 +1,132 @@
+"""
+Entrenamiento en flujo (out-of-core) de los motores con en_flujo (motor "hashing").
+
+Lee los comentarios de la base en bloques ordenados por id y nunca tiene todos
+en memoria, asi la memoria usada no crece con la cantidad de comentarios:
+
+1. Primera pasada: cuenta en cuantos comentarios aparece cada columna del
+   hashing (para el IDF). El espacio de columnas es fijo: no hay vocabulario.
+2. Una pasada por epoca: cada bloque se convierte a TF-IDF y se entrena con
+   partial_fit, en orden aleatorio dentro del bloque.
+
+Los comentarios con id multiplo de PARTES_PRUEBA (20%) quedan para la prueba.
+Para las metricas y graficos se guardan a lo sumo MAXIMO_PRUEBA predicciones.
+
+Usa texto_limpio y deja fuera los casi duplicados: antes hay que llamar a
+limpieza.actualizar_textos_limpios() y duplicados.registrar_pendientes()
+(reentrenamiento.reentrenar ya lo hace).
+"""
+
+import time
+from itertools import compress
+
+import numpy as np
+from django.db.models import Max
+
+from . import modelo_sentimientos
+from .models import Comment
+from .motores import VectorizadorHashing
+
+# Comentarios que se leen y entrenan juntos
+TAMANO_BLOQUE = 20000
+
+# Pasadas sobre todos los comentarios de entrenamiento
+EPOCAS = 5
+
+# 1 de cada PARTES_PRUEBA comentarios (por id) queda para la prueba
+PARTES_PRUEBA = 5
+
+# Predicciones de prueba que se guardan para las metricas
+MAXIMO_PRUEBA = 50000
+
+
+# Funcion que recorre los comentarios en bloques: (ids, textos limpios, etiquetas 1/0)
+def leer_bloques(ultimo_id, tamano_bloque=TAMANO_BLOQUE):
+    comentarios = (Comment.objects.filter(pk__lte=ultimo_id, etiqueta__in=["positivo", "negativo"], duplicado_de=None)
+                   .exclude(texto_limpio=None))
+    desde = 0
+    while True:
+        bloque = list(
+            comentarios.filter(pk__gt=desde).order_by("pk").values_list("pk", "texto_limpio", "etiqueta")[:tamano_bloque]
+        )
+        if not bloque:
+            return
+        desde = bloque[-1][0]
+        ids = np.fromiter((pk for pk, _, _ in bloque), dtype=np.int64, count=len(bloque))
+        etiquetas = np.fromiter((etiqueta == "positivo" for _, _, etiqueta in bloque), dtype=np.int8, count=len(bloque))
+        yield ids, [texto for _, texto, _ in bloque], etiquetas
+
+
+def entrenar_en_flujo(motor="hashing", ultimo_id=None, tamano_bloque=TAMANO_BLOQUE, epocas=EPOCAS, informar=None):
+    """
+    Entrena el motor leyendo los comentarios en bloques y publica el modelo
+
+    Parametros:
+    - motor: nombre del motor (debe tener en_flujo)
+    - ultimo_id: solo se usan comentarios con id hasta este (por defecto todos)
+    - informar: funcion opcional que recibe (epoca, comentarios de entrenamiento)
+
+    Devuelve el resultado de publicar_ajuste (como entrenar_modelo) con "ok"
+    """
+    motor = modelo_sentimientos.obtener_motor(motor)
+    if not motor.en_flujo:
+        return {"ok": False, "error": f'El motor "{motor.nombre}" no se entrena en flujo.'}
+    if ultimo_id is None:
+        ultimo_id = Comment.objects.aggregate(ultimo=Max("pk"))["ultimo"] or 0
+
+    inicio = time.perf_counter()
+
+    # 1. IDF: en cuantos comentarios de entrenamiento aparece cada columna
+    vectorizador = VectorizadorHashing()
+    total = 0
+    for ids, textos, _ in leer_bloques(ultimo_id, tamano_bloque):
+        vectorizador.contar(list(compress(textos, ids % PARTES_PRUEBA != 0)))
+        total += len(ids)
+    if vectorizador.documentos == 0:
+        return {"ok": False, "error": "No hay comentarios para entrenar."}
+    vectorizador.calcular_idf()
+
+    # 2. Entrenar bloque a bloque
+    modelo = motor.crear_clasificador()
+    rng = np.random.default_rng(42)
+    for epoca in range(epocas):
+        for ids, textos, etiquetas in leer_bloques(ultimo_id, tamano_bloque):
+            entrenamiento = ids % PARTES_PRUEBA != 0
+            if not entrenamiento.any():
+                continue
+            X = vectorizador.transform(list(compress(textos, entrenamiento)))
+            orden = rng.permutation(X.shape[0])
+            modelo.partial_fit(X[orden], etiquetas[entrenamiento][orden], classes=[0, 1])
+        if informar is not None:
+            informar(epoca + 1, vectorizador.documentos)
+    segundos = time.perf_counter() - inicio
+
+    # 3. Predicciones sobre los comentarios de prueba (a lo sumo MAXIMO_PRUEBA)
+    y_test, y_pred_prob = [], []
+    guardadas = 0
+    for ids, textos, etiquetas in leer_bloques(ultimo_id, tamano_bloque):
+        prueba = ids % PARTES_PRUEBA == 0
+        if not prueba.any():
+            continue
+        X = vectorizador.transform(list(compress(textos, prueba)))[:MAXIMO_PRUEBA - guardadas]
+        y_test.append(etiquetas[prueba][:X.shape[0]])
+        y_pred_prob.append(motor.probabilidades(modelo, X))
+        guardadas += X.shape[0]
+        if guardadas >= MAXIMO_PRUEBA:
+            break
+    if not guardadas:
+        return {"ok": False, "error": "No hay comentarios de prueba (se necesitan al menos 5)."}
+
+    resultado = modelo_sentimientos.publicar_ajuste({
+        "motor": motor,
+        "modelo": modelo,
+        "vectorizador": vectorizador,
+        "y_test": np.concatenate(y_test).astype(int),
+        "y_pred_prob": np.concatenate(y_pred_prob),
+        "textos_test": np.array([], dtype=object),
+        "segundos_entrenamiento": segundos,
+        "incremental": False,
+        "comentarios": total,
+    })
+    resultado["ok"] = True
+    return resultado
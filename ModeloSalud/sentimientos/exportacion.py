@@ -0,0 +1,77 @@
+"""
+Exportacion de comentarios en CSV o JSON Lines, en streaming.
+
+Los comentarios se leen de la base de a bloques con iterator(chunk_size=...)
+(en PostgreSQL con un cursor del lado del servidor) y cada fila se envia apenas
+se genera: el servidor nunca tiene la tabla completa en memoria.
+"""
+
+import csv
+import json
+
+from .models import Comment
+
+# Columnas exportadas, en orden
+CAMPOS_EXPORTACION = [
+    "id", "fecha", "texto", "etiqueta",
+    "etiqueta_predicha", "confianza_predicha", "modelo_version",
+]
+
+# Filas que se leen de la base por bloque
+TAMANO_BLOQUE = 2000
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+class _Eco:
+    """
+    Archivo falso para csv.writer: write devuelve la linea en vez de guardarla
+    """
+
+    def write(self, valor):
+        return valor
+
+
+# Funcion que arma la consulta de exportacion (ordenada por id)
+def consulta_exportacion(filtro=""):
+    consulta = Comment.objects.order_by("id")
+    if filtro:
+        consulta = consulta.filter(etiqueta=filtro)
+    return consulta.values_list(*CAMPOS_EXPORTACION)
+
+
+# Funcion que junta las lineas de a bloques (una escritura por bloque en vez de una por fila)
+def _en_bloques(lineas, tamano_bloque):
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= tamano_bloque:
+            yield "".join(bloque)
+            bloque = []
+    if bloque:
+        yield "".join(bloque)
+
+
+def lineas_csv(consulta, tamano_bloque=TAMANO_BLOQUE):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(CAMPOS_EXPORTACION)
+    for fila in consulta.iterator(chunk_size=tamano_bloque):
+        yield escritor.writerow(fila)
+
+
+def lineas_jsonl(consulta, tamano_bloque=TAMANO_BLOQUE):
+    for fila in consulta.iterator(chunk_size=tamano_bloque):
+        registro = dict(zip(CAMPOS_EXPORTACION, fila))
+        if registro["fecha"] is not None:
+            registro["fecha"] = registro["fecha"].isoformat()
+        yield json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+# Funcion que devuelve el generador de lineas segun el formato ("csv" o "jsonl")
+def exportar(formato, filtro=""):
+    consulta = consulta_exportacion(filtro)
+    lineas = lineas_csv(consulta) if formato == "csv" else lineas_jsonl(consulta)
+    return _en_bloques(lineas, TAMANO_BLOQUE)
@@ -0,0 +1,261 @@
+"""
+Frases que explican el sentimiento de los comentarios ("esperar 3 horas", "muy amable").
+
+Para cada n-grama del vocabulario TF-IDF del modelo publicado se cuenta en cuantos
+comentarios positivos y negativos aparece, y se calcula el log-odds de positivo
+contra negativo con una previa de Dirichlet informativa (Monroe et al., 2008) y su
+puntaje z. El z separa las frases que de verdad se asocian a un sentimiento de
+las que solo son frecuentes. El resultado se guarda en la tabla FraseSentimiento
+y la API lo lee de ahi.
+
+Lo caro es vectorizar los comentarios. Por eso la matriz de cada comentario (que
+columnas del vocabulario aparecen) se guarda en disco por version del modelo, en
+bloques por id: cada analisis solo vectoriza los comentarios nuevos y los de id
+menor que todavia faltan (en PostgreSQL los ids salen de una secuencia y una carga
+con ids mas bajos puede confirmarse despues de guardado un bloque con ids mas
+altos; para encontrarlos se recorren los ids de la tabla, sin los textos). Las etiquetas
+si se leen de la base cada vez (pueden cambiar, por ejemplo con nuevas predicciones),
+y los conteos son un producto de la matriz dispersa por el vector de etiquetas.
+
+El sentimiento de cada comentario es el mismo que en las tendencias: su etiqueta o,
+si no tiene, la prediccion del modelo. Si cambia el texto de un comentario ya
+vectorizado no se vuelve a vectorizar hasta que cambie la version del modelo.
+"""
+
+import os
+import shutil
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import limpieza, modelo_sentimientos
+from .models import Comment, FraseSentimiento
+from .tendencias import sentimiento
+
+# Carpeta (dentro de MODELS_DIR) con las matrices de los comentarios por version del modelo
+CARPETA_CACHE = "cache_frases"
+
+# Comentarios que se vectorizan y guardan juntos (un archivo por bloque)
+TAMANO_BLOQUE = 50000
+
+# Ids que se piden por consulta cuando no son un rango (SQLite limita los parametros por consulta)
+TAMANO_CONSULTA = 5000
+
+# Peso de la previa: cada frase suma PESO_PREVIA veces sus apariciones totales
+# repartidas como en el corpus (suaviza las frases raras)
+PESO_PREVIA = 0.1
+
+# Las frases que aparecen en menos comentarios no se guardan
+MINIMO_COMENTARIOS = 5
+
+# Codigo de cada sentimiento en el vector de etiquetas
+CODIGOS = {"positivo": 1, "negativo": -1}
+
+
+# Funcion que devuelve la carpeta de cache de una version del modelo (y borra las de otras versiones)
+def carpeta_cache(motor, version):
+    base = os.path.join(settings.MODELS_DIR, CARPETA_CACHE)
+    os.makedirs(base, exist_ok=True)
+    nombre = f"{motor.nombre}_{version}"
+    for otra in os.listdir(base):
+        if otra.startswith(f"{motor.nombre}_") and otra != nombre:
+            shutil.rmtree(os.path.join(base, otra), ignore_errors=True)
+    carpeta = os.path.join(base, nombre)
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+# Funcion que lista los bloques guardados (el nombre es el ultimo id del bloque)
+def bloques_guardados(carpeta):
+    return sorted(archivo for archivo in os.listdir(carpeta)
+                  if archivo.startswith("bloque_") and archivo.endswith(".npz"))
+
+
+# Funcion que lee los ids de una lista de comentarios en consultas de TAMANO_CONSULTA
+def _leer_por_ids(ids, *campos):
+    filas = []
+    for inicio in range(0, len(ids), TAMANO_CONSULTA):
+        filas.extend(Comment.objects.filter(pk__in=ids[inicio:inicio + TAMANO_CONSULTA]).values_list(*campos))
+    return filas
+
+
+# Funcion que vectoriza un bloque [(id, texto limpio)] ordenado por id y lo guarda
+# (el nombre del archivo es el ultimo id del bloque)
+def _guardar_bloque(vectorizador, carpeta, bloque):
+    X = vectorizador.transform([texto or "" for _, texto in bloque]).tocsr()
+
+    # Solo importa si la frase aparece: se guardan indices, no los valores TF-IDF
+    def escribir(ruta):
+        np.savez(ruta, ids=np.array([pk for pk, _ in bloque], dtype=np.int64),
+                 indptr=X.indptr.astype(np.int64), indices=X.indices.astype(np.int32))
+
+    modelo_sentimientos.publicar_archivo(os.path.join(carpeta, f"bloque_{bloque[-1][0]:012d}.npz"), escribir)
+
+
+# Funcion que devuelve los ids hasta ultimo_id que no estan en ningun bloque guardado
+def _faltantes(carpeta, guardados, ultimo_id, tamano_bloque):
+    partes = []
+    for archivo in guardados:
+        with np.load(os.path.join(carpeta, archivo)) as datos:
+            partes.append(datos["ids"])
+    en_cache = np.unique(np.concatenate(partes))
+
+    faltantes = []
+    desde = 0
+    while True:
+        ids = np.fromiter(
+            Comment.objects.filter(pk__gt=desde, pk__lte=ultimo_id).order_by("pk")
+            .values_list("pk", flat=True)[:tamano_bloque],
+            dtype=np.int64,
+        )
+        if len(ids) == 0:
+            return faltantes
+        faltantes.extend(ids[~np.isin(ids, en_cache, assume_unique=True)].tolist())
+        desde = int(ids[-1])
+
+
+# Funcion que vectoriza los comentarios que todavia no estan en la cache y devuelve cuantos eran
+def vectorizar_nuevos(vectorizador, carpeta, tamano_bloque=TAMANO_BLOQUE):
+    guardados = bloques_guardados(carpeta)
+    ultimo_id = int(guardados[-1][len("bloque_"):-len(".npz")]) if guardados else 0
+    nuevos = 0
+
+    # Los que se confirmaron despues de guardar un bloque con ids mayores
+    faltantes = _faltantes(carpeta, guardados, ultimo_id, tamano_bloque) if guardados else []
+    for inicio in range(0, len(faltantes), tamano_bloque):
+        bloque = sorted(_leer_por_ids(faltantes[inicio:inicio + tamano_bloque], "pk", "texto_limpio"))
+        if bloque:
+            _guardar_bloque(vectorizador, carpeta, bloque)
+            nuevos += len(bloque)
+
+    while True:
+        bloque = list(
+            Comment.objects.filter(pk__gt=ultimo_id).order_by("pk").values_list("pk", "texto_limpio")[:tamano_bloque]
+        )
+        if not bloque:
+            return nuevos
+        ultimo_id = bloque[-1][0]
+        _guardar_bloque(vectorizador, carpeta, bloque)
+        nuevos += len(bloque)
+
+
+# Funcion que cuenta en cuantos comentarios positivos y negativos aparece cada columna
+def contar(carpeta, columnas):
+    import scipy.sparse as sp
+
+    positivos = np.zeros(columnas, dtype=np.int64)
+    negativos = np.zeros(columnas, dtype=np.int64)
+    comentarios = 0
+    for archivo in bloques_guardados(carpeta):
+        with np.load(os.path.join(carpeta, archivo)) as datos:
+            ids, indptr, indices = datos["ids"], datos["indptr"], datos["indices"]
+        X = sp.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(len(ids), columnas))
+
+        # Sentimiento actual de cada comentario del bloque (1 positivo, -1 negativo, 0 ninguno o borrado)
+        # Los bloques de comentarios que faltaban tienen ids sueltos: se piden por id y no por rango
+        if ids[-1] - ids[0] < 2 * len(ids):
+            actuales = list(Comment.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).values_list(
+                "pk", "etiqueta", "etiqueta_predicha"))
+        else:
+            actuales = _leer_por_ids(ids.tolist(), "pk", "etiqueta", "etiqueta_predicha")
+        pks = np.fromiter((pk for pk, _, _ in actuales), dtype=np.int64, count=len(actuales))
+        signos = np.fromiter(
+            (CODIGOS.get(sentimiento(etiqueta, predicha), 0) for _, etiqueta, predicha in actuales),
+            dtype=np.int8, count=len(actuales),
+        )
+        posiciones = np.minimum(np.searchsorted(ids, pks), len(ids) - 1)
+        encontrados = ids[posiciones] == pks
+        valores = np.zeros(len(ids), dtype=np.int8)
+        valores[posiciones[encontrados]] = signos[encontrados]
+
+        positivos += np.rint(X.T @ (valores == 1).astype(np.float32)).astype(np.int64)
+        negativos += np.rint(X.T @ (valores == -1).astype(np.float32)).astype(np.int64)
+        comentarios += int((valores != 0).sum())
+    return positivos, negativos, comentarios
+
+
+def log_odds(positivos, negativos, peso_previa=PESO_PREVIA):
+    """
+    Log-odds de positivo contra negativo de cada frase con previa de Dirichlet informativa
+
+    Devuelve (log_odds, z); z > 0 se asocia a positivo y z < 0 a negativo
+    """
+    positivos = positivos.astype(np.float64)
+    negativos = negativos.astype(np.float64)
+    alfa = peso_previa * (positivos + negativos) + 0.5
+    alfa_total = alfa.sum()
+    total_positivos = positivos.sum()
+    total_negativos = negativos.sum()
+
+    chance_positivo = (positivos + alfa) / (total_positivos + alfa_total - positivos - alfa)
+    chance_negativo = (negativos + alfa) / (total_negativos + alfa_total - negativos - alfa)
+    delta = np.log(chance_positivo) - np.log(chance_negativo)
+    varianza = 1.0 / (positivos + alfa) + 1.0 / (negativos + alfa)
+    return delta, delta / np.sqrt(varianza)
+
+
+def analizar(motor=None, tamano_bloque=TAMANO_BLOQUE, minimo=MINIMO_COMENTARIOS):
+    """
+    Calcula las frases de cada sentimiento con el vocabulario del modelo publicado
+    y reemplaza la tabla FraseSentimiento
+
+    Devuelve un diccionario con "ok", los comentarios usados, los que se vectorizaron
+    (nuevos) y las frases guardadas
+    """
+    motor = modelo_sentimientos.obtener_motor(motor)
+    # "numpy" e "int8" usan el vectorizador del motor "mlp"
+    motor = getattr(motor, "motor_mlp", motor)
+    version = modelo_sentimientos.version_modelo(motor)
+    if version is None:
+        return {"ok": False, "error": "Modelo no entrenado aún."}
+    vectorizador = motor.cargar_vectorizador(motor.vectorizador_path)
+    if not hasattr(vectorizador, "get_feature_names_out"):
+        return {"ok": False, "error": f'El motor "{motor.nombre}" no tiene vocabulario de frases (usar mlp o lineal).'}
+
+    inicio = time.perf_counter()
+    # El vectorizador espera el texto limpio (el mismo de entrenamiento)
+    limpieza.actualizar_textos_limpios()
+    carpeta = carpeta_cache(motor, version)
+    nuevos = vectorizar_nuevos(vectorizador, carpeta, tamano_bloque)
+
+    nombres = vectorizador.get_feature_names_out()
+    positivos, negativos, comentarios = contar(carpeta, len(nombres))
+    delta, z = log_odds(positivos, negativos)
+
+    modelo_version = f"{motor.nombre}:{version}"
+    elegidas = np.flatnonzero(positivos + negativos >= minimo)
+    with transaction.atomic():
+        FraseSentimiento.objects.all().delete()
+        FraseSentimiento.objects.bulk_create([
+            FraseSentimiento(
+                modelo_version=modelo_version, frase=str(nombres[i])[:200],
+                positivos=int(positivos[i]), negativos=int(negativos[i]),
+                log_odds=float(delta[i]), z=float(z[i]),
+            )
+            for i in elegidas
+        ], batch_size=1000)
+
+    return {
+        "ok": True,
+        "modelo_version": modelo_version,
+        "comentarios": comentarios,
+        "nuevos": nuevos,
+        "frases": len(elegidas),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+# Funcion que devuelve las frases que mas se asocian a un sentimiento (desde la tabla)
+def principales(sentimiento_buscado, cantidad=20, minimo=MINIMO_COMENTARIOS):
+    frases = FraseSentimiento.objects.all()
+    if minimo > MINIMO_COMENTARIOS:
+        frases = frases.annotate(apariciones=F("positivos") + F("negativos")).filter(apariciones__gte=minimo)
+    orden = "-z" if sentimiento_buscado == "positivo" else "z"
+    return [
+        {"frase": frase, "positivos": positivos, "negativos": negativos, "log_odds": round(delta, 4), "z": round(z, 3)}
+        for frase, positivos, negativos, delta, z in frases.order_by(orden).values_list(
+            "frase", "positivos", "negativos", "log_odds", "z")[:cantidad]
+    ]
@@ -0,0 +1,272 @@
+"""
+Busqueda de hiperparametros de la red de sentimientos (motor "mlp").
+
+Evalua muchas configuraciones (la grilla completa de ESPACIO o una muestra al
+azar) en un pool de procesos del tamaño de la CPU:
+
+- Caracteristicas en cache: el TF-IDF se ajusta una sola vez por cada
+  configuracion de TF-IDF (no por cada red) y las matrices se guardan en disco;
+  los procesos las leen de ahi. Si los comentarios no cambiaron, la siguiente
+  busqueda las reutiliza.
+- Successive halving: todas las configuraciones empiezan con pocas epocas; en
+  cada ronda sigue solo el mejor 1/eta (por val_loss) y recibe eta veces mas
+  epocas, partiendo de los pesos de la ronda anterior.
+- Early stopping: cada entrenamiento se corta si val_loss deja de mejorar.
+
+Se usa la misma division entrenamiento/validacion/prueba que al entrenar
+(modelo_sentimientos.dividir_indices) y la prueba nunca se mira. La configuracion
+ganadora se guarda en sentiment_configuracion.json y la usan los entrenamientos
+completos siguientes.
+
+Este modulo no importa Django ni TensorFlow al cargarse: los procesos del pool
+solo necesitan entrenar_candidata.
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .motores import CONFIGURACION_RED, ajustar_red, construir_red
+
+# Valores que se prueban de cada hiperparametro
+# (dropout es el mismo para todas las capas ocultas)
+ESPACIO = {
+    "max_features": [2000, 5000, 10000],
+    "ngram_range": [[1, 1], [1, 2], [1, 3]],
+    "capas": [[256, 128, 64, 32], [256, 128], [128, 64], [64]],
+    "dropout": [0.2, 0.4],
+    "learning_rate": [1e-3, 3e-4],
+    "tamano_lote": [16, 64],
+}
+
+# Hiperparametros que cambian el TF-IDF (el resto son de la red)
+PARAMETROS_TFIDF = ("max_features", "ngram_range", "min_df")
+
+# Successive halving: en cada ronda sigue 1 de cada ETA configuraciones
+ETA = 3
+EPOCAS_MINIMAS = 2
+EPOCAS_MAXIMAS = CONFIGURACION_RED["epocas"]
+
+# Carpeta (dentro de MODELS_DIR) donde se guardan las caracteristicas ya calculadas
+CARPETA_CACHE = "cache_hiperparametros"
+
+
+# Funcion que arma las configuraciones a probar: la grilla completa o "muestras" al azar
+# Cada configuracion es {"tfidf": {...}, "red": {...}} (mismo formato que leer_configuracion)
+def generar_configuraciones(espacio=ESPACIO, muestras=None, semilla=42):
+    from .modelo_sentimientos import CONFIGURACION_TFIDF
+
+    nombres = list(espacio)
+    grilla = list(itertools.product(*(espacio[nombre] for nombre in nombres)))
+    if muestras is not None and muestras < len(grilla):
+        grilla = random.Random(semilla).sample(grilla, muestras)
+
+    configuraciones = []
+    for valores in grilla:
+        elegidos = dict(zip(nombres, valores))
+        tfidf = {**CONFIGURACION_TFIDF, **{k: v for k, v in elegidos.items() if k in PARAMETROS_TFIDF}}
+        red = {**CONFIGURACION_RED, **{k: v for k, v in elegidos.items() if k not in PARAMETROS_TFIDF}}
+        if not isinstance(red["dropout"], list):
+            red["dropout"] = [red["dropout"]] * len(red["capas"])
+        configuraciones.append({"tfidf": tfidf, "red": red})
+    return configuraciones
+
+
+# Funcion que calcula (o reutiliza) las caracteristicas de cada configuracion de TF-IDF
+# Devuelve {clave del TF-IDF: ruta base de los archivos}
+def preparar_caracteristicas(textos, etiquetas, configuraciones, carpeta):
+    import scipy.sparse as sp
+    from .modelo_sentimientos import crear_vectorizador, dividir_indices
+
+    textos = np.asarray(textos, dtype=object)
+    y = np.asarray(etiquetas, dtype=np.float32)
+    entrenamiento, validacion, _ = dividir_indices(len(y))
+
+    # Huella de los datos: si cambian los comentarios, cambian los archivos
+    huella_datos = hashlib.blake2b(digest_size=8)
+    for texto, etiqueta in zip(textos, y):
+        huella_datos.update(f"{etiqueta:.0f}{texto}\n".encode("utf-8"))
+    huella_datos = huella_datos.hexdigest()
+
+    # Se borran las caracteristicas de datos anteriores (ya no se van a usar)
+    for archivo in os.listdir(carpeta):
+        if not archivo.startswith(huella_datos):
+            os.remove(os.path.join(carpeta, archivo))
+
+    rutas = {}
+    for configuracion in configuraciones:
+        clave = json.dumps(configuracion["tfidf"], sort_keys=True)
+        if clave in rutas:
+            continue
+        nombre = f"{huella_datos}_{hashlib.blake2b(clave.encode('utf-8'), digest_size=8).hexdigest()}"
+        base = rutas[clave] = os.path.join(carpeta, nombre)
+        if os.path.exists(f"{base}_val.npz"):
+            continue
+
+        # El vocabulario y el IDF se aprenden solo de los textos de entrenamiento
+        vectorizador = crear_vectorizador(configuracion["tfidf"])
+        X_train = vectorizador.fit_transform(textos[entrenamiento])
+        X_val = vectorizador.transform(textos[validacion])
+        np.save(f"{base}_y_train.npy", y[entrenamiento])
+        np.save(f"{base}_y_val.npy", y[validacion])
+        sp.save_npz(f"{base}_train.npz", X_train.tocsr())
+        # El archivo de validacion se escribe al final: si existe, la cache esta completa
+        sp.save_npz(f"{base}_val.npz", X_val.tocsr())
+    return rutas
+
+
+# Funcion que corre al iniciar cada proceso del pool: reparte los hilos de la CPU
+# entre los procesos (si cada TensorFlow usa todos los nucleos, se estorban)
+def _iniciar_proceso(hilos):
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(hilos)
+    tf.config.threading.set_inter_op_parallelism_threads(hilos)
+
+
+def entrenar_candidata(tarea):
+    """
+    Entrena una configuracion (en un proceso del pool) desde tarea["epoca_inicial"]
+    hasta tarea["epocas"], con early stopping, y guarda el modelo para la ronda siguiente
+
+    Devuelve {"val_loss", "val_accuracy", "epocas", "detenida"}
+    """
+    import scipy.sparse as sp
+    import tensorflow as tf
+
+    base = tarea["datos"]
+    X_train = sp.load_npz(f"{base}_train.npz")
+    X_val = sp.load_npz(f"{base}_val.npz")
+    y_train = np.load(f"{base}_y_train.npy")
+    y_val = np.load(f"{base}_y_val.npy")
+
+    configuracion = {**tarea["red"], "epocas": tarea["epocas"]}
+    if tarea["epoca_inicial"] > 0:
+        # Sigue desde los pesos (y el estado del optimizador) de la ronda anterior
+        modelo = tf.keras.models.load_model(tarea["modelo"])
+    else:
+        modelo = construir_red(X_train.shape[1], configuracion)
+
+    historial = ajustar_red(modelo, X_train, y_train, X_val, y_val, configuracion,
+                            epoca_inicial=tarea["epoca_inicial"], verbose=0).history
+    modelo.save(tarea["modelo"])
+
+    # Early stopping deja los pesos de la mejor epoca
+    mejor = int(np.argmin(historial["val_loss"]))
+    epocas_corridas = len(historial["val_loss"])
+    return {
+        "val_loss": float(historial["val_loss"][mejor]),
+        "val_accuracy": float(historial["val_accuracy"][mejor]),
+        "epocas": tarea["epoca_inicial"] + epocas_corridas,
+        "detenida": tarea["epoca_inicial"] + epocas_corridas < tarea["epocas"],
+    }
+
+
+def buscar(textos, etiquetas, configuraciones, procesos=None, eta=ETA,
+           epocas_minimas=EPOCAS_MINIMAS, epocas_maximas=EPOCAS_MAXIMAS, carpeta=None, informar=None):
+    """
+    Busca la mejor configuracion con successive halving
+
+    Parametros:
+    - textos, etiquetas: textos limpios y etiquetas (1 = positivo, 0 = negativo)
+    - configuraciones: lista de generar_configuraciones
+    - procesos: tamaño del pool (por defecto uno por CPU)
+    - eta: en cada ronda sigue 1 de cada eta configuraciones, con eta veces mas epocas
+    - epocas_minimas, epocas_maximas: epocas de la primera ronda y maximo por configuracion
+    - carpeta: donde se guardan las caracteristicas (por defecto MODELS_DIR/cache_hiperparametros)
+    - informar: funcion opcional que recibe (ronda, epocas, candidatas evaluadas en la ronda)
+
+    Devuelve {"ok", "ganadora", "ranking", "rondas", "entrenamientos", "epocas_totales", "segundos"}
+    """
+    if not configuraciones:
+        return {"ok": False, "error": "No hay configuraciones para probar."}
+    if len(set(etiquetas)) < 2:
+        return {"ok": False, "error": "Se necesitan comentarios positivos y negativos."}
+    if carpeta is None:
+        from django.conf import settings
+        carpeta = os.path.join(settings.MODELS_DIR, CARPETA_CACHE)
+    os.makedirs(carpeta, exist_ok=True)
+
+    inicio = time.perf_counter()
+    rutas = preparar_caracteristicas(textos, etiquetas, configuraciones, carpeta)
+
+    procesos = procesos or os.cpu_count() or 1
+    hilos = max(1, (os.cpu_count() or 1) // procesos)
+    candidatas = [
+        {**configuracion, "id": numero, "val_loss": math.inf, "val_accuracy": 0.0, "epocas": 0, "detenida": False}
+        for numero, configuracion in enumerate(configuraciones)
+    ]
+
+    vivas = candidatas
+    presupuesto = min(epocas_minimas, epocas_maximas)
+    rondas = entrenamientos = 0
+    # "spawn": el proceso principal ya importo scikit-learn y no conviene copiarlo con fork
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as modelos, \
+            ProcessPoolExecutor(procesos, mp_context=contexto, initializer=_iniciar_proceso,
+                                initargs=(hilos,)) as pool:
+        while True:
+            # Las detenidas por early stopping ya no mejoran: conservan su resultado
+            pendientes = [c for c in vivas if not c["detenida"] and c["epocas"] < presupuesto]
+            tareas = [{
+                "datos": rutas[json.dumps(c["tfidf"], sort_keys=True)],
+                "red": c["red"],
+                "modelo": os.path.join(modelos, f"candidata_{c['id']}.keras"),
+                "epoca_inicial": c["epocas"],
+                "epocas": presupuesto,
+            } for c in pendientes]
+            for candidata, resultado in zip(pendientes, pool.map(entrenar_candidata, tareas)):
+                candidata.update(resultado)
+            rondas += 1
+            entrenamientos += len(tareas)
+            if informar is not None:
+                informar(rondas, presupuesto, vivas)
+
+            if presupuesto >= epocas_maximas or len(vivas) <= 1:
+                break
+            # Sigue solo el mejor 1/eta
+            vivas = sorted(vivas, key=lambda c: c["val_loss"])[:max(1, len(vivas) // eta)]
+            presupuesto = min(presupuesto * eta, epocas_maximas)
+
+    ranking = sorted(candidatas, key=lambda c: (-c["epocas"], c["val_loss"]))
+    ganadora = min(vivas, key=lambda c: c["val_loss"])
+    return {
+        "ok": True,
+        "ganadora": ganadora,
+        "ranking": ranking,
+        "rondas": rondas,
+        "entrenamientos": entrenamientos,
+        "epocas_totales": sum(c["epocas"] for c in candidatas),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+# Funcion que guarda la configuracion ganadora (la usan los entrenamientos completos siguientes)
+def guardar_configuracion(candidata):
+    from .modelo_sentimientos import CONFIGURACION_PATH, publicar_archivo
+
+    datos = {
+        "tfidf": candidata["tfidf"],
+        "red": candidata["red"],
+        "busqueda": {
+            "val_loss": candidata["val_loss"],
+            "val_accuracy": candidata["val_accuracy"],
+            "epocas": candidata["epocas"],
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    }
+
+    def escribir(ruta):
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo, indent=2)
+
+    publicar_archivo(CONFIGURACION_PATH, escribir)
@@ -0,0 +1,206 @@
+"""
+Carga masiva de comentarios desde un CSV (columnas fecha, texto, etiqueta) o
+desde un flujo JSON Lines (la API de ingesta de los kioscos, ver views.py).
+
+El CSV se lee de a bloques con pandas, los comentarios repetidos se descartan en
+memoria por su huella (hash del texto) y el resto se inserta de una vez por bloque.
+Si el comentario ya estaba en la base, la restriccion UNIQUE de huella lo descarta:
+no se hace una consulta por fila. Al final se buscan los casi duplicados entre los
+comentarios nuevos (ver duplicados.py).
+"""
+
+import datetime
+import hashlib
+import json
+import time
+
+from django.utils import timezone
+
+from ModeloSalud.carga_masiva import insertar_sin_duplicados
+
+from . import duplicados, tendencias
+from .contadores import invalidar_contadores
+from .models import Comment
+
+# Filas del CSV que se leen e insertan juntas
+TAMANO_BLOQUE = 50000
+
+ETIQUETAS_VALIDAS = {"positivo", "negativo"}
+
+# Lineas de JSON Lines que se insertan juntas
+TAMANO_LOTE_JSONL = 1000
+
+# Errores de lineas que se devuelven como ejemplo
+MAXIMO_ERRORES = 10
+
+
+# Funcion que calcula la huella de un comentario (se guarda en Comment.huella)
+def huella_texto(texto):
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cargar_comentarios_csv(ruta, tamano_bloque=TAMANO_BLOQUE, usar_copy=True, informar=None, casi_duplicados=True):
+    """
+    Carga los comentarios de un CSV sin duplicados
+
+    informar: funcion opcional que recibe (filas leidas, segundos) despues de cada bloque
+    casi_duplicados: agrupar los comentarios nuevos con sus casi duplicados al terminar
+    (si es False quedan pendientes para duplicados.registrar_pendientes())
+    """
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    leidas = invalidas = repetidas = insertadas = 0
+    vistas = set()
+
+    bloques = pd.read_csv(ruta, usecols=["fecha", "texto", "etiqueta"], dtype=str,
+                          keep_default_na=False, chunksize=tamano_bloque)
+    for bloque in bloques:
+        leidas += len(bloque)
+
+        textos = bloque["texto"].str.strip()
+        etiquetas = bloque["etiqueta"].str.strip().str.lower()
+        # Fechas normalizadas a "AAAA-MM-DD"; las que no se entienden quedan vacias
+        fechas = pd.to_datetime(bloque["fecha"], errors="coerce", format="%Y-%m-%d")
+        fechas = fechas.dt.strftime("%Y-%m-%d").astype(object).where(fechas.notna(), None)
+
+        validas = (textos != "") & etiquetas.isin(ETIQUETAS_VALIDAS)
+        invalidas += int((~validas).sum())
+
+        filas = []
+        for texto, etiqueta, fecha in zip(textos[validas], etiquetas[validas], fechas[validas]):
+            huella = huella_texto(texto)
+            if huella in vistas:
+                repetidas += 1
+                continue
+            vistas.add(huella)
+            filas.append((fecha, texto, etiqueta, huella))
+
+        insertadas += insertar_sin_duplicados(
+            Comment, ["fecha", "texto", "etiqueta", "huella"], filas, ["huella"], usar_copy=usar_copy,
+        )
+        if informar is not None:
+            informar(leidas, time.perf_counter() - inicio)
+
+    # Las inserciones masivas no envian senales: avisamos a mano a los contadores de la pagina
+    # principal y sumamos los comentarios nuevos al resumen de tendencias
+    invalidar_contadores()
+    tendencias.registrar_nuevos()
+
+    # Las cargas masivas tampoco pasan por la senal de duplicados: se revisan los nuevos aca
+    revision = duplicados.registrar_pendientes() if casi_duplicados else None
+
+    segundos = time.perf_counter() - inicio
+    resultado = {
+        "ok": True,
+        "leidas": leidas,
+        "insertadas": insertadas,
+        "repetidas_en_archivo": repetidas,
+        "invalidas": invalidas,
+        "total": Comment.objects.count(),
+        "segundos": segundos,
+        "filas_por_segundo": leidas / segundos if segundos > 0 else 0.0,
+    }
+    if revision is not None:
+        resultado["casi_duplicados"] = revision["casi_duplicados"]
+    return resultado
+
+
+# Funcion que lee una linea JSON {"texto": ..., "etiqueta": ..., "fecha": "AAAA-MM-DD"}
+# y devuelve (fecha, texto, etiqueta). La etiqueta es opcional (los kioscos no la
+# tienen: la pone la cola de puntuacion en etiqueta_predicha) y la fecha es hoy si no viene.
+def leer_linea_jsonl(linea, hoy):
+    try:
+        datos = json.loads(linea)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("no es JSON valido")
+    if not isinstance(datos, dict) or not isinstance(datos.get("texto"), str) or not datos["texto"].strip():
+        raise ValueError('falta "texto"')
+    etiqueta = datos.get("etiqueta") or ""
+    if not isinstance(etiqueta, str) or (etiqueta and etiqueta.strip().lower() not in ETIQUETAS_VALIDAS):
+        raise ValueError('"etiqueta" debe ser positivo o negativo')
+    fecha = datos.get("fecha") or hoy
+    try:
+        fecha = datetime.date.fromisoformat(fecha).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError('"fecha" debe ser AAAA-MM-DD')
+    return fecha, datos["texto"].strip(), etiqueta.strip().lower()
+
+
+def cargar_comentarios_jsonl(lineas, tamano_lote=TAMANO_LOTE_JSONL, al_insertar=None):
+    """
+    Carga comentarios desde un iterable de lineas JSON Lines (bytes o texto) sin duplicados
+
+    Las lineas se leen de a una (el cuerpo no se carga entero en memoria) y se
+    insertan de a tamano_lote. al_insertar recibe [(id, texto)] de los comentarios
+    nuevos de cada lote (sin prediccion todavia) y devuelve False si no los pudo
+    aceptar (cola llena): entonces se deja de leer y el resultado tiene
+    "completa": False y en "lineas" hasta donde se cargo. Las siguientes hay que
+    volver a enviarlas (reenviar las ya cargadas no las duplica).
+    """
+    inicio = time.perf_counter()
+    hoy = timezone.localdate().isoformat()
+    leidas = invalidas = repetidas = insertadas = 0
+    errores = []
+    completa = True
+    filas, vistas = [], set()
+
+    def insertar():
+        nonlocal insertadas, repetidas
+        nuevas = insertar_sin_duplicados(Comment, ["fecha", "texto", "etiqueta", "huella"], filas, ["huella"])
+        insertadas += nuevas
+        repetidas += len(filas) - nuevas
+        if al_insertar is None:
+            return True
+        # Los recien insertados (y los repetidos que aun no tienen prediccion)
+        pendientes = list(
+            Comment.objects.filter(huella__in=[fila[3] for fila in filas], modelo_version=None)
+            .values_list("pk", "texto")
+        )
+        return al_insertar(pendientes) is not False
+
+    for numero, linea in enumerate(lineas, 1):
+        if not linea.strip():
+            continue
+        leidas = numero
+        try:
+            fecha, texto, etiqueta = leer_linea_jsonl(linea, hoy)
+        except ValueError as error:
+            invalidas += 1
+            if len(errores) < MAXIMO_ERRORES:
+                errores.append(f"linea {numero}: {error}")
+            continue
+
+        huella = huella_texto(texto)
+        if huella in vistas:
+            repetidas += 1
+            continue
+        vistas.add(huella)
+        filas.append((fecha, texto, etiqueta, huella))
+
+        if len(filas) >= tamano_lote:
+            completa = insertar()
+            filas, vistas = [], set()
+            if not completa:
+                break
+
+    # Si el ultimo lote no entra en la cola igual quedo guardado (lo puntua puntuar_comentarios)
+    if filas:
+        insertar()
+
+    # Las inserciones masivas no envian senales (contadores, tendencias y casi duplicados: ver duplicados.py)
+    invalidar_contadores()
+    tendencias.registrar_nuevos()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "ok": True,
+        "completa": completa,
+        "lineas": leidas,
+        "insertadas": insertadas,
+        "repetidas": repetidas,
+        "invalidas": invalidas,
+        "errores": errores,
+        "segundos": segundos,
+        "lineas_por_segundo": leidas / segundos if segundos > 0 else 0.0,
+    }
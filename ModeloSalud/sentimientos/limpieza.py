@@ -0,0 +1,172 @@
+"""
+Limpieza (normalizacion) del texto de los comentarios.
+
+El mismo limpiar_texto se usa al entrenar y al predecir. Los patrones se compilan
+una sola vez al importar el modulo; para muchos textos, limpiar_textos reparte el
+trabajo entre varios procesos.
+
+El texto limpio de cada Comment se guarda en la base junto con un hash del texto
+original (hash_texto). Al re-entrenar solo se limpian los comentarios nuevos o
+editados (o todos, si cambia VERSION_LIMPIEZA).
+
+Este modulo no importa Django al cargarse: los procesos del pool solo necesitan
+las funciones de limpieza.
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Subir este numero si cambia la limpieza (patrones, stopwords o negaciones):
+# cambia el hash de todos los comentarios y se vuelven a limpiar al entrenar
+VERSION_LIMPIEZA = 1
+
+# Palabras sin valor en español ("el", "la", "de", etc.)
+# La lista viene incluida en el proyecto (es la misma de NLTK) para no
+# depender de nltk.download() ni de internet al arrancar
+STOPWORDS_PATH = os.path.join(os.path.dirname(__file__), "recursos", "stopwords_es.txt")
+
+
+def cargar_stopwords():
+    with open(STOPWORDS_PATH, encoding="utf-8") as archivo:
+        return {linea.strip() for linea in archivo if linea.strip()}
+
+
+STOPWORDS = cargar_stopwords()
+
+# Palabras de negacion importantes que NO debemos eliminar
+NEGACIONES = {"no", "poco", "nada", "nunca", "sin", "mal", "mala", "malo", "malas", "malos",
+              "pésimo", "pésima", "terrible", "horrible", "fatal"}
+
+# Palabras que se eliminan: stopwords que no son negaciones
+PALABRAS_QUITAR = frozenset(STOPWORDS - NEGACIONES)
+
+# Patrones compilados una sola vez
+PATRON_URL = re.compile(r"http\S+|www\S+")
+# Simbolos raros (emojis, puntuacion, etc): todo lo que no es letra, numero o espacio
+# Con "+" se reemplaza cada grupo de simbolos seguidos de una vez
+PATRON_SIMBOLOS = re.compile(r"[^a-záéíóúñü0-9\s]+")
+
+# Con menos textos que esto no vale la pena crear procesos
+MINIMO_PARA_PROCESOS = 20000
+
+# Textos que se mandan juntos a cada proceso
+TAMANO_PARTE = 10000
+
+
+# Funcion para limpiar el texto de los comentarios
+def limpiar_texto(texto):
+    # Paso 1: Convertir todo a minusculas
+    texto = texto.lower()
+
+    # Paso 2: Quitar URLs (http, www); la mayoria no tiene, asi que primero lo revisamos
+    if "http" in texto or "www" in texto:
+        texto = PATRON_URL.sub(" ", texto)
+
+    # Paso 3: Quitar simbolos raros, solo dejamos letras, numeros y espacios
+    texto = PATRON_SIMBOLOS.sub(" ", texto)
+
+    # Paso 4: Separar en palabras (esto tambien normaliza los espacios) y quitar
+    # las que no aportan nada (el, la, de, etc) PERO mantener negaciones importantes
+    return " ".join([palabra for palabra in texto.split() if palabra not in PALABRAS_QUITAR])
+
+
+def limpiar_lista(textos):
+    return [limpiar_texto(texto) for texto in textos]
+
+
+# Funcion para crear el pool de procesos de limpieza (None si se pide 1 proceso)
+def crear_pool(procesos=None):
+    procesos = procesos or min(4, os.cpu_count() or 1)
+    return ProcessPoolExecutor(procesos) if procesos > 1 else None
+
+
+def limpiar_textos(textos, pool=None, procesos=None):
+    """
+    Limpia muchos textos y devuelve la lista de textos limpios (en el mismo orden)
+
+    Si son muchos, se reparten en partes entre los procesos del pool; si no se
+    pasa un pool, se crea uno solo para esta llamada (procesos=1 lo evita).
+    """
+    textos = [str(texto) for texto in textos]
+    if len(textos) < MINIMO_PARA_PROCESOS or (pool is None and procesos == 1):
+        return limpiar_lista(textos)
+
+    partes = [textos[inicio:inicio + TAMANO_PARTE] for inicio in range(0, len(textos), TAMANO_PARTE)]
+    pool_propio = pool is None
+    if pool_propio:
+        pool = crear_pool(procesos)
+        if pool is None:
+            return limpiar_lista(textos)
+    try:
+        limpios = []
+        for parte in pool.map(limpiar_lista, partes):
+            limpios.extend(parte)
+        return limpios
+    finally:
+        if pool_propio:
+            pool.shutdown()
+
+
+# Funcion que calcula el hash del texto original (incluye la version de la limpieza)
+def hash_texto(texto):
+    contenido = f"{VERSION_LIMPIEZA}\n{texto}".encode("utf-8")
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+# Funcion que guarda (texto_limpio, hash_texto, id) con actualizar_por_id (pocas sentencias
+# por bloque; bulk_update arma un CASE por fila y es mucho mas lento, ver ModeloSalud/carga_masiva.py)
+def _guardar_limpios(filas):
+    from ModeloSalud.carga_masiva import actualizar_por_id
+    from .models import Comment
+
+    actualizar_por_id(Comment, ["texto_limpio", "hash_texto"], filas)
+
+
+def actualizar_textos_limpios(tamano_bloque=50000, procesos=None, hasta=None):
+    """
+    Guarda texto_limpio en los comentarios nuevos o editados desde la ultima vez
+
+    Recorre la tabla por id en bloques, compara el hash del texto con el guardado
+    y solo limpia los que no coinciden. Devuelve cuantos comentarios se limpiaron.
+    hasta: ultimo id que se revisa (por defecto toda la tabla)
+    """
+    from .models import Comment
+
+    comentarios = Comment.objects.all() if hasta is None else Comment.objects.filter(pk__lte=hasta)
+    actualizados = 0
+    ultimo_id = 0
+    pool = None
+    try:
+        while True:
+            bloque = list(
+                comentarios.filter(pk__gt=ultimo_id).order_by("pk")
+                .values_list("pk", "texto", "hash_texto")[:tamano_bloque]
+            )
+            if not bloque:
+                break
+            ultimo_id = bloque[-1][0]
+
+            pendientes = []
+            for pk, texto, hash_guardado in bloque:
+                hash_actual = hash_texto(texto)
+                if hash_actual != hash_guardado:
+                    pendientes.append((pk, texto, hash_actual))
+            if not pendientes:
+                continue
+
+            # El pool se crea una sola vez, recien cuando hay muchos textos que limpiar
+            if pool is None and len(pendientes) >= MINIMO_PARA_PROCESOS:
+                pool = crear_pool(procesos)
+            limpios = limpiar_textos([texto for _, texto, _ in pendientes], pool, procesos)
+
+            _guardar_limpios([
+                (limpio, hash_actual, pk)
+                for (pk, _, hash_actual), limpio in zip(pendientes, limpios)
+            ])
+            actualizados += len(pendientes)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return actualizados
@@ -0,0 +1,107 @@
+"""
+Agrupacion de predicciones concurrentes (micro-batching).
+
+Cuando llegan muchas peticiones a la vez, predecir cada comentario por separado
+desperdicia la red neuronal: hace una llamada por fila. Este agrupador junta los
+comentarios que llegan dentro de unos pocos milisegundos y los procesa en un
+solo lote (una sola vectorizacion y una sola llamada al modelo).
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class AgrupadorPredicciones:
+    """
+    Junta peticiones concurrentes y las procesa en lotes en un hilo de fondo
+
+    Parametros:
+    - procesar: funcion que recibe una lista de textos y devuelve una lista de resultados
+    - lote_maximo: cantidad maxima de textos por lote
+    - espera_maxima: segundos que se espera a que lleguen mas textos despues del primero
+    - cola_maxima: textos que pueden esperar en la cola (0 = sin limite)
+    """
+
+    def __init__(self, procesar, lote_maximo=64, espera_maxima=0.005, cola_maxima=0):
+        self._procesar = procesar
+        self.lote_maximo = max(1, int(lote_maximo))
+        self.espera_maxima = max(0.0, float(espera_maxima))
+        self.cola_maxima = max(0, int(cola_maxima))
+        self._lock = threading.Lock()
+        self._cola = None
+        self._hilo = None
+        self._pid = None
+
+    def _asegurar_hilo(self):
+        # Despues de un fork (gunicorn --preload) el hilo no existe en el proceso hijo,
+        # asi que se crea uno nuevo por proceso
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return self._cola
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+                self._cola = queue.Queue(self.cola_maxima)
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(
+                    target=self._bucle, args=(self._cola,),
+                    name="agrupador-sentimientos", daemon=True,
+                )
+                self._hilo.start()
+            return self._cola
+
+    def enviar(self, texto):
+        """
+        Agrega un texto a la cola y devuelve un Future con su resultado
+
+        Lanza queue.Full si ya hay cola_maxima textos esperando.
+        """
+        futuro = Future()
+        self._asegurar_hilo().put_nowait((texto, futuro))
+        return futuro
+
+    def predecir(self, texto, timeout=None):
+        """
+        Envia un texto y espera su resultado hasta timeout segundos (None: sin limite)
+
+        Lanza TimeoutError si no llega a tiempo.
+        """
+        return self.enviar(texto).result(timeout)
+
+    def _juntar_lote(self, cola):
+        # Esperamos el primer texto sin limite de tiempo
+        lote = [cola.get()]
+        limite = time.monotonic() + self.espera_maxima
+
+        # Seguimos juntando hasta llenar el lote o agotar la espera
+        while len(lote) < self.lote_maximo:
+            restante = limite - time.monotonic()
+            try:
+                if restante > 0:
+                    lote.append(cola.get(timeout=restante))
+                else:
+                    lote.append(cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self, cola):
+        while True:
+            lote = self._juntar_lote(cola)
+            textos = [texto for texto, _ in lote]
+            try:
+                resultados = self._procesar(textos)
+                for (_, futuro), resultado in zip(lote, resultados):
+                    if not futuro.done():
+                        futuro.set_result(resultado)
+            except Exception as error:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+            finally:
+                # Ningun texto queda esperando: si procesar devolvio menos resultados o
+                # se corto con un BaseException, los que faltan terminan con error
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(RuntimeError("El lote no devolvio resultado para este texto"))
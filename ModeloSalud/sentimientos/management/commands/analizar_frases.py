@@ -0,0 +1,48 @@
+"""
+Calcula las frases (n-gramas del vocabulario del modelo) que mas se asocian a
+comentarios positivos y negativos y las guarda en la tabla FraseSentimiento
+(la lee la API /api/frases/).
+
+Solo vectoriza los comentarios nuevos desde la ultima vez: las matrices se
+guardan en disco por version del modelo (ver sentimientos/frases.py).
+
+Uso:
+    python manage.py analizar_frases
+    python manage.py analizar_frases --motor lineal --mostrar 20
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sentimientos import frases, modelo_sentimientos
+
+
+class Command(BaseCommand):
+    help = 'Calcula las frases que explican el sentimiento de los comentarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--motor', choices=sorted(modelo_sentimientos.MOTORES),
+                            help='Motor cuyo vocabulario se usa (por defecto SENTIMIENTOS_MOTOR)')
+        parser.add_argument('--minimo', type=int, default=frases.MINIMO_COMENTARIOS,
+                            help='Comentarios en los que tiene que aparecer una frase para guardarla')
+        parser.add_argument('--tamano-bloque', type=int, default=frases.TAMANO_BLOQUE,
+                            help='Comentarios que se vectorizan y guardan juntos')
+        parser.add_argument('--mostrar', type=int, default=10,
+                            help='Frases de cada sentimiento que se muestran al terminar')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1 or options['minimo'] < 1:
+            raise CommandError('--tamano-bloque y --minimo deben ser mayores que 0.')
+
+        resultado = frases.analizar(options['motor'], options['tamano_bloque'], options['minimo'])
+        if not resultado['ok']:
+            raise CommandError(resultado['error'])
+
+        for buscado in ('negativo', 'positivo'):
+            self.stdout.write(f'Frases {buscado}s:')
+            for frase in frases.principales(buscado, options['mostrar']):
+                self.stdout.write(f"  {frase['frase']:<40} z={frase['z']:7.2f} "
+                                  f"({frase['positivos']} positivos, {frase['negativos']} negativos)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['frases']} frases de {resultado['comentarios']} comentarios "
+            f"({resultado['nuevos']} vectorizados ahora) en {resultado['segundos']:.1f}s"
+        ))
@@ -0,0 +1,105 @@
+"""
+Busca los mejores hiperparametros de la red de sentimientos (TF-IDF, capas,
+dropout, learning rate, tamaño de lote) con los comentarios de la base.
+
+Prueba las configuraciones en paralelo (un proceso por CPU) con successive
+halving y early stopping, y guarda la ganadora en sentiment_configuracion.json:
+el siguiente entrenamiento completo la usa.
+
+Uso:
+    python manage.py buscar_hiperparametros
+    python manage.py buscar_hiperparametros --configuraciones 0 --procesos 8
+    python manage.py buscar_hiperparametros --comentarios 20000 --entrenar
+"""
+
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from sentimientos import duplicados, hiperparametros, limpieza, reentrenamiento
+from sentimientos.models import Comment
+
+
+class Command(BaseCommand):
+    help = 'Busca los mejores hiperparametros de la red de sentimientos y guarda la configuracion ganadora'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--configuraciones', type=int, default=27,
+                            help='Configuraciones al azar de la grilla (0 = la grilla completa)')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Procesos que entrenan en paralelo')
+        parser.add_argument('--eta', type=int, default=hiperparametros.ETA,
+                            help='En cada ronda sigue 1 de cada ETA configuraciones')
+        parser.add_argument('--epocas-minimas', type=int, default=hiperparametros.EPOCAS_MINIMAS,
+                            help='Epocas de la primera ronda')
+        parser.add_argument('--epocas-maximas', type=int, default=hiperparametros.EPOCAS_MAXIMAS,
+                            help='Maximo de epocas por configuracion')
+        parser.add_argument('--comentarios', type=int,
+                            help='Usar solo esta cantidad de comentarios al azar (busqueda mas rapida)')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--no-guardar', action='store_true',
+                            help='Solo mostrar la ganadora, sin guardarla')
+        parser.add_argument('--entrenar', action='store_true',
+                            help='Al terminar, entrenar desde cero con la configuracion ganadora')
+
+    def handle(self, *args, **options):
+        if options['procesos'] < 1 or options['eta'] < 2 or options['epocas_minimas'] < 1:
+            raise CommandError('--procesos y --epocas-minimas deben ser mayores que 0 y --eta mayor que 1.')
+
+        # Limpiar solo los comentarios nuevos o editados (el resto ya tiene texto_limpio)
+        limpieza.actualizar_textos_limpios()
+        # Los casi duplicados y los comentarios sin etiqueta no se usan (igual que al entrenar)
+        duplicados.registrar_pendientes()
+        filas = list(Comment.objects.filter(duplicado_de=None, etiqueta__in=reentrenamiento.ETIQUETAS)
+                     .order_by('pk').values_list('texto_limpio', 'etiqueta'))
+        if options['comentarios'] and options['comentarios'] < len(filas):
+            rng = np.random.default_rng(options['semilla'])
+            filas = [filas[i] for i in sorted(rng.choice(len(filas), options['comentarios'], replace=False))]
+        if len(filas) < 10:
+            raise CommandError('Se necesitan al menos 10 comentarios.')
+        textos = [texto for texto, _ in filas]
+        etiquetas = [1 if etiqueta == 'positivo' else 0 for _, etiqueta in filas]
+
+        configuraciones = hiperparametros.generar_configuraciones(
+            muestras=options['configuraciones'] or None, semilla=options['semilla'],
+        )
+        self.stdout.write(f'{len(configuraciones)} configuraciones, {len(filas)} comentarios, '
+                          f"{options['procesos']} procesos")
+
+        def informar(ronda, epocas, vivas):
+            mejor = min(vivas, key=lambda c: c['val_loss'])
+            self.stdout.write(f'Ronda {ronda}: {len(vivas)} configuraciones hasta {epocas} epocas, '
+                              f"mejor val_loss {mejor['val_loss']:.4f}")
+
+        resultado = hiperparametros.buscar(
+            textos, etiquetas, configuraciones,
+            procesos=options['procesos'],
+            eta=options['eta'],
+            epocas_minimas=options['epocas_minimas'],
+            epocas_maximas=options['epocas_maximas'],
+            informar=informar,
+        )
+        if not resultado['ok']:
+            raise CommandError(resultado['error'])
+
+        ganadora = resultado['ganadora']
+        self.stdout.write(self.style.SUCCESS(
+            f"Ganadora: TF-IDF {ganadora['tfidf']}, red {ganadora['red']}\n"
+            f"val_loss {ganadora['val_loss']:.4f}, val_accuracy {ganadora['val_accuracy']:.2%} "
+            f"({ganadora['epocas']} epocas). {resultado['entrenamientos']} entrenamientos, "
+            f"{resultado['epocas_totales']} epocas en total, {resultado['segundos']:.0f}s"
+        ))
+
+        if options['no_guardar']:
+            return
+        hiperparametros.guardar_configuracion(ganadora)
+        self.stdout.write('Configuracion guardada.')
+
+        if options['entrenar']:
+            entrenamiento = reentrenamiento.reentrenar('completo', 'mlp')
+            if not entrenamiento['ok']:
+                raise CommandError(entrenamiento['error'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Modelo entrenado con la configuracion ganadora. Accuracy: {entrenamiento['accuracy_test']:.2%}"
+            ))
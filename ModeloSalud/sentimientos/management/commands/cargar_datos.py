@@ -0,0 +1,76 @@
+"""
+Carga los comentarios y la demanda desde los CSV, sin preguntar nada.
+
+Lee los CSV de a bloques, descarta las filas repetidas (en el archivo y las que ya
+estan en la base) e inserta cada bloque de una vez (COPY en PostgreSQL). Se puede
+correr varias veces: solo agrega lo que falta. Al final agrupa los comentarios
+nuevos que son casi duplicados de otros (ver sentimientos/duplicados.py).
+
+Uso:
+    python manage.py cargar_datos
+    python manage.py cargar_datos --comentarios otros_comentarios.csv --tamano-bloque 100000
+    python manage.py cargar_datos --demanda Datos_Demanda_Pacientes.csv --sin-copy
+    python manage.py cargar_datos --sin-casi-duplicados   (revisarlos despues con deduplicar_comentarios)
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from prediccion import ingesta as ingesta_demanda
+from sentimientos import ingesta as ingesta_comentarios
+
+# Los CSV del proyecto estan en la raiz del repositorio
+COMENTARIOS_CSV = os.path.join(settings.BASE_DIR, "..", "Comentarios_de_pacientes.csv")
+DEMANDA_CSV = os.path.join(settings.BASE_DIR, "..", "Datos_Demanda_Pacientes.csv")
+
+
+class Command(BaseCommand):
+    help = 'Carga comentarios y demanda de pacientes desde CSV (en bloques y sin duplicados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comentarios', metavar='CSV',
+                            help='CSV de comentarios (fecha, texto, etiqueta)')
+        parser.add_argument('--demanda', metavar='CSV',
+                            help='CSV de demanda (fecha, dia_semana, mes, pacientes, es_feriado)')
+        parser.add_argument('--tamano-bloque', type=int, default=ingesta_comentarios.TAMANO_BLOQUE,
+                            help='Filas del CSV que se leen e insertan juntas')
+        parser.add_argument('--sin-copy', action='store_true',
+                            help='En PostgreSQL, insertar con executemany en vez de COPY')
+        parser.add_argument('--sin-casi-duplicados', action='store_true',
+                            help='No buscar los comentarios casi duplicados al terminar')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que 0.')
+
+        # Sin archivos elegidos se cargan los dos CSV del proyecto
+        cargas = []
+        if options['comentarios'] or not options['demanda']:
+            cargas.append(('comentarios', options['comentarios'] or COMENTARIOS_CSV,
+                           ingesta_comentarios.cargar_comentarios_csv,
+                           {'casi_duplicados': not options['sin_casi_duplicados']}))
+        if options['demanda'] or not options['comentarios']:
+            cargas.append(('demanda', options['demanda'] or DEMANDA_CSV,
+                           ingesta_demanda.cargar_demanda_csv, {}))
+
+        for nombre, ruta, cargar, extra in cargas:
+            if not os.path.exists(ruta):
+                raise CommandError(f'No se encontro el archivo: {ruta}')
+
+            def informar(leidas, segundos):
+                self.stdout.write(f'{leidas} filas leidas ({leidas / segundos if segundos else 0:.0f} filas/s)')
+
+            self.stdout.write(f'Cargando {nombre} desde {ruta}')
+            resultado = cargar(ruta, tamano_bloque=options['tamano_bloque'],
+                               usar_copy=not options['sin_copy'], informar=informar, **extra)
+            self.stdout.write(self.style.SUCCESS(
+                f"{nombre}: {resultado['insertadas']} nuevas de {resultado['leidas']} filas "
+                f"({resultado['repetidas_en_archivo']} repetidas en el archivo, "
+                f"{resultado['invalidas']} invalidas), {resultado['total']} en total. "
+                f"{resultado['segundos']:.1f}s ({resultado['filas_por_segundo']:.0f} filas/s)"
+            ))
+            if 'casi_duplicados' in resultado:
+                self.stdout.write(f"{resultado['casi_duplicados']} comentarios nuevos son casi duplicados "
+                                  f"de otros (no se usan para entrenar)")
@@ -0,0 +1,93 @@
+"""
+Corre la suite de benchmarks (ver benchmarks/suite.py), imprime el resultado en
+JSON y lo compara con la linea base guardada (benchmarks/linea_base.json).
+Si alguna medicion empeora mas que la tolerancia, termina con error.
+
+Los numeros dependen de la maquina: generar la linea base con --guardar-linea-base
+en la misma maquina (o tipo de runner de CI) con la que se va a comparar.
+
+Uso:
+    python manage.py correr_benchmarks
+    python manage.py correr_benchmarks --rapido --grupos rutas,demanda,ingesta
+    python manage.py correr_benchmarks --salida resultado.json --tolerancia 0.3
+    python manage.py correr_benchmarks --guardar-linea-base
+    python manage.py correr_benchmarks --grupos motores --motores mlp,numpy,lineal
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import suite
+from sentimientos import modelo_sentimientos
+
+
+class Command(BaseCommand):
+    help = 'Mide el rendimiento del proyecto y lo compara con la linea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grupos', default=','.join(suite.GRUPOS_POR_DEFECTO),
+                            help=f'Grupos separados por coma: {", ".join(suite.GRUPOS)}')
+        parser.add_argument('--rapido', action='store_true',
+                            help='Tamaños chicos (grafos de hasta 10^4 nodos, menos filas), para CI')
+        parser.add_argument('--motores',
+                            help='Motores de sentimiento separados por coma (grupos sentimiento, '
+                                 'entrenamiento y motores)')
+        parser.add_argument('--salida', metavar='JSON', help='Archivo donde guardar el resultado')
+        parser.add_argument('--linea-base', metavar='JSON', default=suite.LINEA_BASE_PATH,
+                            help='Linea base con la que se compara')
+        parser.add_argument('--guardar-linea-base', action='store_true',
+                            help='Guardar este resultado como linea base en vez de comparar')
+        parser.add_argument('--tolerancia', type=float, default=suite.TOLERANCIA,
+                            help='Cambio relativo (0.25 = 25%%) a partir del que hay regresion')
+
+    def handle(self, *args, **options):
+        grupos = [grupo.strip() for grupo in options['grupos'].split(',') if grupo.strip()]
+        desconocidos = [grupo for grupo in grupos if grupo not in suite.GRUPOS]
+        if not grupos or desconocidos:
+            raise CommandError(f'Grupos desconocidos: {", ".join(desconocidos)}. '
+                               f'Disponibles: {", ".join(suite.GRUPOS)}')
+        motores = None
+        if options['motores']:
+            motores = [motor.strip() for motor in options['motores'].split(',')]
+            desconocidos = [motor for motor in motores if motor not in modelo_sentimientos.MOTORES]
+            if desconocidos:
+                raise CommandError(f'Motores desconocidos: {", ".join(desconocidos)}')
+        if options['tolerancia'] < 0:
+            raise CommandError('--tolerancia no puede ser negativa.')
+
+        def informar(grupo, mediciones):
+            self.stderr.write(f'{grupo}: {len(mediciones)} mediciones')
+
+        resultado = suite.correr(grupos, options['rapido'], motores, informar)
+        for grupo, motivo in resultado['omitidos'].items():
+            self.stderr.write(self.style.WARNING(f'{grupo} omitido: {motivo}'))
+
+        if options['guardar_linea_base']:
+            suite.guardar_linea_base(resultado, options['linea_base'])
+            self.stderr.write(self.style.SUCCESS(f'Linea base guardada en {options["linea_base"]}'))
+            regresiones = []
+        else:
+            linea_base = suite.leer_linea_base(options['linea_base'])
+            if linea_base is None:
+                self.stderr.write(self.style.WARNING(
+                    f'No hay linea base en {options["linea_base"]} (crearla con --guardar-linea-base)'))
+                resultado['comparacion'] = []
+            else:
+                if linea_base.get('rapido') != resultado['rapido']:
+                    self.stderr.write(self.style.WARNING('La linea base se hizo con otro valor de --rapido'))
+                resultado['comparacion'] = suite.comparar(resultado, linea_base, options['tolerancia'])
+            regresiones = [c for c in resultado['comparacion'] if c['estado'] == 'regresion']
+
+        if options['salida']:
+            suite.guardar_json(options['salida'], resultado)
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+        for comparacion in resultado.get('comparacion', []):
+            if comparacion['estado'] != 'igual':
+                cambio = '' if comparacion['cambio'] is None else f" ({comparacion['cambio']:+.0%})"
+                self.stderr.write(f"{comparacion['estado']}: {comparacion['nombre']} "
+                                  f"{comparacion['base']:.4g} -> {comparacion['actual']:.4g}{cambio}")
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} mediciones empeoraron mas de {options["tolerancia"]:.0%}.')
+        self.stderr.write(self.style.SUCCESS(f'{len(resultado["mediciones"])} mediciones sin regresiones'))
@@ -0,0 +1,49 @@
+"""
+Busca los comentarios casi duplicados (MinHash + LSH) y los agrupa con su
+representante: los casi duplicados no se usan para entrenar.
+
+Revisa solo los comentarios que todavia no tienen firma, asi que se puede cortar
+y volver a correr. Con --reiniciar borra los grupos y revisa toda la tabla
+(por ejemplo para usar otro --umbral).
+
+Uso:
+    python manage.py deduplicar_comentarios
+    python manage.py deduplicar_comentarios --reiniciar --umbral 0.8
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sentimientos import duplicados
+
+
+class Command(BaseCommand):
+    help = 'Agrupa los comentarios casi duplicados para no usarlos al entrenar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Borrar las firmas y los grupos y revisar todos los comentarios')
+        parser.add_argument('--umbral', type=float, default=duplicados.UMBRAL,
+                            help='Similitud estimada (0 a 1) desde la que un comentario es casi duplicado')
+        parser.add_argument('--tamano-bloque', type=int, default=duplicados.TAMANO_BLOQUE,
+                            help='Comentarios que se revisan y guardan juntos')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1 or not 0 < options['umbral'] <= 1:
+            raise CommandError('--tamano-bloque debe ser mayor que 0 y --umbral estar entre 0 y 1.')
+
+        if options['reiniciar']:
+            duplicados.reiniciar()
+            self.stdout.write('Firmas y grupos borrados')
+
+        def informar(revisados, casi_duplicados):
+            self.stdout.write(f'{revisados} comentarios revisados ({casi_duplicados} casi duplicados)')
+
+        resultado = duplicados.registrar_pendientes(
+            tamano_bloque=options['tamano_bloque'], umbral=options['umbral'], informar=informar,
+        )
+        resumen = duplicados.resumen()
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['revisados']} comentarios revisados en {resultado['segundos']:.1f}s. "
+            f"De {resumen['total']} comentarios, {resumen['casi_duplicados']} son casi duplicados: "
+            f"se entrena con {resumen['unicos']}."
+        ))
@@ -0,0 +1,44 @@
+"""
+Entrena el modelo de sentimientos con los comentarios de la base y lo publica.
+
+Por defecto es incremental: si ya hay un modelo, sigue entrenandolo solo con los
+comentarios nuevos (mas una muestra de los anteriores). Pensado para correrlo
+seguido (por ejemplo con cron); si no hay comentarios nuevos no hace nada.
+
+Uso:
+    python manage.py entrenar_sentimientos
+    python manage.py entrenar_sentimientos --modo completo
+    python manage.py entrenar_sentimientos --modo incremental --motor numpy
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sentimientos import modelo_sentimientos, reentrenamiento
+
+
+class Command(BaseCommand):
+    help = 'Entrena el modelo de sentimientos (incremental si conviene) y publica la nueva version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', choices=reentrenamiento.MODOS, default='auto',
+                            help='auto: incremental si conviene; completo: desde cero')
+        parser.add_argument('--motor', choices=sorted(modelo_sentimientos.MOTORES),
+                            help='Motor a usar (por defecto SENTIMIENTOS_MOTOR)')
+
+    def handle(self, *args, **options):
+        resultado = reentrenamiento.reentrenar(options['modo'], options['motor'])
+        if not resultado['ok']:
+            raise CommandError(resultado['error'])
+        if resultado.get('sin_cambios'):
+            self.stdout.write('No hay comentarios nuevos: el modelo ya esta al dia.')
+            return
+
+        if resultado['incremental']:
+            tipo = f"incremental con {resultado['nuevos']} comentarios nuevos"
+        else:
+            tipo = f"completo ({resultado['motivo']})"
+        self.stdout.write(self.style.SUCCESS(
+            f"Modelo {resultado['motor']} entrenado: {tipo}, {resultado['comentarios']} comentarios, "
+            f"{resultado['segundos_entrenamiento']:.1f}s de entrenamiento. "
+            f"Accuracy: {resultado['accuracy_test']:.2%}"
+        ))
@@ -0,0 +1,38 @@
+"""
+Exporta la red de sentimientos ya publicada al formato del runtime NumPy
+(pesos float32 y pesos cuantizados a int8).
+
+Los entrenamientos nuevos ya exportan el .npz solos; este comando sirve para
+modelos entrenados antes de existir el runtime NumPy, o para regenerar los .npz
+cuando cambia su formato. Al terminar publica una version nueva del modelo.
+
+Uso:
+    python manage.py exportar_numpy
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sentimientos import modelo_sentimientos, runtime_numpy
+
+
+class Command(BaseCommand):
+    help = ('Exporta sentiment_model.h5 + vectorizador a sentiment_model.npz y '
+            'sentiment_model_int8.npz (inferencia sin TensorFlow)')
+
+    def handle(self, *args, **options):
+        motor = modelo_sentimientos.obtener_motor('mlp')
+        if not modelo_sentimientos.modelo_disponible(motor):
+            raise CommandError('No hay un modelo entrenado para exportar.')
+
+        modelo, vectorizador = modelo_sentimientos.leer_modelo(motor)
+        for ruta, cuantizar in ((motor.npz_path, False), (motor.int8_path, True)):
+            modelo_sentimientos.publicar_archivo(
+                ruta,
+                lambda destino: runtime_numpy.exportar(modelo, vectorizador, destino, cuantizar=cuantizar),
+            )
+            self.stdout.write(self.style.SUCCESS(f'Modelo exportado a {ruta}'))
+
+        # El motor numpy comparte el archivo de version del mlp: con una version nueva
+        # los procesos del servidor recargan los .npz (y las predicciones viejas se recalculan)
+        version = modelo_sentimientos.publicar_version(motor)
+        self.stdout.write(self.style.SUCCESS(f'Version publicada: {version}'))
@@ -0,0 +1,50 @@
+"""
+Guarda la prediccion del modelo (etiqueta, confianza y version) en los comentarios
+que no la tienen o que la tienen de una version anterior del modelo.
+
+Se puede cortar y volver a correr: sigue con los comentarios que faltan.
+
+Uso:
+    python manage.py puntuar_comentarios
+    python manage.py puntuar_comentarios --motor numpy --procesos 4 --tamano-bloque 5000
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sentimientos import modelo_sentimientos, puntuacion
+
+
+class Command(BaseCommand):
+    help = 'Predice el sentimiento de los comentarios pendientes y lo guarda en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--motor', choices=sorted(modelo_sentimientos.MOTORES),
+                            help='Motor a usar (por defecto SENTIMIENTOS_MOTOR)')
+        parser.add_argument('--tamano-bloque', type=int, default=puntuacion.TAMANO_BLOQUE,
+                            help='Comentarios que se leen, predicen y guardan juntos')
+        parser.add_argument('--procesos', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Procesos que predicen en paralelo (1 = sin pool)')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1 or options['procesos'] < 1:
+            raise CommandError('--tamano-bloque y --procesos deben ser mayores que 0.')
+
+        def informar(puntuados, ultimo_id):
+            self.stdout.write(f'{puntuados} comentarios puntuados (ultimo id {ultimo_id})')
+
+        resultado = puntuacion.puntuar_pendientes(
+            motor=options['motor'],
+            tamano_bloque=options['tamano_bloque'],
+            procesos=options['procesos'],
+            informar=informar,
+        )
+        if not resultado['ok']:
+            raise CommandError(resultado['error'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['puntuados']} comentarios puntuados con {resultado['motor']} "
+            f"(version {resultado['version']}) en {resultado['segundos']:.1f}s "
+            f"({resultado['comentarios_por_segundo']:.0f} comentarios/s)"
+        ))
@@ -0,0 +1,26 @@
+"""
+Vuelve a calcular el resumen de tendencias (comentarios por dia, semana y mes y
+sentimiento) con todos los comentarios. Hace falta despues de cargar o cambiar
+comentarios sin pasar por save() ni por las cargas del proyecto (por ejemplo
+con update() o SQL directo), o la primera vez despues de migrar.
+
+Uso:
+    python manage.py reconstruir_tendencias
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from sentimientos import tendencias
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen de tendencias de sentimiento con todos los comentarios'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = tendencias.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen de tendencias reconstruido: {filas} filas en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='confianza_predicha',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='etiqueta_predicha',
+            field=models.CharField(blank=True, choices=[('positivo', 'positivo'), ('negativo', 'negativo')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='modelo_version',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Indices de busqueda de texto (solo PostgreSQL; en otras bases se usa el indice en memoria)
+
+from django.db import migrations
+
+CREAR_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Columna tsvector que PostgreSQL mantiene sola al insertar o editar el texto
+    "ALTER TABLE sentimientos_comment ADD COLUMN busqueda tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(texto, ''))) STORED",
+    "CREATE INDEX sentimientos_comment_busqueda_gin ON sentimientos_comment USING GIN (busqueda)",
+    # Trigramas: permiten que ILIKE '%texto%' use un indice
+    "CREATE INDEX sentimientos_comment_texto_trgm ON sentimientos_comment USING GIN (texto gin_trgm_ops)",
+]
+
+BORRAR_POSTGRES = [
+    "DROP INDEX IF EXISTS sentimientos_comment_texto_trgm",
+    "DROP INDEX IF EXISTS sentimientos_comment_busqueda_gin",
+    "ALTER TABLE sentimientos_comment DROP COLUMN IF EXISTS busqueda",
+]
+
+
+def ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sentencia in sentencias:
+            schema_editor.execute(sentencia)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0002_prediccion_comentarios'),
+    ]
+
+    operations = [
+        migrations.RunPython(ejecutar(CREAR_POSTGRES), ejecutar(BORRAR_POSTGRES)),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0003_busqueda_texto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='hash_texto',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='texto_limpio',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
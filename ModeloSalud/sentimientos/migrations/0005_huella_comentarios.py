@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:25
+
+import hashlib
+
+from django.db import migrations, models
+
+
+# Calcula la huella de los comentarios que ya estaban cargados
+# (la misma formula que sentimientos.ingesta.huella_texto, que recibe el texto sin
+# espacios al principio ni al final)
+# Si hay textos repetidos, solo el primero recibe huella: los demas quedan en NULL
+def calcular_huellas(apps, schema_editor):
+    Comment = apps.get_model('sentimientos', 'Comment')
+    vistas = set()
+    filas = []
+    for pk, texto in Comment.objects.order_by('pk').values_list('pk', 'texto').iterator(chunk_size=5000):
+        huella = hashlib.blake2b(texto.strip().encode('utf-8'), digest_size=16).hexdigest()
+        if huella not in vistas:
+            vistas.add(huella)
+            filas.append((huella, pk))
+
+    tabla = schema_editor.quote_name(Comment._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f'UPDATE {tabla} SET huella = %s WHERE id = %s', filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0004_texto_limpio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='huella',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+        migrations.RunPython(calcular_huellas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0005_huella_comentarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BandaLSH',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.BigIntegerField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='duplicado_de',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicados', to='sentimientos.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('minhash__isnull', True)), fields=['id'], name='comment_sin_minhash'),
+        ),
+        migrations.AddField(
+            model_name='bandalsh',
+            name='comentario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bandas_lsh', to='sentimientos.comment'),
+        ),
+    ]
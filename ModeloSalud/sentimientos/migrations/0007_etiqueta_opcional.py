@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0006_casi_duplicados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='etiqueta',
+            field=models.CharField(blank=True, choices=[('positivo', 'positivo'), ('negativo', 'negativo')], max_length=10),
+        ),
+    ]
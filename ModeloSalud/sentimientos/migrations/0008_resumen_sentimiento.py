@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0007_etiqueta_opcional'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgresoResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenSentimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('dia', 'dia'), ('semana', 'semana'), ('mes', 'mes')], max_length=6)),
+                ('inicio', models.DateField()),
+                ('sentimiento', models.CharField(choices=[('positivo', 'positivo'), ('negativo', 'negativo')], max_length=10)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'inicio', 'sentimiento'), name='resumen_periodo_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0008_resumen_sentimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FraseSentimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo_version', models.CharField(max_length=64)),
+                ('frase', models.CharField(max_length=200)),
+                ('positivos', models.IntegerField()),
+                ('negativos', models.IntegerField()),
+                ('log_odds', models.FloatField()),
+                ('z', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+# Los comentarios hasta el ultimo id que ya se habia sumado quedan marcados como sumados
+def marcar_sumados(apps, schema_editor):
+    Comment = apps.get_model('sentimientos', 'Comment')
+    ProgresoResumen = apps.get_model('sentimientos', 'ProgresoResumen')
+    ultimo_id = ProgresoResumen.objects.filter(pk=1).values_list('ultimo_id', flat=True).first() or 0
+    Comment.objects.filter(pk__lte=ultimo_id).update(en_resumen=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentimientos', '0009_frases_sentimiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='en_resumen',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(marcar_sumados, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='progresoresumen',
+            name='ultimo_id',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('en_resumen', False)), fields=['id'], name='comment_sin_resumen'),
+        ),
+    ]
@@ -1,153 +1,239 @@
-import re
+import json
 import os
-import joblib
-import pandas as pd
+import queue
+import threading
+import time
+import numpy as np
 from django.conf import settings
 import base64
+from functools import partial
 from io import BytesIO
 
-# Importar TensorFlow para la red neuronal
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
+from ModeloSalud import ejecucion, metricas
 
-# NLTK para limpiar el texto (palabras sin valor)
-import nltk
-from nltk.corpus import stopwords
-nltk.download('stopwords')
-STOPWORDS = set(stopwords.words("spanish"))  # palabras como "el", "la", "de", etc.
+from .motores import CONFIGURACION_RED, MotorHashing, MotorMLP, MotorLineal, MotorNumpy, TAMANO_BLOQUE
+# La limpieza del texto (stopwords, negaciones, patrones) esta en limpieza.py
+from .limpieza import NEGACIONES, STOPWORDS, limpiar_texto, limpiar_textos  # noqa: F401
 
-# Para convertir texto en numeros que entienda la IA
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import confusion_matrix, classification_report
+# IMPORTANTE: TensorFlow, scikit-learn, matplotlib y seaborn NO se importan aqui.
+# Este archivo lo carga sentimientos.views (y por lo tanto las URLs del proyecto),
+# asi que cualquier import pesado aqui lo paga cada arranque del servidor.
+# Cada funcion importa lo que necesita justo cuando lo necesita.
 
-# Para generar gráficos
-import matplotlib
-matplotlib.use('Agg')  # Backend sin interfaz gráfica
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # Rutas donde se guardan el modelo y el vectorizador
 MODEL_PATH = os.path.join(settings.MODELS_DIR, "sentiment_model.h5")
 VEC_PATH = os.path.join(settings.MODELS_DIR, "sentiment_tfidf.joblib")
+# Archivo con la version del modelo publicado; se escribe al final de cada entrenamiento
+VERSION_PATH = os.path.join(settings.MODELS_DIR, "sentiment_version.txt")
+# Pesos de la red y vocabulario/IDF exportados para el runtime NumPy (sin TensorFlow)
+NPZ_PATH = os.path.join(settings.MODELS_DIR, "sentiment_model.npz")
+# Lo mismo con los pesos cuantizados a int8 (archivo ~4 veces mas chico)
+INT8_PATH = os.path.join(settings.MODELS_DIR, "sentiment_model_int8.npz")
 
+# Archivos del motor lineal (regresion logistica)
+LINEAL_PATH = os.path.join(settings.MODELS_DIR, "sentiment_lineal.joblib")
+LINEAL_VEC_PATH = os.path.join(settings.MODELS_DIR, "sentiment_lineal_tfidf.joblib")
+LINEAL_VERSION_PATH = os.path.join(settings.MODELS_DIR, "sentiment_lineal_version.txt")
 
-# Palabras de negacion importantes que NO debemos eliminar
-NEGACIONES = {"no", "poco", "nada", "nunca", "sin", "mal", "mala", "malo", "malas", "malos",
-              "pésimo", "pésima", "terrible", "horrible", "fatal"}
+# Archivos del motor con hashing (entrenamiento en bloques, ver entrenamiento_flujo.py)
+HASHING_PATH = os.path.join(settings.MODELS_DIR, "sentiment_hashing.joblib")
+HASHING_VEC_PATH = os.path.join(settings.MODELS_DIR, "sentiment_hashing_vectorizador.joblib")
+HASHING_VERSION_PATH = os.path.join(settings.MODELS_DIR, "sentiment_hashing_version.txt")
 
-# Funcion para limpiar el texto de los comentarios
-def limpiar_texto(texto):
-    # Paso 1: Convertir todo a minusculas
-    texto = texto.lower()
-    
-    # Paso 2: Quitar URLs (http, www)
-    texto = re.sub(r"http\S+|www\S+", " ", texto)
-    
-    # Paso 3: Quitar simbolos raros (emojis, signos de puntuacion, etc)
-    # Solo dejamos letras, numeros y espacios
-    texto = re.sub(r"[^a-záéíóúñü0-9\s]", " ", texto)
-    
-    # Paso 4: Normalizar espacios (quitar espacios dobles)
-    texto = re.sub(r"\s+", " ", texto)
-    
-    # Paso 5: Quitar palabras que no aportan nada (el, la, de, etc)
-    # PERO mantener negaciones importantes
-    palabras = texto.split()
-    palabras_filtradas = [
-        palabra for palabra in palabras 
-        if palabra not in STOPWORDS or palabra in NEGACIONES
-    ]
-    
-    # Devolver el texto limpio
-    return " ".join(palabras_filtradas)
+# Hiperparametros ganadores de la ultima busqueda (ver hiperparametros.py)
+# Si el archivo no existe se usan CONFIGURACION_TFIDF y CONFIGURACION_RED
+CONFIGURACION_PATH = os.path.join(settings.MODELS_DIR, "sentiment_configuracion.json")
+
+# Configuracion del TF-IDF
+# max_features=5000: usa las 5000 palabras mas importantes
+# ngram_range=(1,3): analiza palabras individuales, pares y trios
+# min_df=2: ignora palabras que aparecen solo 1 vez
+CONFIGURACION_TFIDF = {"max_features": 5000, "ngram_range": [1, 3], "min_df": 2}
+
+# Motores disponibles: "mlp" (red neuronal de Keras), "numpy" (la misma red sin TensorFlow),
+# "int8" (la red sin TensorFlow con pesos cuantizados), "lineal" (regresion logistica) y
+# "hashing" (regresion logistica con hashing, entrenada en bloques con memoria constante).
+# El que usa el servidor se elige con SENTIMIENTOS_MOTOR
+# Entrenar "mlp" tambien exporta los .npz, asi "numpy" e "int8" quedan listos con la misma version
+_motor_mlp = MotorMLP(MODEL_PATH, VEC_PATH, VERSION_PATH, npz_path=NPZ_PATH, int8_path=INT8_PATH)
+MOTORES = {
+    "mlp": _motor_mlp,
+    "numpy": MotorNumpy(_motor_mlp),
+    "int8": MotorNumpy(_motor_mlp, cuantizado=True),
+    "lineal": MotorLineal(LINEAL_PATH, LINEAL_VEC_PATH, LINEAL_VERSION_PATH),
+    "hashing": MotorHashing(HASHING_PATH, HASHING_VEC_PATH, HASHING_VERSION_PATH),
+}
+
+
+# Funcion para obtener un motor por nombre (sin nombre, el configurado en settings)
+def obtener_motor(nombre=None):
+    if nombre is None:
+        nombre = getattr(settings, "SENTIMIENTOS_MOTOR", "mlp")
+    if isinstance(nombre, str):
+        if nombre not in MOTORES:
+            raise ValueError(f"Motor de sentimientos desconocido: {nombre}")
+        return MOTORES[nombre]
+    return nombre
+
+
+# Funcion que lee los hiperparametros a usar: {"tfidf": {...}, "red": {...}}
+# Los valores que no estan en el archivo se toman de la configuracion por defecto
+def leer_configuracion():
+    try:
+        with open(CONFIGURACION_PATH, encoding="utf-8") as archivo:
+            guardada = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        guardada = {}
+    return {
+        "tfidf": {**CONFIGURACION_TFIDF, **guardada.get("tfidf", {})},
+        "red": {**CONFIGURACION_RED, **guardada.get("red", {})},
+    }
 
 
-# Funcion principal para entrenar la red neuronal
-def entrenar_modelo(df):
+# Funcion que crea el vectorizador TF-IDF con una configuracion como CONFIGURACION_TFIDF
+# dtype=float32: la mitad de memoria que float64 y es lo que usa la red
+def crear_vectorizador(configuracion_tfidf):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(
+        max_features=configuracion_tfidf["max_features"],
+        ngram_range=tuple(configuracion_tfidf["ngram_range"]),
+        min_df=configuracion_tfidf["min_df"],
+        dtype=np.float32,
+    )
+
+
+# Funcion que divide n filas en entrenamiento, validacion y prueba (indices)
+# Primero 80% / 20% para probar y del 80% otro 20% para validar (antes lo hacia
+# validation_split). Siempre la misma division para los mismos n: la busqueda de
+# hiperparametros usa la misma validacion y nunca ve la prueba
+def dividir_indices(n):
+    from sklearn.model_selection import train_test_split
+    entrenamiento, prueba = train_test_split(np.arange(n), test_size=0.2, random_state=42)
+    entrenamiento, validacion = train_test_split(entrenamiento, test_size=0.2, random_state=42)
+    return entrenamiento, validacion, prueba
+
+
+# Funcion que entrena un motor sin guardar nada (la usan entrenar_modelo y los benchmarks)
+# anterior: (modelo, vectorizador) ya entrenados para seguir entrenando (incremental):
+# se mantiene el vocabulario/IDF y se parte de los pesos del modelo anterior
+def ajustar_modelo(df, motor=None, anterior=None):
+    motor = obtener_motor(motor)
+
     # 1. Preparar los datos
+    # Los comentarios de la base ya vienen limpios (columna texto_limpio, ver limpieza.py);
+    # los de un CSV se limpian aqui, en varios procesos si son muchos
+    ya_limpios = "texto_limpio" in df
+    
     # Eliminar filas vacias
-    df = df.dropna(subset=["texto", "etiqueta"]).copy()
+    df = df.dropna(subset=["texto_limpio" if ya_limpios else "texto", "etiqueta"]).copy()
     
     # Limpiar todos los comentarios
-    df["texto_limpio"] = df["texto"].apply(limpiar_texto)
+    if not ya_limpios:
+        df["texto_limpio"] = limpiar_textos(df["texto"])
     
     # 2. Convertir texto en numeros (TF-IDF)
     # La IA no entiende palabras, solo numeros
-    # max_features=5000: usa las 5000 palabras mas importantes
-    # ngram_range=(1,3): analiza palabras individuales, pares y trios
-    # min_df=2: ignora palabras que aparecen solo 1 vez
-    vectorizador = TfidfVectorizer(max_features=5000, ngram_range=(1,3), min_df=2)
-    X = vectorizador.fit_transform(df["texto_limpio"])
-    
-    # Guardar el vectorizador para usarlo despues
-    joblib.dump(vectorizador, VEC_PATH)
+    # X queda como matriz dispersa (solo guarda los valores distintos de cero)
+    configuracion = leer_configuracion()
+    # En el incremental se reutiliza el vectorizador anterior (mismas columnas para la red)
+    if anterior is None:
+        vectorizador = crear_vectorizador(configuracion["tfidf"])
+        X = vectorizador.fit_transform(df["texto_limpio"])
+    else:
+        modelo_anterior, vectorizador = anterior
+        X = vectorizador.transform(df["texto_limpio"])
     
     # 3. Preparar las etiquetas (positivo=1, negativo=0)
     y = df["etiqueta"].map({"positivo": 1, "negativo": 0}).values
     
-    # 4. Dividir datos: 80% para entrenar, 20% para probar
-    X_train, X_test, y_train, y_test = train_test_split(
-        X.toarray(), y, test_size=0.2, random_state=42
-    )
-    
-    # 5. Crear la red neuronal (RED MAS PROFUNDA PARA MEJOR DETECCION)
-    modelo = Sequential()
-    
-    # Primera capa: 256 neuronas (mas capacidad de aprendizaje)
-    modelo.add(Dense(256, activation="relu", input_shape=(X_train.shape[1],)))
-    modelo.add(Dropout(0.4))  # Dropout mas agresivo
-    
-    # Segunda capa: 128 neuronas
-    modelo.add(Dense(128, activation="relu"))
-    modelo.add(Dropout(0.4))
-    
-    # Tercera capa: 64 neuronas
-    modelo.add(Dense(64, activation="relu"))
-    modelo.add(Dropout(0.3))
-    
-    # Cuarta capa: 32 neuronas
-    modelo.add(Dense(32, activation="relu"))
+    # 4. Dividir datos: 64% para entrenar, 16% para validar y 20% para probar
+    # (tambien separamos los textos de prueba, sirven para verificar el runtime NumPy)
+    entrenamiento, validacion, prueba = dividir_indices(len(y))
+    X = X.tocsr()
+    X_train, y_train = X[entrenamiento], y[entrenamiento]
+    X_val, y_val = X[validacion], y[validacion]
+    X_test, y_test = X[prueba], y[prueba]
+    textos_test = df["texto_limpio"].values[prueba]
+    
+    # 5. Entrenar el clasificador del motor elegido
+    inicio = time.perf_counter()
+    if anterior is None:
+        modelo = motor.entrenar(X_train, y_train, X_val, y_val, configuracion["red"])
+    else:
+        modelo = motor.continuar(modelo_anterior, X_train, y_train, X_val, y_val)
+    segundos = time.perf_counter() - inicio
     
-    # Capa de salida: 1 neurona (positivo o negativo)
-    modelo.add(Dense(1, activation="sigmoid"))
+    # 6. Generar predicciones para métricas y gráficos (por bloques, sin densificar todo)
+    y_pred_prob = motor.probabilidades(modelo, X_test)
     
-    # 6. Configurar el modelo
-    # Adam: algoritmo de optimizacion
-    # binary_crossentropy: para clasificacion binaria (2 clases)
-    modelo.compile(
-        optimizer="adam",
-        loss="binary_crossentropy",
-        metrics=["accuracy"]
-    )
+    return {
+        "motor": motor,
+        "modelo": modelo,
+        "vectorizador": vectorizador,
+        "y_test": y_test,
+        "y_pred_prob": y_pred_prob,
+        "textos_test": textos_test,
+        "segundos_entrenamiento": segundos,
+        "incremental": anterior is not None,
+        "comentarios": len(df),
+    }
+
+
+# Funcion principal para entrenar el modelo (por defecto la red neuronal)
+# Con anterior se sigue entrenando ese modelo (ver ajustar_modelo y reentrenamiento.py)
+def entrenar_modelo(df, motor=None, anterior=None):
+    return publicar_ajuste(ajustar_modelo(df, motor, anterior))
+
+
+# Funcion que publica un modelo recien ajustado y arma las metricas y graficos
+# ajuste: el diccionario de ajustar_modelo (o de entrenamiento_flujo)
+def publicar_ajuste(ajuste):
+    # Librerias pesadas: solo se cargan cuando de verdad se entrena
+    from sklearn.metrics import confusion_matrix
+    import matplotlib
+    matplotlib.use('Agg')  # Backend sin interfaz gráfica
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    motor = ajuste["motor"]
+    modelo = ajuste["modelo"]
+    vectorizador = ajuste["vectorizador"]
+    y_test = ajuste["y_test"]
     
-    # 7. Entrenar el modelo
-    # epochs=20: el modelo vera los datos 20 veces (mas entrenamiento)
-    # batch_size=16: procesa 16 comentarios a la vez
-    # validation_split=0.2: usa 20% de datos para validar
-    modelo.fit(
-        X_train, y_train,
-        epochs=20,
-        batch_size=16,
-        validation_split=0.2,
-        verbose=1
-    )
+    # 7. Guardar el modelo entrenado y el vectorizador, y publicar la nueva version
+    # Los procesos del servidor detectan la version nueva y recargan solos
+    for ruta, guardar in motor.archivos(modelo, vectorizador):
+        publicar_archivo(ruta, guardar)
+    publicar_version(motor)
     
-    # 8. Guardar el modelo entrenado
-    modelo.save(MODEL_PATH)
+    # 8. Convertir probabilidades en etiquetas
+    y_pred = (ajuste["y_pred_prob"] > 0.5).astype(int)
     
     # 9. Evaluar que tan bien funciona
-    perdida, precision = modelo.evaluate(X_test, y_test, verbose=0)
-    
-    # 10. Generar predicciones para métricas y gráficos
-    y_pred_prob = modelo.predict(X_test, verbose=0)
-    y_pred = (y_pred_prob > 0.5).astype(int).flatten()
-    
-    # 11. Generar matriz de confusión
-    cm = confusion_matrix(y_test, y_pred)
-    
-    # 12. Crear gráfico de matriz de confusión
+    precision = float((y_pred == y_test).mean())
+    
+    # Comprobar los runtimes NumPy exportados (float32 e int8) contra el modelo original
+    runtimes_numpy = {}
+    if isinstance(motor, (MotorMLP, MotorNumpy)):
+        from . import runtime_numpy
+        motor_mlp = getattr(motor, "motor_mlp", motor)
+        for nombre, ruta in (("numpy", motor_mlp.npz_path), ("int8", motor_mlp.int8_path)):
+            if not ruta:
+                continue
+            probabilidades = runtime_numpy.predecir_archivo(ruta, ajuste["textos_test"])
+            accuracy_runtime = float(((probabilidades > 0.5).astype(int) == y_test).mean())
+            runtimes_numpy[nombre] = {
+                "diferencia_maxima": float(np.max(np.abs(probabilidades - ajuste["y_pred_prob"]), initial=0.0)),
+                "accuracy": accuracy_runtime,
+                "diferencia_accuracy": accuracy_runtime - precision,
+                "tamano_kb": os.path.getsize(ruta) / 1024,
+            }
+    
+    # 10. Generar matriz de confusión
+    cm = confusion_matrix(y_test, y_pred, labels=[0, 1])
+    
+    # 11. Crear gráfico de matriz de confusión
     plt.figure(figsize=(8, 6))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
                 xticklabels=['Negativo', 'Positivo'],
@@ -164,7 +250,7 @@ def entrenar_modelo(df):
     imagen_cm = base64.b64encode(buffer_cm.read()).decode('utf-8')
     plt.close()
     
-    # 13. Crear gráfico de métricas
+    # 12. Crear gráfico de métricas
     # Calcular métricas adicionales
     tn, fp, fn, tp = cm.ravel()
     accuracy = (tp + tn) / (tp + tn + fp + fn)
@@ -199,6 +285,11 @@ def entrenar_modelo(df):
     
     # Devolver la precision y los gráficos
     return {
+        "motor": motor.nombre,
+        "segundos_entrenamiento": ajuste["segundos_entrenamiento"],
+        "incremental": ajuste["incremental"],
+        "comentarios": ajuste["comentarios"],
+        "runtimes_numpy": runtimes_numpy,
         "accuracy_test": float(precision),
         "grafico_confusion": imagen_cm,
         "grafico_metricas": imagen_metricas,
@@ -211,43 +302,120 @@ def entrenar_modelo(df):
     }
 
 
-# Funcion para cargar el modelo ya entrenado
-def cargar_modelo():
-    # Verificar si existen los archivos del modelo
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(VEC_PATH):
-        return None, None
-    
-    # Cargar el modelo y el vectorizador
-    modelo = tf.keras.models.load_model(MODEL_PATH)
-    vectorizador = joblib.load(VEC_PATH)
-    
+# Funcion para guardar un archivo de forma atomica
+# Se escribe en un archivo temporal y luego se reemplaza de una vez,
+# asi ningun proceso alcanza a leer un archivo a medio escribir
+def publicar_archivo(ruta, guardar):
+    base, extension = os.path.splitext(ruta)
+    temporal = f"{base}.{os.getpid()}.tmp{extension}"
+    guardar(temporal)
+    os.replace(temporal, ruta)
+
+
+# Funcion para publicar una nueva version del modelo (se llama despues de guardarlo)
+def publicar_version(motor=None):
+    motor = obtener_motor(motor)
+    version = str(time.time_ns())
+
+    def escribir(ruta):
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            archivo.write(version)
+
+    publicar_archivo(motor.version_path, escribir)
+    return version
+
+
+# Funcion para saber que version del modelo esta publicada (None si no hay modelo)
+def version_modelo(motor=None):
+    motor = obtener_motor(motor)
+    if not modelo_disponible(motor):
+        return None
+    try:
+        with open(motor.version_path, encoding="utf-8") as archivo:
+            return archivo.read().strip()
+    except FileNotFoundError:
+        # Modelos entrenados antes de existir el archivo de version:
+        # usamos la fecha de modificacion de los archivos como version
+        return f"mtime-{os.stat(motor.modelo_path).st_mtime_ns}-{os.stat(motor.vectorizador_path).st_mtime_ns}"
+
+
+# Funcion rapida para saber si hay un modelo entrenado (no carga nada)
+def modelo_disponible(motor=None):
+    motor = obtener_motor(motor)
+    return os.path.exists(motor.modelo_path) and os.path.exists(motor.vectorizador_path)
+
+
+# Funcion que lee el modelo y el vectorizador desde disco
+def leer_modelo(motor=None):
+    motor = obtener_motor(motor)
+    with metricas.medir(metricas.CARGA_MODELO, f"sentimientos_{motor.nombre}"):
+        modelo = motor.cargar(motor.modelo_path)
+        vectorizador = motor.cargar_vectorizador(motor.vectorizador_path)
     return modelo, vectorizador
 
 
-# Funcion para predecir si un comentario es positivo o negativo
-def predecir(texto):
-    # Cargar el modelo entrenado
-    modelo, vectorizador = cargar_modelo()
-    
-    # Si no hay modelo, mostrar error
-    if modelo is None:
-        return {"ok": False, "error": "Modelo no entrenado aún."}
-    
-    # Limpiar el texto del comentario
-    texto_limpio = limpiar_texto(texto)
-    
-    # Convertir el texto en numeros
-    X = vectorizador.transform([texto_limpio]).toarray()
-    
-    # Hacer la prediccion
-    probabilidad = modelo.predict(X, verbose=0)[0][0]
-    
+class CacheModelo:
+    """
+    Guarda el modelo cargado en memoria, una sola vez por proceso
+
+    En cada uso revisa (barato: leer un archivo pequeño) si se publico una
+    version nueva. Si cambio, carga la nueva y la reemplaza de una vez:
+    las peticiones en curso siguen usando la version anterior sin problema.
+    """
+
+    def __init__(self, leer, version):
+        self._leer = leer
+        self._version = version
+        self._lock = threading.Lock()
+        self._actual = (None, None, None)  # (version, modelo, vectorizador)
+
+    def obtener(self):
+        version = self._version()
+        if version is None:
+            return None, None
+
+        actual = self._actual
+        if actual[0] == version:
+            return actual[1], actual[2]
+
+        # Solo un hilo carga la version nueva, los demas esperan y la reutilizan
+        with self._lock:
+            if self._actual[0] != version:
+                modelo, vectorizador = self._leer()
+                self._actual = (version, modelo, vectorizador)
+            return self._actual[1], self._actual[2]
+
+    def version_cargada(self):
+        """Version del modelo que esta en memoria (None si todavia no se cargo)"""
+        return self._actual[0]
+
+    def invalidar(self):
+        with self._lock:
+            self._actual = (None, None, None)
+
+
+# Un cache por motor, compartido por todo el proceso
+caches_modelo = {
+    nombre: CacheModelo(partial(leer_modelo, motor), partial(version_modelo, motor))
+    for nombre, motor in MOTORES.items()
+}
+
+
+# Funcion para cargar el modelo ya entrenado
+# Devuelve la copia en memoria; solo lee el disco la primera vez o si hay version nueva
+def cargar_modelo(motor=None):
+    return caches_modelo[obtener_motor(motor).nombre].obtener()
+
+
+# Palabras que, si aparecen, empujan la prediccion hacia negativo
+PALABRAS_NEGATIVAS_FUERTES = {"pésimo", "pésima", "horrible", "terrible", "fatal",
+                              "malo", "mala", "malos", "malas"}
+
+# Funcion para ajustar la probabilidad de la red con las palabras muy negativas
+def ajustar_prediccion(texto, probabilidad):
     # MEJORA: Ajustar el threshold basado en palabras clave negativas
     palabras_texto = texto.lower().split()
-    palabras_negativas_fuertes = ["pésimo", "pésima", "horrible", "terrible", "fatal", 
-                                   "malo", "mala", "malos", "malas"]
-    
-    tiene_negacion_fuerte = any(palabra in palabras_negativas_fuertes for palabra in palabras_texto)
+    tiene_negacion_fuerte = any(palabra in PALABRAS_NEGATIVAS_FUERTES for palabra in palabras_texto)
     
     # Si tiene palabras muy negativas y la probabilidad esta cerca de 0.5, forzar negativo
     if tiene_negacion_fuerte and probabilidad < 0.65:
@@ -264,3 +432,96 @@ def predecir(texto):
         "etiqueta": etiqueta,
         "confianza": float(probabilidad)
     }
+
+
+# Funcion para predecir muchos comentarios de una vez
+# Limpia, vectoriza y pasa por la red todo el bloque junto (mucho mas rapido que uno por uno)
+def predecir_lote(textos, motor=None):
+    # Cargar el modelo entrenado
+    motor = obtener_motor(motor)
+    modelo, vectorizador = cargar_modelo(motor)
+    
+    # Si no hay modelo, mostrar error
+    if modelo is None:
+        return [{"ok": False, "error": "Modelo no entrenado aún."} for _ in textos]
+    
+    resultados = []
+    nombre_metrica = f"sentimientos_{motor.nombre}"
+    for inicio in range(0, len(textos), TAMANO_BLOQUE):
+        bloque = textos[inicio:inicio + TAMANO_BLOQUE]
+        
+        with metricas.medir(metricas.INFERENCIA_MODELO, nombre_metrica):
+            # Limpiar y convertir los textos en numeros (matriz dispersa)
+            X = vectorizador.transform([limpiar_texto(texto) for texto in bloque])
+            
+            # Hacer la prediccion de todo el bloque en una sola llamada
+            probabilidades = motor.probabilidades(modelo, X)
+        metricas.FILAS_PREDICHAS.incrementar(len(bloque), nombre_metrica)
+        
+        resultados.extend(
+            ajustar_prediccion(texto, float(probabilidad))
+            for texto, probabilidad in zip(bloque, probabilidades)
+        )
+    return resultados
+
+
+# Agrupador de peticiones concurrentes (se crea la primera vez que se usa)
+_agrupador = None
+_agrupador_lock = threading.Lock()
+
+
+def obtener_agrupador():
+    global _agrupador
+    if _agrupador is None:
+        with _agrupador_lock:
+            if _agrupador is None:
+                from .lotes import AgrupadorPredicciones
+                _agrupador = AgrupadorPredicciones(
+                    predecir_lote,
+                    lote_maximo=getattr(settings, "SENTIMIENTOS_LOTE_MAXIMO", 64),
+                    espera_maxima=getattr(settings, "SENTIMIENTOS_LOTE_ESPERA_MS", 5) / 1000,
+                    cola_maxima=getattr(settings, "SENTIMIENTOS_LOTE_COLA_MAXIMA", 1024),
+                )
+    return _agrupador
+
+
+# Funcion para predecir si un comentario es positivo o negativo
+# Las peticiones que llegan al mismo tiempo se juntan en un solo lote
+def predecir(texto):
+    if not modelo_disponible():
+        return {"ok": False, "error": "Modelo no entrenado aún."}
+    if getattr(settings, "SENTIMIENTOS_LOTE_MAXIMO", 64) <= 1:
+        return predecir_lote([texto])[0]
+    try:
+        return obtener_agrupador().predecir(texto, timeout=getattr(settings, "SENTIMIENTOS_LOTE_TIMEOUT_S", 30))
+    except queue.Full:
+        return {"ok": False, "error": "Demasiadas predicciones en espera, intentar de nuevo."}
+    except TimeoutError:
+        return {"ok": False, "error": "La prediccion tardo demasiado, intentar de nuevo."}
+
+
+# Version async de predecir para las vistas ASGI: espera el lote sin bloquear el event loop
+# Cuenta en el limite de trabajo en curso de ejecucion.py (Saturado / TiempoAgotado)
+async def predecir_async(texto):
+    if not modelo_disponible():
+        return {"ok": False, "error": "Modelo no entrenado aún."}
+    if getattr(settings, "SENTIMIENTOS_LOTE_MAXIMO", 64) <= 1:
+        return (await ejecucion.ejecutar(predecir_lote, [texto]))[0]
+    # El agrupador ya predice en su propio hilo: solo hace falta el lugar y la espera
+    # Si se agota el tiempo el lugar se devuelve aunque el texto siga en la cola del
+    # agrupador: lo que espera ahi lo limita SENTIMIENTOS_LOTE_COLA_MAXIMA (Saturado si esta llena)
+    liberar = await ejecucion.reservar_lugar()
+    try:
+        futuro = obtener_agrupador().enviar(texto)
+    except queue.Full:
+        liberar()
+        raise ejecucion.Saturado("Demasiadas predicciones en espera, reintentar mas tarde") from None
+    except BaseException:
+        liberar()
+        raise
+    futuro.add_done_callback(liberar)
+    try:
+        return await ejecucion.esperar(futuro)
+    except ejecucion.TiempoAgotado:
+        liberar()
+        raise
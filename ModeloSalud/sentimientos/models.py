@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 
 # Create your models here.
 
@@ -6,7 +7,91 @@ from django.db import models
 class Comment(models.Model):
     fecha = models.DateField(null=True, blank=True)
     texto = models.TextField()
-    etiqueta = models.CharField(max_length=10, choices=[("positivo", "positivo"), ("negativo", "negativo")])
+    # Hash del texto (ver ingesta.huella_texto): evita cargar dos veces el mismo comentario
+    huella = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
+    # Vacia en los comentarios que llegan sin etiqueta (kioscos): no se usan para entrenar
+    etiqueta = models.CharField(max_length=10, blank=True,
+                                choices=[("positivo", "positivo"), ("negativo", "negativo")])
+
+    # Prediccion del modelo (la llena el comando puntuar_comentarios)
+    # modelo_version es "motor:version"; si no coincide con el modelo publicado, la prediccion esta vieja
+    etiqueta_predicha = models.CharField(max_length=10, null=True, blank=True,
+                                         choices=[("positivo", "positivo"), ("negativo", "negativo")])
+    confianza_predicha = models.FloatField(null=True, blank=True)
+    modelo_version = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
+    # Texto ya limpio para entrenar (ver limpieza.py) y hash del texto con el que se limpio;
+    # si el hash no coincide con el del texto actual, hay que volver a limpiarlo
+    texto_limpio = models.TextField(null=True, blank=True)
+    hash_texto = models.CharField(max_length=32, null=True, blank=True)
+
+    # Firma MinHash del texto y representante del grupo de casi duplicados (ver duplicados.py)
+    # Los comentarios con duplicado_de no se usan para entrenar
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
+    duplicado_de = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL,
+                                     related_name="duplicados", editable=False)
+
+    # Ya esta sumado en ResumenSentimiento (ver tendencias.py)
+    en_resumen = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # Solo los comentarios sin firma: encontrar los pendientes no recorre toda la tabla
+            models.Index(fields=["id"], condition=Q(minhash__isnull=True), name="comment_sin_minhash"),
+            # Lo mismo para los que faltan sumar a las tendencias
+            models.Index(fields=["id"], condition=Q(en_resumen=False), name="comment_sin_resumen"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} – {self.texto[:60]}..."
+
+
+# Indice LSH de las firmas MinHash: una fila por banda de cada comentario representante
+# (ver duplicados.py). Los comentarios parecidos comparten la clave de alguna banda.
+class BandaLSH(models.Model):
+    comentario = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="bandas_lsh")
+    clave = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.comentario_id}: {self.clave}"
+
+
+# Cantidad de comentarios por periodo (dia, semana o mes) y sentimiento, para los
+# graficos de tendencia (ver tendencias.py). Se mantiene al insertar o cambiar comentarios.
+class ResumenSentimiento(models.Model):
+    periodo = models.CharField(max_length=6, choices=[("dia", "dia"), ("semana", "semana"), ("mes", "mes")])
+    # Primer dia del periodo (el lunes de la semana, el dia 1 del mes)
+    inicio = models.DateField()
+    sentimiento = models.CharField(max_length=10, choices=[("positivo", "positivo"), ("negativo", "negativo")])
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["periodo", "inicio", "sentimiento"], name="resumen_periodo_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.periodo} {self.inicio} {self.sentimiento}: {self.total}"
+
+
+# Una sola fila que se bloquea (select_for_update) para que las sumas a
+# ResumenSentimiento no corran a la vez (ver tendencias.py)
+class ProgresoResumen(models.Model):
+    pass
+
+
+# Frases (n-gramas del vocabulario del modelo) con cuantos comentarios positivos y
+# negativos las contienen y cuanto se asocian a cada sentimiento (ver frases.py)
+class FraseSentimiento(models.Model):
+    # "motor:version" del vectorizador con el que se calculo
+    modelo_version = models.CharField(max_length=64)
+    frase = models.CharField(max_length=200)
+    positivos = models.IntegerField()
+    negativos = models.IntegerField()
+    # Log-odds (con previa de Dirichlet) de positivo contra negativo, y su puntaje z:
+    # muy negativo = la frase empuja hacia negativo
+    log_odds = models.FloatField()
+    z = models.FloatField(db_index=True)
 
     def __str__(self):
-        return f"{self.fecha} – {self.texto[:60]}..."
\ No newline at end of file
+        return f"{self.frase}: z={self.z:.2f}"
@@ -0,0 +1,390 @@
+"""
+Motores de clasificacion de sentimiento.
+
+Todos los motores usan las mismas caracteristicas TF-IDF; lo que cambia es el
+clasificador que va encima. Cada motor sabe entrenar, guardar, cargar y calcular
+probabilidades, y tiene sus propios archivos en la carpeta de modelos.
+
+El motor que usa el servidor se elige en settings con SENTIMIENTOS_MOTOR.
+"""
+
+from functools import partial
+
+import joblib
+import numpy as np
+
+# Cuantos comentarios se pasan juntos a la red como maximo (limita la memoria usada)
+TAMANO_BLOQUE = 1024
+
+# Entrenamiento incremental: pocas epocas y un learning rate bajo, para ajustar
+# los pesos anteriores sin "olvidar" lo aprendido (ver reentrenamiento.py)
+EPOCAS_INCREMENTAL = 3
+LEARNING_RATE_INCREMENTAL = 1e-4
+
+
+# Funcion que entrega mini-lotes densos a partir de una matriz dispersa
+# Solo se densifica un lote a la vez; Keras corta cada epoca con steps_per_epoch
+def generar_lotes(X, y, tamano_lote, mezclar=True, semilla=42):
+    X = X.tocsr()
+    rng = np.random.default_rng(semilla)
+    total = X.shape[0]
+    while True:
+        orden = rng.permutation(total) if mezclar else np.arange(total)
+        for inicio in range(0, total, tamano_lote):
+            indices = orden[inicio:inicio + tamano_lote]
+            yield X[indices].toarray().astype(np.float32, copy=False), y[indices].astype(np.float32)
+
+
+# Cantidad de lotes que hay en una epoca
+def pasos_por_epoca(X, tamano_lote):
+    return max(1, -(-X.shape[0] // tamano_lote))
+
+
+# Configuracion de la red del motor "mlp" (RED MAS PROFUNDA PARA MEJOR DETECCION)
+# - capas: neuronas de cada capa oculta (256 -> mas capacidad de aprendizaje)
+# - dropout: apagado al azar despues de cada capa (0 = sin Dropout)
+# - learning_rate: paso del optimizador Adam (0.001 es el de "adam" por defecto)
+# - tamano_lote: comentarios que se procesan a la vez
+# - epocas: maximo de veces que el modelo ve los datos
+# - paciencia: epocas sin mejorar val_loss antes de cortar (early stopping)
+# Se puede reemplazar por la ganadora de la busqueda de hiperparametros (ver hiperparametros.py)
+CONFIGURACION_RED = {
+    "capas": [256, 128, 64, 32],
+    "dropout": [0.4, 0.4, 0.3, 0.0],
+    "learning_rate": 1e-3,
+    "tamano_lote": 16,
+    "epocas": 20,
+    "paciencia": 3,
+}
+
+
+# Funcion que arma y compila la red segun la configuracion
+def construir_red(entradas, configuracion):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout, Input
+    from tensorflow.keras.optimizers import Adam
+
+    modelo = Sequential()
+    modelo.add(Input(shape=(entradas,)))
+
+    # Capas ocultas con activacion relu, cada una con su Dropout
+    for neuronas, dropout in zip(configuracion["capas"], configuracion["dropout"]):
+        modelo.add(Dense(neuronas, activation="relu"))
+        if dropout > 0:
+            modelo.add(Dropout(dropout))
+
+    # Capa de salida: 1 neurona (positivo o negativo)
+    modelo.add(Dense(1, activation="sigmoid"))
+
+    # Configurar el modelo
+    # Adam: algoritmo de optimizacion
+    # binary_crossentropy: para clasificacion binaria (2 clases)
+    modelo.compile(
+        optimizer=Adam(learning_rate=configuracion["learning_rate"]),
+        loss="binary_crossentropy",
+        metrics=["accuracy"]
+    )
+    return modelo
+
+
+# Funcion que entrena la red hasta configuracion["epocas"] con early stopping
+# Se detiene si val_loss no mejora en "paciencia" epocas y se queda con los mejores pesos
+# Devuelve el historial de Keras (loss y val_loss por epoca)
+def ajustar_red(modelo, X_train, y_train, X_val, y_val, configuracion, epoca_inicial=0, verbose=1):
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    # Los lotes se convierten a matriz normal (densa) de a uno, asi la memoria
+    # depende de las palabras presentes y no de filas x vocabulario
+    tamano_lote = configuracion["tamano_lote"]
+    detener = EarlyStopping(monitor="val_loss", patience=configuracion["paciencia"], restore_best_weights=True)
+    return modelo.fit(
+        generar_lotes(X_train, y_train, tamano_lote),
+        steps_per_epoch=pasos_por_epoca(X_train, tamano_lote),
+        validation_data=generar_lotes(X_val, y_val, TAMANO_BLOQUE, mezclar=False),
+        validation_steps=pasos_por_epoca(X_val, TAMANO_BLOQUE),
+        initial_epoch=epoca_inicial,
+        epochs=configuracion["epocas"],
+        callbacks=[detener],
+        verbose=verbose
+    )
+
+
+# Funcion que pasa una matriz dispersa por la red en bloques y devuelve las probabilidades
+def calcular_probabilidades(modelo, X, tamano_bloque=TAMANO_BLOQUE):
+    X = X.tocsr()
+    probabilidades = np.empty(X.shape[0], dtype=np.float32)
+    for inicio in range(0, X.shape[0], tamano_bloque):
+        bloque = X[inicio:inicio + tamano_bloque].toarray().astype(np.float32, copy=False)
+        probabilidades[inicio:inicio + tamano_bloque] = modelo(bloque, training=False).numpy()[:, 0]
+    return probabilidades
+
+
+class VectorizadorHashing:
+    """
+    TF-IDF sobre un espacio de columnas de tamaño fijo (HashingVectorizer)
+
+    No guarda vocabulario: cada termino (palabra o n-grama) va a la columna que
+    indica su hash, asi la memoria no crece con la cantidad de textos. El IDF se
+    calcula en bloques: contar() suma en cuantos textos aparece cada columna y
+    calcular_idf() aplica la misma formula que TfidfVectorizer (smooth_idf).
+    """
+
+    def __init__(self, n_columnas=2 ** 20, ngram_range=(1, 3)):
+        self.n_columnas = n_columnas
+        self.ngram_range = tuple(ngram_range)
+        self.documentos = 0
+        self.frecuencias = np.zeros(n_columnas, dtype=np.int64)
+        self.idf = None
+
+    def _contar_terminos(self, textos):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        hashing = HashingVectorizer(n_features=self.n_columnas, ngram_range=self.ngram_range,
+                                    alternate_sign=False, norm=None, dtype=np.float32)
+        return hashing.transform(textos)
+
+    def contar(self, textos):
+        X = self._contar_terminos(textos)
+        self.documentos += X.shape[0]
+        # Cada fila tiene cada columna una sola vez: contar indices = textos por columna
+        self.frecuencias += np.bincount(X.indices, minlength=self.n_columnas)
+
+    def calcular_idf(self):
+        self.idf = (np.log((1 + self.documentos) / (1 + self.frecuencias)) + 1).astype(np.float32)
+        # Las frecuencias ya no hacen falta (y ocupan el doble que el IDF en disco)
+        self.frecuencias = None
+
+    def transform(self, textos):
+        from sklearn.preprocessing import normalize
+        X = self._contar_terminos(textos)
+        X.data *= self.idf[X.indices]
+        return normalize(X, copy=False)
+
+
+class Motor:
+    """
+    Interfaz comun de los motores
+
+    Parametros:
+    - modelo_path: archivo del clasificador entrenado
+    - vectorizador_path: archivo del TfidfVectorizer ajustado para este motor
+    - version_path: archivo con la version publicada (lo lee el cache de modelos)
+    """
+
+    nombre = None
+
+    # True si el motor puede seguir entrenando un modelo ya publicado (continuar)
+    incremental = False
+
+    # True si el entrenamiento completo lee los comentarios en bloques (ver entrenamiento_flujo.py)
+    en_flujo = False
+
+    def __init__(self, modelo_path, vectorizador_path, version_path):
+        self.modelo_path = modelo_path
+        self.vectorizador_path = vectorizador_path
+        self.version_path = version_path
+
+    def entrenar(self, X_train, y_train, X_val, y_val, configuracion=None):
+        """Entrena el clasificador y lo devuelve (configuracion: hiperparametros, si el motor los usa)"""
+        raise NotImplementedError
+
+    def continuar(self, modelo, X_train, y_train, X_val, y_val):
+        """Sigue entrenando un clasificador ya entrenado (mismas columnas de X) y lo devuelve"""
+        raise NotImplementedError
+
+    def guardar(self, modelo, ruta):
+        raise NotImplementedError
+
+    def cargar(self, ruta):
+        raise NotImplementedError
+
+    def cargar_vectorizador(self, ruta):
+        return joblib.load(ruta)
+
+    def archivos(self, modelo, vectorizador):
+        """
+        Lista de (ruta, funcion que escribe el archivo) que hay que publicar tras entrenar
+        """
+        return [
+            (self.modelo_path, partial(self.guardar, modelo)),
+            (self.vectorizador_path, partial(joblib.dump, vectorizador)),
+        ]
+
+    def probabilidades(self, modelo, X):
+        """Probabilidad de 'positivo' para cada fila de X (matriz dispersa)"""
+        raise NotImplementedError
+
+
+class MotorMLP(Motor):
+    """
+    Red neuronal de Keras (256-128-64-32 por defecto), el motor original del proyecto
+    """
+
+    nombre = "mlp"
+    incremental = True
+
+    def __init__(self, modelo_path, vectorizador_path, version_path, npz_path=None, int8_path=None):
+        super().__init__(modelo_path, vectorizador_path, version_path)
+        # Si se indican, al publicar tambien se exporta la red para el runtime NumPy
+        # (pesos float32 y/o pesos cuantizados a int8)
+        self.npz_path = npz_path
+        self.int8_path = int8_path
+
+    def archivos(self, modelo, vectorizador):
+        from . import runtime_numpy
+        archivos = super().archivos(modelo, vectorizador)
+        if self.npz_path:
+            archivos.append((self.npz_path, partial(runtime_numpy.exportar, modelo, vectorizador)))
+        if self.int8_path:
+            archivos.append((self.int8_path, partial(runtime_numpy.exportar, modelo, vectorizador, cuantizar=True)))
+        return archivos
+
+    def entrenar(self, X_train, y_train, X_val, y_val, configuracion=None):
+        configuracion = {**CONFIGURACION_RED, **(configuracion or {})}
+        modelo = construir_red(X_train.shape[1], configuracion)
+        ajustar_red(modelo, X_train, y_train, X_val, y_val, configuracion)
+        return modelo
+
+    def continuar(self, modelo, X_train, y_train, X_val, y_val):
+        from tensorflow.keras.optimizers import Adam
+
+        # Se vuelve a compilar con un learning rate 10 veces menor que el de "adam"
+        # por defecto: los pesos ya estan cerca de una buena solucion
+        modelo.compile(
+            optimizer=Adam(learning_rate=LEARNING_RATE_INCREMENTAL),
+            loss="binary_crossentropy",
+            metrics=["accuracy"]
+        )
+        configuracion = {**CONFIGURACION_RED, "epocas": EPOCAS_INCREMENTAL}
+        ajustar_red(modelo, X_train, y_train, X_val, y_val, configuracion)
+        return modelo
+
+    def guardar(self, modelo, ruta):
+        modelo.save(ruta)
+
+    def cargar(self, ruta):
+        import tensorflow as tf
+        return tf.keras.models.load_model(ruta)
+
+    def probabilidades(self, modelo, X):
+        return calcular_probabilidades(modelo, X)
+
+
+class MotorLineal(Motor):
+    """
+    Regresion logistica sobre las mismas caracteristicas TF-IDF
+
+    Entrena en segundos, predice directo sobre la matriz dispersa y no necesita TensorFlow
+    """
+
+    nombre = "lineal"
+
+    def entrenar(self, X_train, y_train, X_val, y_val, configuracion=None):
+        import scipy.sparse as sp
+        from sklearn.linear_model import LogisticRegression
+
+        # El modelo lineal no necesita datos de validacion aparte: usamos todo para entrenar
+        X = sp.vstack([X_train, X_val]).tocsr()
+        y = np.concatenate([y_train, y_val])
+
+        modelo = LogisticRegression(solver="liblinear", C=4.0, max_iter=1000)
+        modelo.fit(X, y)
+        return modelo
+
+    def guardar(self, modelo, ruta):
+        joblib.dump(modelo, ruta)
+
+    def cargar(self, ruta):
+        return joblib.load(ruta)
+
+    def probabilidades(self, modelo, X):
+        return modelo.predict_proba(X)[:, 1].astype(np.float32)
+
+
+class MotorNumpy(Motor):
+    """
+    La misma red neuronal, pero servida solo con NumPy/SciPy (ver runtime_numpy)
+
+    Se entrena y se publica igual que el motor "mlp" (con TensorFlow), que ademas
+    exporta un .npz con los pesos y el vocabulario/IDF. Para predecir solo se lee
+    ese .npz: no se importa TensorFlow ni scikit-learn.
+
+    Con cuantizado=True usa el .npz con pesos int8 (motor "int8").
+    """
+
+    nombre = "numpy"
+    incremental = True
+
+    def __init__(self, motor_mlp, cuantizado=False):
+        ruta = motor_mlp.int8_path if cuantizado else motor_mlp.npz_path
+        super().__init__(ruta, ruta, motor_mlp.version_path)
+        self.motor_mlp = motor_mlp
+        self.cuantizado = cuantizado
+        if cuantizado:
+            self.nombre = "int8"
+
+    def entrenar(self, X_train, y_train, X_val, y_val, configuracion=None):
+        return self.motor_mlp.entrenar(X_train, y_train, X_val, y_val, configuracion)
+
+    def continuar(self, modelo, X_train, y_train, X_val, y_val):
+        return self.motor_mlp.continuar(modelo, X_train, y_train, X_val, y_val)
+
+    def archivos(self, modelo, vectorizador):
+        return self.motor_mlp.archivos(modelo, vectorizador)
+
+    def cargar(self, ruta):
+        from . import runtime_numpy
+        return runtime_numpy.cargar_red(ruta)
+
+    def cargar_vectorizador(self, ruta):
+        from . import runtime_numpy
+        return runtime_numpy.cargar_vectorizador(ruta)
+
+    def probabilidades(self, modelo, X):
+        if hasattr(modelo, "predecir"):
+            return modelo.predecir(X)
+        # Recien entrenado todavia es el modelo de Keras
+        return self.motor_mlp.probabilidades(modelo, X)
+
+
+class MotorHashing(Motor):
+    """
+    Regresion logistica entrenada con SGD sobre TF-IDF con hashing (VectorizadorHashing)
+
+    El entrenamiento completo lee los comentarios de la base en bloques y ajusta
+    el modelo bloque a bloque con partial_fit (ver entrenamiento_flujo.py): la
+    memoria usada no depende de cuantos comentarios haya.
+    """
+
+    nombre = "hashing"
+    incremental = True
+    en_flujo = True
+
+    # Pasadas sobre los datos al entrenar o continuar en memoria
+    EPOCAS = 5
+
+    def crear_clasificador(self):
+        from sklearn.linear_model import SGDClassifier
+        return SGDClassifier(loss="log_loss", alpha=1e-6, random_state=42)
+
+    def entrenar(self, X_train, y_train, X_val, y_val, configuracion=None):
+        return self.continuar(self.crear_clasificador(), X_train, y_train, X_val, y_val)
+
+    def continuar(self, modelo, X_train, y_train, X_val, y_val):
+        import scipy.sparse as sp
+
+        X = sp.vstack([X_train, X_val]).tocsr()
+        y = np.concatenate([y_train, y_val])
+        rng = np.random.default_rng(42)
+        for _ in range(self.EPOCAS):
+            orden = rng.permutation(len(y))
+            modelo.partial_fit(X[orden], y[orden], classes=[0, 1])
+        return modelo
+
+    def guardar(self, modelo, ruta):
+        joblib.dump(modelo, ruta)
+
+    def cargar(self, ruta):
+        return joblib.load(ruta)
+
+    def probabilidades(self, modelo, X):
+        return modelo.predict_proba(X)[:, 1].astype(np.float32)
@@ -0,0 +1,124 @@
+"""
+Puntuacion masiva de comentarios (guarda la prediccion del modelo en cada Comment).
+
+Recorre los comentarios que no tienen prediccion, o que la tienen de otra version
+del modelo, en bloques ordenados por id. Cada bloque se predice como un solo lote
+repartido entre varios procesos y se guarda con UPDATEs en lote en su propia
+transaccion: si el trabajo se corta, al volver a correrlo sigue con los
+comentarios que faltan (los ya guardados tienen la version actual y se saltan).
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import transaction
+
+from ModeloSalud.carga_masiva import actualizar_por_id
+
+from . import modelo_sentimientos, tendencias
+from .models import Comment
+
+# Campos que escribe la puntuacion
+CAMPOS_PREDICCION = ["etiqueta_predicha", "confianza_predicha", "modelo_version"]
+
+# Comentarios que se leen y guardan por bloque
+TAMANO_BLOQUE = 2000
+
+
+# Funcion para armar el valor de modelo_version: "motor:version"
+def etiqueta_version(motor, version):
+    return f"{motor.nombre}:{version}"
+
+
+# Funcion que guarda predicciones [(etiqueta, confianza, modelo_version, id)] con
+# actualizar_por_id (pocas sentencias por bloque, ver ModeloSalud/carga_masiva.py).
+# Tambien ajusta el resumen de tendencias de los comentarios sin etiqueta
+def guardar_predicciones(filas):
+    with transaction.atomic():
+        tendencias.predicciones_cambiadas(filas)
+        actualizar_por_id(Comment, CAMPOS_PREDICCION, filas)
+
+
+# Funcion que corre al iniciar cada proceso del pool
+# Con "spawn" (Windows y macOS) el proceso empieza sin Django configurado
+def _iniciar_proceso():
+    import django
+    django.setup()
+
+
+# Funcion que predice un grupo de textos dentro de un proceso del pool
+# Devuelve la version con la que se predijo (cada proceso carga el modelo una sola vez)
+def puntuar_textos(textos, motor_nombre):
+    motor = modelo_sentimientos.obtener_motor(motor_nombre)
+    resultados = modelo_sentimientos.predecir_lote(textos, motor)
+    return modelo_sentimientos.caches_modelo[motor.nombre].version_cargada(), resultados
+
+
+# Funcion para repartir un bloque de textos entre los procesos
+def _predecir_bloque(textos, motor, pool, procesos):
+    if pool is None:
+        return [puntuar_textos(textos, motor.nombre)]
+    tamano_parte = -(-len(textos) // procesos)
+    grupos = [textos[inicio:inicio + tamano_parte] for inicio in range(0, len(textos), tamano_parte)]
+    return list(pool.map(puntuar_textos, grupos, [motor.nombre] * len(grupos)))
+
+
+def puntuar_pendientes(motor=None, tamano_bloque=TAMANO_BLOQUE, procesos=1, informar=None):
+    """
+    Predice y guarda el sentimiento de todos los comentarios pendientes
+
+    Parametros:
+    - motor: nombre del motor (por defecto el de settings)
+    - tamano_bloque: comentarios por bloque (una lectura, una prediccion y un UPDATE)
+    - procesos: cantidad de procesos que predicen en paralelo (1 = en este proceso)
+    - informar: funcion opcional que recibe (puntuados, ultimo_id) despues de cada bloque
+    """
+    motor = modelo_sentimientos.obtener_motor(motor)
+    version = modelo_sentimientos.version_modelo(motor)
+    if version is None:
+        return {"ok": False, "error": "Modelo no entrenado aún."}
+
+    # Sin prediccion (NULL) o con la de otra version
+    pendientes = Comment.objects.exclude(modelo_version=etiqueta_version(motor, version))
+
+    inicio = time.perf_counter()
+    puntuados = 0
+    ultimo_id = 0
+    pool = ProcessPoolExecutor(procesos, initializer=_iniciar_proceso) if procesos > 1 else None
+    try:
+        while True:
+            # Paginacion por id: cada consulta sigue desde el ultimo id del bloque anterior
+            bloque = list(
+                pendientes.filter(pk__gt=ultimo_id).order_by("pk").values_list("pk", "texto")[:tamano_bloque]
+            )
+            if not bloque:
+                break
+            ultimo_id = bloque[-1][0]
+            ids = [pk for pk, _ in bloque]
+
+            filas = []
+            for version_usada, resultados in _predecir_bloque([texto for _, texto in bloque], motor, pool, procesos):
+                for resultado in resultados:
+                    if not resultado["ok"]:
+                        return {"ok": False, "error": resultado["error"], "puntuados": puntuados}
+                    filas.append((resultado["etiqueta"], resultado["confianza"],
+                                  etiqueta_version(motor, version_usada), ids[len(filas)]))
+
+            guardar_predicciones(filas)
+
+            puntuados += len(filas)
+            if informar is not None:
+                informar(puntuados, ultimo_id)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "ok": True,
+        "motor": motor.nombre,
+        "version": version,
+        "puntuados": puntuados,
+        "segundos": segundos,
+        "comentarios_por_segundo": puntuados / segundos if segundos > 0 else 0.0,
+    }
@@ -0,0 +1,220 @@
+"""
+Re-entrenamiento del modelo de sentimientos con los comentarios de la base: completo o incremental.
+
+- Completo: ajusta el vocabulario TF-IDF y entrena la red desde cero con todos los
+  comentarios (los motores con en_flujo los leen en bloques, ver entrenamiento_flujo.py).
+- Incremental: parte del modelo publicado. Mantiene el vocabulario (y el IDF),
+  carga los pesos anteriores y sigue entrenando unas pocas epocas con los
+  comentarios nuevos mas una muestra al azar de los ya vistos ("repaso"), para
+  que la red no olvide lo aprendido. Cuesta una fraccion del completo.
+
+Para saber que comentarios son nuevos se guarda, junto al modelo, un archivo
+con la version publicada y el ultimo id de comentario usado al entrenar.
+
+En modo "auto" se hace el completo en lugar del incremental cuando:
+- no hay modelo publicado o no se sabe con que comentarios se entreno
+- cambio la configuracion de hiperparametros (ver hiperparametros.py)
+- el motor no admite entrenamiento incremental (el lineal entrena en segundos)
+- los comentarios nuevos son muchos comparados con los ya vistos
+- muchos comentarios nuevos no tienen ninguna palabra del vocabulario
+- ya se hicieron varios incrementales seguidos (el vocabulario y el IDF envejecen)
+
+Los casi duplicados (ver duplicados.py) no se usan: solo el representante de cada grupo.
+"""
+
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Min, Q
+
+from . import duplicados, entrenamiento_flujo, limpieza, modelo_sentimientos
+from .models import Comment
+
+# Archivo con el estado del ultimo entrenamiento de cada motor
+ESTADO_PATH = os.path.join(settings.MODELS_DIR, "sentiment_entrenamiento.json")
+
+# Comentarios ya vistos que se repasan por cada comentario nuevo (y minimo por entrenamiento)
+PROPORCION_REPASO = 2
+MINIMO_REPASO = 1000
+
+# Si los nuevos superan esta fraccion de los ya vistos, conviene el completo
+MAXIMO_NUEVOS = 0.3
+
+# Fraccion minima de comentarios nuevos con al menos una palabra del vocabulario
+COBERTURA_MINIMA = 0.9
+
+# Incrementales seguidos antes de forzar uno completo
+MAXIMO_INCREMENTALES = 10
+
+# Ids que se piden por consulta al leer la muestra de repaso
+TAMANO_CONSULTA = 5000
+
+MODOS = ("auto", "incremental", "completo")
+
+# Etiquetas con las que se entrena (los comentarios sin etiqueta no se usan)
+ETIQUETAS = ("positivo", "negativo")
+
+
+# Funciones para leer y guardar el estado del ultimo entrenamiento
+def leer_estado(motor):
+    try:
+        with open(ESTADO_PATH, encoding="utf-8") as archivo:
+            return json.load(archivo).get(motor.nombre)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def guardar_estado(motor, estado):
+    try:
+        with open(ESTADO_PATH, encoding="utf-8") as archivo:
+            estados = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        estados = {}
+    estados[motor.nombre] = estado
+
+    def escribir(ruta):
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(estados, archivo, indent=2)
+
+    modelo_sentimientos.publicar_archivo(ESTADO_PATH, escribir)
+
+
+# Funcion que lee los comentarios (id, texto limpio y etiqueta) como DataFrame,
+# sin los casi duplicados ni los que no tienen etiqueta
+def leer_comentarios(consulta):
+    import pandas as pd
+    consulta = consulta.filter(duplicado_de=None, etiqueta__in=ETIQUETAS)
+    return pd.DataFrame(list(consulta.values_list("id", "texto_limpio", "etiqueta")),
+                        columns=["id", "texto_limpio", "etiqueta"])
+
+
+# Funcion que devuelve hasta que id se puede entrenar: el anterior al primer comentario
+# que sigue sin texto limpio o sin revisar (uno que se guardo con un id menor despues de
+# la limpieza). Asi no se marca como visto un comentario que no se pudo usar.
+def ultimo_preparado(ultimo_id):
+    sin_preparar = (
+        Comment.objects.filter(pk__lte=ultimo_id).filter(Q(texto_limpio=None) | Q(minhash=None))
+        .aggregate(primero=Min("pk"))["primero"]
+    )
+    return ultimo_id if sin_preparar is None else sin_preparar - 1
+
+
+# Funcion que elige al azar comentarios ya vistos (id <= ultimo_id) para el repaso
+# Se sortean ids en vez de usar order_by("?"), que ordena toda la tabla. Se sortea
+# entre los ids que se pueden usar (sin casi duplicados), que pueden ser pocos
+def muestra_repaso(ultimo_id, cantidad, semilla=None):
+    import pandas as pd
+
+    rng = np.random.default_rng(semilla)
+    ids = np.fromiter(
+        Comment.objects.filter(pk__lte=ultimo_id, duplicado_de=None, etiqueta__in=ETIQUETAS)
+        .values_list("pk", flat=True).iterator(),
+        dtype=np.int64,
+    )
+    sorteados = rng.choice(ids, size=min(len(ids), cantidad), replace=False)
+    partes = [
+        leer_comentarios(Comment.objects.filter(pk__in=sorteados[inicio:inicio + TAMANO_CONSULTA].tolist()))
+        for inicio in range(0, len(sorteados), TAMANO_CONSULTA)
+    ]
+    if not partes:
+        return leer_comentarios(Comment.objects.none())
+    return pd.concat(partes, ignore_index=True)
+
+
+# Funcion que decide si hay que hacer el entrenamiento completo (devuelve el motivo o None)
+def motivo_completo(motor, estado, nuevos, vectorizador, forzar_incremental=False):
+    if not motor.incremental:
+        return f'el motor "{motor.nombre}" no admite entrenamiento incremental'
+    if estado is None or vectorizador is None:
+        return "no hay un modelo anterior con su estado de entrenamiento"
+    if estado["version"] != modelo_sentimientos.version_modelo(motor):
+        return "el modelo publicado no es el del ultimo entrenamiento registrado"
+    if estado.get("configuracion") != modelo_sentimientos.leer_configuracion():
+        return "cambio la configuracion de hiperparametros"
+    if forzar_incremental:
+        return None
+    if len(nuevos) > MAXIMO_NUEVOS * estado["comentarios"]:
+        return f"hay {len(nuevos)} comentarios nuevos (mas del {MAXIMO_NUEVOS:.0%} de los ya vistos)"
+    if estado["incrementales"] >= MAXIMO_INCREMENTALES:
+        return f"ya se hicieron {estado['incrementales']} entrenamientos incrementales seguidos"
+    if nuevos.empty:
+        return None
+    cobertura = float((vectorizador.transform(nuevos["texto_limpio"]).getnnz(axis=1) > 0).mean())
+    if cobertura < COBERTURA_MINIMA:
+        return f"solo el {cobertura:.0%} de los comentarios nuevos tiene palabras del vocabulario"
+    return None
+
+
+def reentrenar(modo="auto", motor=None):
+    """
+    Entrena el modelo con los comentarios de la base y lo publica
+
+    Parametros:
+    - modo: "auto" (incremental si conviene), "incremental" o "completo"
+    - motor: nombre del motor (por defecto el de settings)
+
+    Devuelve el resultado de entrenar_modelo con "ok" y "motivo" (por que se hizo
+    completo), o {"ok": True, "sin_cambios": True} si en modo "auto" no hay nada nuevo
+    """
+    import joblib
+
+    if modo not in MODOS:
+        return {"ok": False, "error": f"Modo de entrenamiento desconocido: {modo}"}
+    motor = modelo_sentimientos.obtener_motor(motor)
+    # "numpy" e "int8" se entrenan con la red de Keras del motor "mlp"
+    entrenable = getattr(motor, "motor_mlp", motor)
+
+    # Los comentarios que lleguen mientras se limpia o se entrena quedan para la proxima vez
+    ultimo_id = Comment.objects.aggregate(ultimo=Max("pk"))["ultimo"] or 0
+    # Limpiar solo los comentarios nuevos o editados (el resto ya tiene texto_limpio)
+    limpieza.actualizar_textos_limpios(hasta=ultimo_id)
+    # Agrupar los comentarios que aun no se revisaron (los casi duplicados no se usan)
+    duplicados.registrar_pendientes(hasta=ultimo_id)
+    ultimo_id = ultimo_preparado(ultimo_id)
+
+    estado = leer_estado(entrenable)
+
+    motivo = "se pidio entrenar desde cero"
+    if modo != "completo":
+        vectorizador = None
+        if estado is not None and modelo_sentimientos.modelo_disponible(entrenable):
+            vectorizador = joblib.load(entrenable.vectorizador_path)
+        nuevos = None
+        if estado is not None:
+            nuevos = leer_comentarios(Comment.objects.filter(pk__gt=estado["ultimo_id"], pk__lte=ultimo_id))
+        motivo = motivo_completo(entrenable, estado, nuevos, vectorizador, forzar_incremental=modo == "incremental")
+        if motivo is not None and modo == "incremental":
+            return {"ok": False, "error": f"No se puede entrenar de forma incremental: {motivo}"}
+        if motivo is None and modo == "auto" and nuevos.empty:
+            return {"ok": True, "sin_cambios": True}
+
+    if motivo is None:
+        import pandas as pd
+
+        repaso = muestra_repaso(estado["ultimo_id"], max(MINIMO_REPASO, PROPORCION_REPASO * len(nuevos)))
+        df = pd.concat([nuevos, repaso], ignore_index=True)
+        modelo_anterior = entrenable.cargar(entrenable.modelo_path)
+        resultado = modelo_sentimientos.entrenar_modelo(df, motor, anterior=(modelo_anterior, vectorizador))
+        estado = {
+            "ultimo_id": ultimo_id,
+            "comentarios": estado["comentarios"] + len(nuevos),
+            "incrementales": estado["incrementales"] + 1,
+        }
+    elif entrenable.en_flujo:
+        # Lee los comentarios en bloques, sin cargarlos todos en memoria
+        resultado = entrenamiento_flujo.entrenar_en_flujo(entrenable, ultimo_id)
+        if not resultado["ok"]:
+            return resultado
+        estado = {"ultimo_id": ultimo_id, "comentarios": resultado["comentarios"], "incrementales": 0}
+    else:
+        df = leer_comentarios(Comment.objects.filter(pk__lte=ultimo_id))
+        resultado = modelo_sentimientos.entrenar_modelo(df, motor)
+        estado = {"ultimo_id": ultimo_id, "comentarios": len(df), "incrementales": 0}
+
+    estado["version"] = modelo_sentimientos.version_modelo(entrenable)
+    estado["configuracion"] = modelo_sentimientos.leer_configuracion()
+    guardar_estado(entrenable, estado)
+    resultado.update({"ok": True, "motivo": motivo, "nuevos": len(nuevos) if motivo is None else None})
+    return resultado
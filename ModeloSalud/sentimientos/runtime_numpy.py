@@ -0,0 +1,235 @@
+"""
+Inferencia de la red de sentimientos solo con NumPy/SciPy (sin TensorFlow).
+
+Para predecir no hace falta TensorFlow: la red es una serie de capas densas
+(multiplicar por una matriz, sumar el sesgo y aplicar ReLU o sigmoide).
+Al final del entrenamiento exportamos los pesos y el vocabulario/IDF del
+TfidfVectorizer a un archivo .npz, y aqui los usamos para:
+
+1. Calcular TF-IDF igual que scikit-learn (matriz dispersa)
+2. Pasar la matriz dispersa por las capas de la red
+
+Los workers web que usan este motor no importan TensorFlow ni scikit-learn.
+
+Opcionalmente los pesos se guardan cuantizados a int8 (un byte por peso en vez
+de cuatro) con una escala por neurona de salida: peso ~= entero * escala.
+
+El .npz se guarda alineado y sin comprimir (ver ModeloSalud.artefactos): al cargar,
+los pesos y el vocabulario se mapean en memoria de solo lectura y todos los
+workers del servidor comparten la misma copia.
+"""
+
+import re
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+
+from ModeloSalud.artefactos import cargar_npz, guardar_npz
+
+# Activaciones que sabemos calcular
+ACTIVACIONES = {
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": lambda x: expit(x, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "linear": lambda x: x,
+}
+
+
+# Funcion para cuantizar una matriz de pesos a int8 con una escala por columna (neurona)
+def cuantizar_pesos(pesos):
+    maximos = np.abs(pesos).max(axis=0)
+    escala = np.where(maximos > 0, maximos / 127.0, 1.0).astype(np.float32)
+    enteros = np.clip(np.rint(pesos / escala), -127, 127).astype(np.int8)
+    return enteros, escala
+
+
+# Funcion para exportar la red de Keras y el vectorizador a un archivo .npz
+# Con cuantizar=True los pesos se guardan como int8 + escala por neurona (~4 veces mas chico)
+def exportar(modelo, vectorizador, ruta, cuantizar=False):
+    # Solo soportamos la configuracion "normal" del vectorizador
+    if (vectorizador.analyzer != "word" or vectorizador.tokenizer is not None
+            or vectorizador.preprocessor is not None or vectorizador.strip_accents is not None
+            or vectorizador.binary or not vectorizador.use_idf):
+        raise ValueError("Configuracion de TfidfVectorizer no soportada por el runtime NumPy")
+
+    # Vocabulario como arreglo de bytes UTF-8 ordenado + la columna de cada termino.
+    # Se busca con busqueda binaria (np.searchsorted), asi no hace falta armar un
+    # diccionario en cada worker y el arreglo se puede mapear en memoria
+    terminos = sorted((termino.encode("utf-8"), columna) for termino, columna in vectorizador.vocabulary_.items())
+
+    datos = {
+        "vocabulario": np.array([termino for termino, _ in terminos], dtype=np.bytes_),
+        "vocabulario_columnas": np.array([columna for _, columna in terminos], dtype=np.int32),
+        "idf": vectorizador.idf_.astype(np.float32),
+        "ngram_min": np.int32(vectorizador.ngram_range[0]),
+        "ngram_max": np.int32(vectorizador.ngram_range[1]),
+        "token_pattern": np.array(vectorizador.token_pattern),
+        "lowercase": np.bool_(vectorizador.lowercase),
+        "norm": np.array(vectorizador.norm or "none"),
+        "sublinear_tf": np.bool_(vectorizador.sublinear_tf),
+    }
+
+    # Solo las capas con pesos (Dense); Dropout no hace nada al predecir
+    capas = [capa for capa in modelo.layers if capa.get_weights()]
+    for i, capa in enumerate(capas):
+        pesos, sesgo = capa.get_weights()
+        activacion = capa.get_config().get("activation", "linear")
+        if activacion not in ACTIVACIONES:
+            raise ValueError(f"Activacion no soportada por el runtime NumPy: {activacion}")
+        if cuantizar:
+            datos[f"capa_{i}_pesos"], datos[f"capa_{i}_escala"] = cuantizar_pesos(pesos)
+        else:
+            datos[f"capa_{i}_pesos"] = pesos.astype(np.float32)
+        datos[f"capa_{i}_sesgo"] = sesgo.astype(np.float32)
+        datos[f"capa_{i}_activacion"] = np.array(activacion)
+    datos["n_capas"] = np.int32(len(capas))
+
+    guardar_npz(ruta, datos)
+
+
+class VectorizadorNumpy:
+    """
+    Calcula TF-IDF igual que el TfidfVectorizer de scikit-learn con el que se entreno
+    """
+
+    def __init__(self, datos):
+        self.vocabulario = datos["vocabulario"]
+        self.columnas = datos["vocabulario_columnas"]
+        self.idf = datos["idf"]
+        self.ngram_min = int(datos["ngram_min"])
+        self.ngram_max = int(datos["ngram_max"])
+        self.patron = re.compile(str(datos["token_pattern"]))
+        self.lowercase = bool(datos["lowercase"])
+        self.norm = str(datos["norm"])
+        self.sublinear_tf = bool(datos["sublinear_tf"])
+
+    def _terminos(self, texto):
+        # Igual que scikit-learn: palabras sueltas y luego n-gramas unidos por espacio
+        if self.lowercase:
+            texto = texto.lower()
+        palabras = self.patron.findall(texto)
+        total = len(palabras)
+        for n in range(self.ngram_min, min(self.ngram_max, total) + 1):
+            if n == 1:
+                yield from palabras
+            else:
+                for i in range(total - n + 1):
+                    yield " ".join(palabras[i:i + n])
+
+    def _buscar(self, terminos, filas):
+        # Los terminos mas largos que el mas largo del vocabulario no pueden estar en el
+        # (y compararlos con un arreglo de ancho fijo los cortaria)
+        ancho = self.vocabulario.dtype.itemsize
+        largos = np.fromiter(map(len, terminos), dtype=np.int64, count=len(terminos))
+        cortos = largos <= ancho
+        buscados = np.array([t for t, corto in zip(terminos, cortos) if corto], dtype=self.vocabulario.dtype)
+        filas = np.asarray(filas, dtype=np.int64)[cortos]
+
+        # Busqueda binaria de todos los terminos a la vez
+        posiciones = np.searchsorted(self.vocabulario, buscados)
+        np.minimum(posiciones, len(self.vocabulario) - 1, out=posiciones)
+        encontrados = self.vocabulario[posiciones] == buscados
+        return filas[encontrados], self.columnas[posiciones[encontrados]]
+
+    def transform(self, textos):
+        terminos, filas = [], []
+        for fila, texto in enumerate(textos):
+            for termino in self._terminos(texto):
+                terminos.append(termino.encode("utf-8"))
+                filas.append(fila)
+        if terminos:
+            filas, columnas = self._buscar(terminos, filas)
+        else:
+            columnas = []
+
+        # Las repeticiones del mismo termino se suman al convertir a CSR
+        conteos = sp.csr_matrix(
+            (np.ones(len(filas), dtype=np.float32), (filas, columnas)),
+            shape=(len(textos), len(self.idf)),
+        )
+        conteos.sum_duplicates()
+
+        if self.sublinear_tf:
+            np.log(conteos.data, out=conteos.data)
+            conteos.data += 1
+
+        # Multiplicar cada columna por su IDF
+        conteos.data *= self.idf[conteos.indices]
+
+        # Normalizar cada fila (largo 1)
+        if self.norm == "l2":
+            normas = np.sqrt(np.asarray(conteos.multiply(conteos).sum(axis=1)).ravel())
+        elif self.norm == "l1":
+            normas = np.asarray(abs(conteos).sum(axis=1)).ravel()
+        else:
+            return conteos
+        normas[normas == 0] = 1
+        conteos.data /= np.repeat(normas, np.diff(conteos.indptr)).astype(np.float32)
+        return conteos
+
+
+class RedNumpy:
+    """
+    Pasada hacia adelante de la red densa, aceptando matrices dispersas en la entrada
+
+    Si el archivo esta cuantizado, la primera capa (5000 x 256, casi todos los pesos)
+    queda en memoria como int8 y solo se convierten a float las filas de las palabras
+    que aparecen en el lote. Las demas capas son chicas y se convierten al cargar.
+    """
+
+    def __init__(self, datos):
+        self.cuantizada = "capa_0_escala" in datos
+        self.capas = []
+        for i in range(int(datos["n_capas"])):
+            pesos = datos[f"capa_{i}_pesos"]
+            escala = datos[f"capa_{i}_escala"] if f"capa_{i}_escala" in datos else None
+            if escala is not None and i > 0:
+                pesos, escala = pesos.astype(np.float32) * escala, None
+            self.capas.append((
+                pesos,
+                escala,
+                datos[f"capa_{i}_sesgo"],
+                ACTIVACIONES[str(datos[f"capa_{i}_activacion"])],
+            ))
+
+    def _multiplicar(self, X, pesos, escala):
+        if escala is None:
+            return np.asarray(X @ pesos, dtype=np.float32)
+
+        # Pesos int8: solo convertimos las filas de las columnas presentes en X
+        if sp.issparse(X):
+            X = X.tocsr()
+            columnas, posiciones = np.unique(X.indices, return_inverse=True)
+            X = sp.csr_matrix((X.data, posiciones, X.indptr), shape=(X.shape[0], len(columnas)))
+            salida = np.asarray(X @ pesos[columnas].astype(np.float32), dtype=np.float32)
+        else:
+            salida = np.asarray(X @ pesos.astype(np.float32), dtype=np.float32)
+        salida *= escala
+        return salida
+
+    def predecir(self, X):
+        """Devuelve la salida de la ultima neurona (probabilidad de positivo) por fila"""
+        salida = X
+        for pesos, escala, sesgo, activacion in self.capas:
+            # La primera capa multiplica la matriz dispersa; las demas son densas
+            salida = self._multiplicar(salida, pesos, escala)
+            salida += sesgo
+            salida = activacion(salida)
+        return salida[:, 0]
+
+
+# Funciones para leer el .npz exportado (los arreglos quedan mapeados en memoria)
+def cargar_red(ruta):
+    return RedNumpy(cargar_npz(ruta))
+
+
+def cargar_vectorizador(ruta):
+    return VectorizadorNumpy(cargar_npz(ruta))
+
+
+# Funcion para predecir directo desde un .npz (la usa el entrenamiento para verificar la exportacion)
+def predecir_archivo(ruta, textos_limpios):
+    red = cargar_red(ruta)
+    vectorizador = cargar_vectorizador(ruta)
+    return red.predecir(vectorizador.transform(textos_limpios))
@@ -0,0 +1,253 @@
+"""
+Tendencias de sentimiento por dia, semana y mes (tabla ResumenSentimiento).
+
+El grafico de tendencia no recorre los comentarios: lee la tabla de resumen, que
+tiene una fila por periodo y sentimiento. Un grafico semanal de tres años son
+unas 300 filas.
+
+El sentimiento de un comentario es su etiqueta o, si no tiene (kioscos), la que
+predijo el modelo. Los comentarios sin fecha o sin ninguna de las dos no se cuentan.
+
+Como se mantiene el resumen:
+- Comentarios nuevos: registrar_nuevos() suma los que tienen en_resumen=False y
+  los marca en la misma transaccion. Sirve para todas las formas de insertar (save,
+  cargas masivas, API de ingesta) sin contar nada dos veces. Se marca cada
+  comentario y no el ultimo id sumado: en PostgreSQL los ids salen de una secuencia
+  y una transaccion con ids mas bajos (una carga con COPY) puede confirmarse despues
+  que otra con ids mas altos.
+- Cambios y borrados de comentarios ya sumados: las senales de save() y delete()
+  restan el valor anterior y suman el nuevo.
+- La fila de ProgresoResumen se bloquea mientras se suma, para que dos procesos
+  no sumen lo mismo a la vez.
+- Predicciones guardadas en bloque: puntuacion.guardar_predicciones() llama a
+  predicciones_cambiadas() antes de escribirlas.
+
+Los cambios hechos con update() u otras sentencias en bloque no pasan por aca:
+reconstruir() (comando reconstruir_tendencias) vuelve a calcular todo.
+"""
+
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from ModeloSalud.carga_masiva import actualizar_por_id
+
+from .models import Comment, ProgresoResumen, ResumenSentimiento
+
+PERIODOS = ("dia", "semana", "mes")
+
+SENTIMIENTOS = ("positivo", "negativo")
+
+# Comentarios que se leen juntos al sumar los nuevos
+TAMANO_BLOQUE = 50000
+
+# Ids que se piden por consulta al ajustar predicciones
+TAMANO_CONSULTA = 5000
+
+
+# Funcion que devuelve el primer dia del periodo que contiene a la fecha
+def inicio_periodo(fecha, periodo):
+    if periodo == "semana":
+        return fecha - datetime.timedelta(days=fecha.weekday())
+    if periodo == "mes":
+        return fecha.replace(day=1)
+    return fecha
+
+
+# Funcion que devuelve el sentimiento que se cuenta: la etiqueta o, si no tiene, la prediccion
+def sentimiento(etiqueta, etiqueta_predicha):
+    valor = etiqueta or etiqueta_predicha
+    return valor if valor in SENTIMIENTOS else None
+
+
+# Funcion que suma una cantidad a una fila del resumen (la crea si no existe)
+def _sumar_fila(periodo, inicio, valor, cantidad):
+    filtro = {"periodo": periodo, "inicio": inicio, "sentimiento": valor}
+    if ResumenSentimiento.objects.filter(**filtro).update(total=F("total") + cantidad):
+        return
+    try:
+        with transaction.atomic():
+            ResumenSentimiento.objects.create(total=cantidad, **filtro)
+    except IntegrityError:
+        # Otro proceso creo la fila entre el update y el create
+        ResumenSentimiento.objects.filter(**filtro).update(total=F("total") + cantidad)
+
+
+# Funcion que suma cambios {(fecha, sentimiento): cantidad} en los tres periodos
+# (la cantidad es negativa para restar). Se llama dentro de una transaccion.
+# Las filas que ya existen se actualizan juntas (total = total + n, ver actualizar_por_id)
+# y las que faltan se crean juntas: son pocas consultas aunque haya miles de dias.
+def sumar(cambios):
+    por_periodo = Counter()
+    for (fecha, valor), cantidad in cambios.items():
+        if fecha is None or valor is None or not cantidad:
+            continue
+        for periodo in PERIODOS:
+            por_periodo[(periodo, inicio_periodo(fecha, periodo), valor)] += cantidad
+    por_periodo = {clave: cantidad for clave, cantidad in por_periodo.items() if cantidad}
+    if not por_periodo:
+        return
+
+    existentes = {}
+    inicios = sorted({inicio for _, inicio, _ in por_periodo})
+    for desde in range(0, len(inicios), TAMANO_CONSULTA):
+        filas = ResumenSentimiento.objects.filter(inicio__in=inicios[desde:desde + TAMANO_CONSULTA])
+        existentes.update(((periodo, inicio, valor), pk) for pk, periodo, inicio, valor
+                          in filas.values_list("pk", "periodo", "inicio", "sentimiento"))
+
+    actualizar_por_id(
+        ResumenSentimiento, ["total"],
+        [(cantidad, existentes[clave]) for clave, cantidad in por_periodo.items() if clave in existentes],
+        sumar=True,
+    )
+
+    nuevas = [(clave, cantidad) for clave, cantidad in por_periodo.items() if clave not in existentes]
+    try:
+        with transaction.atomic():
+            ResumenSentimiento.objects.bulk_create([
+                ResumenSentimiento(periodo=periodo, inicio=inicio, sentimiento=valor, total=cantidad)
+                for (periodo, inicio, valor), cantidad in nuevas
+            ])
+    except IntegrityError:
+        # Otro proceso creo alguna de las filas mientras tanto: se suman de a una
+        for (periodo, inicio, valor), cantidad in nuevas:
+            _sumar_fila(periodo, inicio, valor, cantidad)
+
+
+# Funcion que bloquea la fila de progreso hasta el final de la transaccion
+def _bloquear():
+    if ProgresoResumen.objects.select_for_update().filter(pk=1).first() is None:
+        ProgresoResumen.objects.get_or_create(pk=1)
+
+
+def registrar_nuevos(tamano_bloque=TAMANO_BLOQUE):
+    """
+    Suma al resumen los comentarios que todavia no estan sumados (en_resumen=False)
+
+    Devuelve cuantos comentarios se revisaron
+    """
+    revisados = 0
+    while True:
+        with transaction.atomic():
+            _bloquear()
+            bloque = list(
+                Comment.objects.filter(en_resumen=False).order_by("pk")
+                .values_list("pk", "fecha", "etiqueta", "etiqueta_predicha")[:tamano_bloque]
+            )
+            if not bloque:
+                return revisados
+            sumar(Counter((fecha, sentimiento(etiqueta, predicha)) for _, fecha, etiqueta, predicha in bloque))
+            actualizar_por_id(Comment, ["en_resumen"], [(True, pk) for pk, _, _, _ in bloque])
+        revisados += len(bloque)
+
+
+def reconstruir():
+    """
+    Borra el resumen y lo vuelve a calcular con todos los comentarios (una consulta agrupada)
+
+    Devuelve cuantas filas tiene el resumen
+    """
+    with transaction.atomic():
+        _bloquear()
+        ResumenSentimiento.objects.all().delete()
+        # Primero se marcan y despues se cuentan los marcados: los que se confirmen
+        # entre las dos consultas quedan sin marcar y los suma registrar_nuevos()
+        Comment.objects.filter(en_resumen=False).update(en_resumen=True)
+        grupos = (
+            Comment.objects.filter(en_resumen=True).exclude(fecha=None)
+            .values_list("fecha", "etiqueta", "etiqueta_predicha").annotate(cantidad=Count("id")).order_by()
+        )
+        cambios = Counter()
+        for fecha, etiqueta, predicha, cantidad in grupos:
+            cambios[(fecha, sentimiento(etiqueta, predicha))] += cantidad
+        sumar(cambios)
+    # Los que llegaron mientras tanto
+    registrar_nuevos()
+    return ResumenSentimiento.objects.count()
+
+
+def predicciones_cambiadas(filas):
+    """
+    Ajusta el resumen antes de guardar predicciones [(etiqueta_predicha, confianza, version, id)]
+
+    Solo cambian el resumen los comentarios ya sumados y sin etiqueta.
+    Se llama dentro de la transaccion que guarda las predicciones; el progreso queda
+    bloqueado para que registrar_nuevos() no sume a la vez la prediccion anterior.
+    """
+    if not filas:
+        return
+    _bloquear()
+    nuevas = {pk: predicha for predicha, _, _, pk in filas}
+    cambios = Counter()
+    ids = list(nuevas)
+    for inicio in range(0, len(ids), TAMANO_CONSULTA):
+        anteriores = (
+            Comment.objects.filter(pk__in=ids[inicio:inicio + TAMANO_CONSULTA], etiqueta="", en_resumen=True)
+            .exclude(fecha=None).values_list("pk", "fecha", "etiqueta_predicha")
+        )
+        for pk, fecha, predicha in anteriores:
+            if predicha != nuevas[pk]:
+                cambios[(fecha, sentimiento("", predicha))] -= 1
+                cambios[(fecha, sentimiento("", nuevas[pk]))] += 1
+    sumar(cambios)
+
+
+def serie(periodo, desde=None, hasta=None):
+    """
+    Devuelve la tendencia [{"inicio", "positivo", "negativo"}] de los periodos entre desde y hasta
+    """
+    filas = ResumenSentimiento.objects.filter(periodo=periodo)
+    if desde is not None:
+        filas = filas.filter(inicio__gte=inicio_periodo(desde, periodo))
+    if hasta is not None:
+        filas = filas.filter(inicio__lte=hasta)
+    puntos = {}
+    for inicio, valor, total in filas.order_by("inicio").values_list("inicio", "sentimiento", "total"):
+        punto = puntos.setdefault(inicio, {"inicio": inicio.isoformat(), "positivo": 0, "negativo": 0})
+        punto[valor] = total
+    return list(puntos.values())
+
+
+# Funcion que lee de la base (fecha, sentimiento) de un comentario ya sumado (None si no
+# existe o todavia no se sumo). Se lee de la base y no de la instancia: la prediccion pudo
+# cambiar con un UPDATE en bloque, y en_resumen con registrar_nuevos()
+def _valor_guardado(pk):
+    fila = Comment.objects.filter(pk=pk, en_resumen=True).values_list("fecha", "etiqueta", "etiqueta_predicha").first()
+    return None if fila is None else (fila[0], sentimiento(fila[1], fila[2]))
+
+
+# Senales: cambios y borrados de comentarios uno por uno
+@receiver(pre_save, sender=Comment)
+def _antes_de_guardar(sender, instance, raw=False, **kwargs):
+    instance._valor_resumen = None
+    if not raw and instance.pk is not None:
+        instance._valor_resumen = _valor_guardado(instance.pk)
+        # La instancia pudo leerse antes de que se sumara: save() no debe desmarcarla
+        instance.en_resumen = instance._valor_resumen is not None
+
+
+@receiver(post_save, sender=Comment)
+def _comentario_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, "_valor_resumen", None)
+    if created or anterior is None:
+        registrar_nuevos()
+        return
+    actual = _valor_guardado(instance.pk)
+    if actual is not None and anterior != actual:
+        with transaction.atomic():
+            sumar(Counter({anterior: -1, actual: 1}))
+
+
+# Se resta antes de borrar, dentro de la misma transaccion que el borrado
+@receiver(pre_delete, sender=Comment)
+def _antes_de_borrar(sender, instance, **kwargs):
+    if instance.pk is not None:
+        valor = _valor_guardado(instance.pk)
+        if valor is not None:
+            sumar(Counter({valor: -1}))
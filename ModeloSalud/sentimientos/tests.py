@@ -0,0 +1,721 @@
+import asyncio
+import datetime
+import importlib
+import io
+import json
+import queue
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ModeloSalud import ejecucion
+from ModeloSalud.carga_masiva import actualizar_por_id, insertar_filas, insertar_sin_duplicados
+
+from . import (busqueda, cola_puntuacion, duplicados, frases, ingesta, limpieza, lotes, modelo_sentimientos,
+               puntuacion, reentrenamiento, tendencias)
+from .models import BandaLSH, Comment, FraseSentimiento, ResumenSentimiento
+
+
+# Cola de puntuacion de prueba: acepta los primeros grupos y despues dice que esta llena
+class ColaLlena:
+    def __init__(self, aceptar=0):
+        self.aceptar = aceptar
+        self.recibidos = []
+
+    def encolar(self, filas, timeout=0.0):
+        if len(self.recibidos) >= self.aceptar:
+            return False
+        self.recibidos.append(filas)
+        return True
+
+    def estado(self):
+        return {"pendientes": 0, "puntuados": 0, "ultimo_error": None}
+
+
+# Textos de prueba distintos entre si (sin casi duplicados): palabras al azar de un vocabulario fijo
+PALABRAS = ("atencion medico turno espera guardia enfermera trato limpieza sala receta farmacia "
+            "hospital consulta horario demora amable rapido lento excelente pesimo bueno malo "
+            "recepcion estudio analisis pediatra urgencia cama comida ruido").split()
+
+
+def textos_distintos(cantidad, semilla=0):
+    import numpy as np
+    rng = np.random.default_rng(semilla)
+    return [" ".join(rng.choice(PALABRAS, size=8)) + f" {i}" for i in range(cantidad)]
+
+
+def crear_comentarios(textos, etiqueta="positivo"):
+    return [Comment.objects.create(fecha="2026-01-05", texto=texto, etiqueta=etiqueta) for texto in textos]
+
+
+def jsonl(*lineas):
+    return "\n".join(json.dumps(linea) if isinstance(linea, dict) else linea for linea in lineas)
+
+
+class IngestaJsonlTests(TestCase):
+
+    def test_carga_comentarios_con_y_sin_etiqueta(self):
+        resultado = ingesta.cargar_comentarios_jsonl(jsonl(
+            {"texto": "La atencion fue excelente", "etiqueta": "Positivo", "fecha": "2026-01-05"},
+            {"texto": "Comentario del kiosco sin etiqueta"},
+        ).splitlines())
+
+        self.assertTrue(resultado["completa"])
+        self.assertEqual(resultado["insertadas"], 2)
+        etiquetas = dict(Comment.objects.values_list("texto", "etiqueta"))
+        self.assertEqual(etiquetas, {"La atencion fue excelente": "positivo",
+                                     "Comentario del kiosco sin etiqueta": ""})
+
+    def test_lineas_invalidas_y_repetidas(self):
+        resultado = ingesta.cargar_comentarios_jsonl(jsonl(
+            {"texto": "Muy buena atencion"},
+            "esto no es json",
+            {"texto": "   "},
+            {"texto": "Otro comentario", "etiqueta": "neutro"},
+            {"texto": "Fecha mala", "fecha": "05/01/2026"},
+            {"texto": "Muy buena atencion"},
+        ).splitlines())
+
+        self.assertEqual(resultado["insertadas"], 1)
+        self.assertEqual(resultado["invalidas"], 4)
+        self.assertEqual(resultado["repetidas"], 1)
+        self.assertEqual(len(resultado["errores"]), 4)
+
+    def test_huellas_de_la_migracion_coinciden_con_la_ingesta(self):
+        # Comentarios cargados antes de existir la huella, con espacios de mas
+        Comment.objects.bulk_create([Comment(texto="  Muy buena atencion \n"), Comment(texto="Muy buena atencion")])
+        migracion = importlib.import_module("sentimientos.migrations.0005_huella_comentarios")
+        migracion.calcular_huellas(apps, SimpleNamespace(quote_name=connection.ops.quote_name, connection=connection))
+
+        self.assertEqual(list(Comment.objects.order_by("pk").values_list("huella", flat=True)),
+                         [ingesta.huella_texto("Muy buena atencion"), None])
+        resultado = ingesta.cargar_comentarios_jsonl(jsonl({"texto": "Muy buena atencion"}).splitlines())
+        self.assertEqual(resultado["insertadas"], 0)
+
+    def test_reenviar_no_duplica(self):
+        lineas = jsonl({"texto": "Primero"}, {"texto": "Segundo"}).splitlines()
+        ingesta.cargar_comentarios_jsonl(lineas)
+        resultado = ingesta.cargar_comentarios_jsonl(lineas)
+
+        self.assertEqual(resultado["insertadas"], 0)
+        self.assertEqual(resultado["repetidas"], 2)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "COPY solo existe en PostgreSQL")
+    def test_copy_postgresql_textos_vacios_no_son_null(self):
+        filas = [
+            ("2026-01-05", "Sin etiqueta", "", ingesta.huella_texto("Sin etiqueta")),
+            ("2026-01-05", 'Con "comillas", coma y \\N', "negativo", ingesta.huella_texto("otro")),
+        ]
+        insertadas = insertar_sin_duplicados(Comment, ["fecha", "texto", "etiqueta", "huella"], filas, ["huella"])
+
+        self.assertEqual(insertadas, 2)
+        self.assertEqual(
+            sorted(Comment.objects.values_list("texto", "etiqueta")),
+            [('Con "comillas", coma y \\N', "negativo"), ("Sin etiqueta", "")],
+        )
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "COPY solo existe en PostgreSQL")
+    def test_api_postgresql_linea_sin_etiqueta(self):
+        with mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=False):
+            respuesta = self.client.post("/api/comentarios/ingesta/", jsonl({"texto": "Kiosco sin etiqueta"}),
+                                         content_type="application/x-ndjson")
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["insertadas"], 1)
+        self.assertEqual(Comment.objects.get().etiqueta, "")
+
+
+@override_settings(SENTIMIENTOS_INGESTA_LOTE=2, SENTIMIENTOS_INGESTA_ESPERA_S=0)
+class IngestaApiTests(TestCase):
+
+    def enviar(self, cola, *lineas):
+        with mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=True), \
+                mock.patch.object(cola_puntuacion, "obtener_cola", return_value=cola):
+            return self.client.post("/api/comentarios/ingesta/", jsonl(*lineas),
+                                    content_type="application/x-ndjson")
+
+    def test_encola_los_comentarios_nuevos(self):
+        cola = ColaLlena(aceptar=10)
+        respuesta = self.enviar(cola, {"texto": "uno"}, {"texto": "dos"}, {"texto": "tres"})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["insertadas"], 3)
+        self.assertEqual(sorted(texto for filas in cola.recibidos for _, texto in filas), ["dos", "tres", "uno"])
+
+    def test_cola_llena_responde_503_con_las_lineas_cargadas(self):
+        cola = ColaLlena(aceptar=1)
+        respuesta = self.enviar(cola, *({"texto": f"comentario {i}"} for i in range(1, 7)))
+
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(respuesta["Retry-After"], "1")
+        datos = respuesta.json()
+        self.assertFalse(datos["ok"])
+        self.assertFalse(datos["completa"])
+        # El primer lote entro en la cola y el segundo quedo guardado pero sin lugar: se corta ahi
+        self.assertEqual(datos["lineas"], 4)
+        self.assertEqual(Comment.objects.count(), 4)
+
+        # Reenviar desde la linea siguiente carga el resto sin duplicar
+        respuesta = self.enviar(ColaLlena(aceptar=10), *({"texto": f"comentario {i}"} for i in range(5, 7)))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(Comment.objects.count(), 6)
+
+    def test_metodo_get_no_permitido(self):
+        self.assertEqual(self.client.get("/api/comentarios/ingesta/").status_code, 405)
+
+
+# Entrenamiento incremental o completo (sin entrenar de verdad: entrenar_modelo y el estado se simulan)
+class ReentrenamientoTests(TestCase):
+
+    def setUp(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.motor = modelo_sentimientos.obtener_motor("mlp")
+        textos = textos_distintos(60)
+        crear_comentarios(textos[:30], "positivo")
+        crear_comentarios(textos[30:], "negativo")
+        limpieza.actualizar_textos_limpios()
+        duplicados.registrar_pendientes()
+        self.vistos = Comment.objects.order_by("-pk").values_list("pk", flat=True).first()
+        self.vectorizador = TfidfVectorizer().fit(Comment.objects.values_list("texto_limpio", flat=True))
+        self.estado = {"ultimo_id": self.vistos, "comentarios": 60, "incrementales": 0,
+                       "version": "v1", "configuracion": {}}
+
+    def reentrenar(self, modo="auto"):
+        entrenar = mock.MagicMock(return_value={})
+        guardar = mock.MagicMock()
+        with mock.patch.object(reentrenamiento, "leer_estado", return_value=dict(self.estado)), \
+                mock.patch.object(reentrenamiento, "guardar_estado", guardar), \
+                mock.patch.object(modelo_sentimientos, "entrenar_modelo", entrenar), \
+                mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=True), \
+                mock.patch.object(modelo_sentimientos, "version_modelo", return_value="v1"), \
+                mock.patch.object(modelo_sentimientos, "leer_configuracion", return_value={}), \
+                mock.patch.object(self.motor, "cargar", return_value="modelo anterior"), \
+                mock.patch("joblib.load", return_value=self.vectorizador):
+            resultado = reentrenamiento.reentrenar(modo, "mlp")
+        return resultado, entrenar, guardar
+
+    def test_pocos_nuevos_entrena_incremental(self):
+        nuevos = crear_comentarios(textos_distintos(5, semilla=1), "negativo")
+        resultado, entrenar, guardar = self.reentrenar()
+
+        self.assertIsNone(resultado["motivo"])
+        self.assertEqual(resultado["nuevos"], 5)
+        df, _ = entrenar.call_args.args
+        self.assertEqual(entrenar.call_args.kwargs["anterior"], ("modelo anterior", self.vectorizador))
+        # Los nuevos mas el repaso de los ya vistos
+        self.assertTrue({c.pk for c in nuevos} <= set(df["id"]))
+        self.assertEqual(len(df), 65)
+        estado = guardar.call_args.args[1]
+        self.assertEqual((estado["ultimo_id"], estado["comentarios"], estado["incrementales"]),
+                         (nuevos[-1].pk, 65, 1))
+
+    def test_muchos_nuevos_entrena_completo(self):
+        nuevos = crear_comentarios(textos_distintos(30, semilla=2), "negativo")
+        resultado, entrenar, guardar = self.reentrenar()
+
+        self.assertIn("comentarios nuevos", resultado["motivo"])
+        df, _ = entrenar.call_args.args
+        self.assertNotIn("anterior", entrenar.call_args.kwargs)
+        self.assertEqual(len(df), 90)
+        self.assertEqual(guardar.call_args.args[1]["incrementales"], 0)
+        self.assertEqual(guardar.call_args.args[1]["ultimo_id"], nuevos[-1].pk)
+
+    def test_sin_nuevos_no_entrena(self):
+        resultado, entrenar, _ = self.reentrenar()
+
+        self.assertEqual(resultado, {"ok": True, "sin_cambios": True})
+        entrenar.assert_not_called()
+
+    def test_incremental_sin_estado_es_error(self):
+        self.estado = None
+        with mock.patch.object(reentrenamiento, "leer_estado", return_value=None):
+            resultado = reentrenamiento.reentrenar("incremental", "mlp")
+        self.assertFalse(resultado["ok"])
+
+    def test_comentario_que_llega_durante_la_preparacion_queda_para_la_proxima(self):
+        crear_comentarios(textos_distintos(3, semilla=3), "positivo")
+        agrupar = duplicados.registrar_pendientes
+        tardios = []
+
+        def agrupar_mientras_llega_otro(*args, **kwargs):
+            # Llega un comentario despues de la limpieza: queda con texto_limpio NULL
+            tardios.extend(crear_comentarios(textos_distintos(1, semilla=4), "negativo"))
+            return agrupar(*args, **kwargs)
+
+        with mock.patch.object(duplicados, "registrar_pendientes", agrupar_mientras_llega_otro):
+            resultado, entrenar, guardar = self.reentrenar()
+
+        self.assertIsNone(resultado["motivo"])
+        self.assertEqual(resultado["nuevos"], 3)
+        df, _ = entrenar.call_args.args
+        self.assertNotIn(tardios[0].pk, set(df["id"]))
+        self.assertFalse(df["texto_limpio"].isna().any())
+        self.assertLess(guardar.call_args.args[1]["ultimo_id"], tardios[0].pk)
+
+    def test_no_avanza_mas_alla_de_un_comentario_sin_preparar(self):
+        primero, segundo = crear_comentarios(textos_distintos(2, semilla=5))
+        Comment.objects.filter(pk=primero.pk).update(texto_limpio=None)
+
+        self.assertEqual(reentrenamiento.ultimo_preparado(segundo.pk), primero.pk - 1)
+        limpieza.actualizar_textos_limpios()
+        self.assertEqual(reentrenamiento.ultimo_preparado(segundo.pk), segundo.pk)
+
+
+# actualizar_por_id e insertar_filas (VALUES en lotes en PostgreSQL, executemany en SQLite)
+class ActualizacionMasivaTests(TestCase):
+
+    def test_actualiza_varios_tipos_en_lotes(self):
+        primero, segundo, tercero = crear_comentarios(textos_distintos(3))
+        actualizar_por_id(Comment, ["minhash", "duplicado_de", "confianza_predicha"], [
+            (b"\x00\x01\xff", None, 0.25, primero.pk),
+            (b"", primero.pk, 1.0, segundo.pk),
+            (None, primero.pk, None, tercero.pk),
+        ], tamano_lote=2)
+
+        filas = {pk: (bytes(firma) if firma is not None else None, representante, confianza)
+                 for pk, firma, representante, confianza
+                 in Comment.objects.values_list("pk", "minhash", "duplicado_de", "confianza_predicha")}
+        self.assertEqual(filas, {
+            primero.pk: (b"\x00\x01\xff", None, 0.25),
+            segundo.pk: (b"", primero.pk, 1.0),
+            tercero.pk: (None, primero.pk, None),
+        })
+
+    def test_sumar(self):
+        fila = ResumenSentimiento.objects.create(periodo="dia", inicio="2026-01-05", sentimiento="positivo", total=5)
+        actualizar_por_id(ResumenSentimiento, ["total"], [(-2, fila.pk)], sumar=True)
+        fila.refresh_from_db()
+        self.assertEqual(fila.total, 3)
+
+    def test_insertar_filas(self):
+        comentario, = crear_comentarios(textos_distintos(1))
+        BandaLSH.objects.all().delete()
+        claves = [-2 ** 63, 0, 2 ** 63 - 1]
+        insertar_filas(BandaLSH, ["comentario", "clave"], [(comentario.pk, clave) for clave in claves], tamano_lote=2)
+        self.assertEqual(sorted(BandaLSH.objects.values_list("clave", flat=True)), claves)
+
+    def test_guardar_predicciones(self):
+        comentarios = crear_comentarios(textos_distintos(3))
+        puntuacion.guardar_predicciones([("negativo", 0.1, "lineal:v1", c.pk) for c in comentarios])
+        self.assertEqual(
+            set(Comment.objects.values_list("etiqueta_predicha", "confianza_predicha", "modelo_version")),
+            {("negativo", 0.1, "lineal:v1")},
+        )
+
+
+class PaginacionBusquedaTests(TestCase):
+
+    def setUp(self):
+        # El indice en memoria (fuera de PostgreSQL) es del proceso: no vuelve atras con cada prueba
+        busqueda.indice.invalidar()
+
+    def recorrer(self, query="", filtro="", cantidad=3):
+        vistos, cursor = [], None
+        while True:
+            comentarios, cursor = busqueda.pagina_comentarios(query, filtro, cursor, cantidad)
+            vistos.extend(c.pk for c in comentarios)
+            if cursor is None:
+                return vistos
+
+    def test_sin_query_recorre_todo_del_mas_nuevo_al_mas_viejo(self):
+        comentarios = crear_comentarios(textos_distintos(7))
+        self.assertEqual(self.recorrer(), [c.pk for c in reversed(comentarios)])
+
+    def test_empates_de_relevancia_en_el_borde_de_pagina(self):
+        # Todos tienen la misma relevancia: el orden lo decide el id y no se pierde ninguno
+        empatados = crear_comentarios([f"mucha demora en la guardia {i}" for i in range(8)])
+        crear_comentarios(["sin coincidencias aca"])
+
+        self.assertEqual(self.recorrer("demora"), [c.pk for c in reversed(empatados)])
+
+    def test_mas_relevantes_primero_y_filtro(self):
+        crear_comentarios([f"demora en la guardia {i}" for i in range(4)], etiqueta="negativo")
+        crear_comentarios(["demora demora y mas demora en el turno"], etiqueta="negativo")
+        crear_comentarios([f"poca demora {i}" for i in range(3)], etiqueta="positivo")
+
+        negativos = self.recorrer("demora", filtro="negativo", cantidad=2)
+        self.assertEqual(len(negativos), 5)
+        self.assertEqual(Comment.objects.get(pk=negativos[0]).texto, "demora demora y mas demora en el turno")
+        self.assertEqual(len(self.recorrer("demora", cantidad=2)), 8)
+
+    def test_cursor_invalido_empieza_de_nuevo(self):
+        crear_comentarios(textos_distintos(2))
+        self.assertIsNone(busqueda.texto_a_cursor("abc", con_rango=True))
+        comentarios, cursor = busqueda.pagina_comentarios("", "", "abc", 5)
+        self.assertEqual(len(comentarios), 2)
+        self.assertIsNone(cursor)
+
+
+class FrasesCacheTests(TestCase):
+
+    def setUp(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.vectorizador = TfidfVectorizer().fit(["demora guardia", "trato amable", "turno rapido"])
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+
+    def comentarios(self, *filas):
+        Comment.objects.bulk_create([Comment(pk=pk, fecha="2026-01-05", texto=texto, texto_limpio=texto,
+                                             etiqueta=etiqueta) for pk, texto, etiqueta in filas])
+
+    def test_comentario_confirmado_despues_con_id_menor(self):
+        self.comentarios((100, "demora guardia", "negativo"), (101, "trato amable", "positivo"))
+        self.assertEqual(frases.vectorizar_nuevos(self.vectorizador, self.carpeta, tamano_bloque=1), 2)
+
+        # Una carga con ids mas bajos se confirma despues de guardado el bloque de 101
+        self.comentarios((50, "demora guardia", "negativo"), (60, "turno rapido", "positivo"))
+        self.assertEqual(frases.vectorizar_nuevos(self.vectorizador, self.carpeta), 2)
+        self.assertEqual(frases.vectorizar_nuevos(self.vectorizador, self.carpeta), 0)
+
+        columnas = len(self.vectorizador.get_feature_names_out())
+        positivos, negativos, comentarios = frases.contar(self.carpeta, columnas)
+        conteo = dict(zip(self.vectorizador.get_feature_names_out(), zip(positivos.tolist(), negativos.tolist())))
+        self.assertEqual(comentarios, 4)
+        self.assertEqual(conteo["demora"], (0, 2))
+        self.assertEqual(conteo["turno"], (1, 0))
+
+
+class FrasesApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i, z in enumerate([-3.0, -1.5, 0.5, 2.0]):
+            FraseSentimiento.objects.create(modelo_version="tfidf:v1", frase=f"frase {i}", positivos=10 + i,
+                                            negativos=10, log_odds=z / 10, z=z)
+
+    def pedir(self, **parametros):
+        return self.client.get(reverse("api_frases"), parametros)
+
+    def test_mas_negativas_primero(self):
+        respuesta = self.pedir(sentimiento="negativo", cantidad=2)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([f["frase"] for f in respuesta.json()["frases"]], ["frase 0", "frase 1"])
+
+    def test_cantidad_fuera_de_rango_se_ajusta(self):
+        for cantidad, esperadas in ((-1, 1), (0, 1), (100000, 4)):
+            with self.subTest(cantidad=cantidad):
+                respuesta = self.pedir(sentimiento="positivo", cantidad=cantidad)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(len(respuesta.json()["frases"]), esperadas)
+
+    def test_parametros_invalidos_responden_400(self):
+        for parametros in ({"sentimiento": "neutro"}, {"cantidad": "muchas"}, {"minimo": -1}):
+            with self.subTest(**parametros):
+                respuesta = self.pedir(**parametros)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertFalse(respuesta.json()["ok"])
+
+
+# Agrupador de prueba: enviar() falla o devuelve los Futures que le pasan
+class AgrupadorFalso:
+    def __init__(self, *futuros, error=None):
+        self.futuros = list(futuros)
+        self.error = error
+
+    def enviar(self, texto):
+        if self.error is not None:
+            raise self.error
+        return self.futuros.pop(0)
+
+    def predecir(self, texto, timeout=None):
+        return self.enviar(texto).result(timeout)
+
+
+@override_settings(SENTIMIENTOS_LOTE_MAXIMO=64, EJECUCION_MAXIMO_CONCURRENTES=1, EJECUCION_ESPERA_S=0.05,
+                   EJECUCION_TIMEOUT_S=0.05)
+class PredecirAsyncTests(TestCase):
+
+    async def predecir(self, agrupador):
+        with mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=True), \
+                mock.patch.object(modelo_sentimientos, "obtener_agrupador", return_value=agrupador):
+            return await modelo_sentimientos.predecir_async("texto")
+
+    async def test_error_al_enviar_libera_el_lugar(self):
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                await self.predecir(AgrupadorFalso(error=RuntimeError("agrupador detenido")))
+
+        listo = Future()
+        listo.set_result({"ok": True})
+        self.assertEqual(await self.predecir(AgrupadorFalso(listo)), {"ok": True})
+
+    async def test_cola_del_agrupador_llena(self):
+        with self.assertRaises(ejecucion.Saturado):
+            await self.predecir(AgrupadorFalso(error=queue.Full()))
+        await asyncio.sleep(0)
+        self.assertFalse(ejecucion._semaforo().locked())
+
+    async def test_tiempo_agotado_libera_el_lugar_una_sola_vez(self):
+        colgado, listo = Future(), Future()
+        with self.assertRaises(ejecucion.TiempoAgotado):
+            await self.predecir(AgrupadorFalso(colgado))
+
+        # El lugar ya esta libre aunque el Future no termino
+        listo.set_result({"ok": True})
+        self.assertEqual(await self.predecir(AgrupadorFalso(listo)), {"ok": True})
+
+        # Cuando el primero termina no se devuelve un lugar de mas
+        colgado.set_result({"ok": True})
+        await asyncio.sleep(0)
+        self.assertFalse(ejecucion._semaforo().locked())
+        await ejecucion._semaforo().acquire()
+        self.assertTrue(ejecucion._semaforo().locked())
+
+
+class Parada(BaseException):
+    pass
+
+
+class AgrupadorTests(unittest.TestCase):
+
+    def test_lote_completo(self):
+        agrupador = lotes.AgrupadorPredicciones(lambda textos: [t.upper() for t in textos], espera_maxima=0)
+        self.assertEqual(agrupador.predecir("hola", timeout=5), "HOLA")
+
+    def test_menos_resultados_que_textos(self):
+        continuar = threading.Event()
+
+        def procesar(textos):
+            continuar.wait(5)
+            return textos[:1]
+
+        agrupador = lotes.AgrupadorPredicciones(procesar, espera_maxima=0.5)
+        primero, segundo = agrupador.enviar("a"), agrupador.enviar("b")
+        continuar.set()
+        self.assertEqual(primero.result(5), "a")
+        with self.assertRaises(RuntimeError):
+            segundo.result(5)
+
+    def test_cola_maxima(self):
+        empezo, continuar = threading.Event(), threading.Event()
+
+        def procesar(textos):
+            empezo.set()
+            continuar.wait(5)
+            return textos
+
+        agrupador = lotes.AgrupadorPredicciones(procesar, lote_maximo=1, espera_maxima=0, cola_maxima=1)
+        procesando = agrupador.enviar("a")
+        empezo.wait(5)
+        esperando = agrupador.enviar("b")
+        with self.assertRaises(queue.Full):
+            agrupador.enviar("c")
+        continuar.set()
+        self.assertEqual((procesando.result(5), esperando.result(5)), ("a", "b"))
+
+    @override_settings(SENTIMIENTOS_LOTE_MAXIMO=64)
+    def test_predecir_con_la_cola_llena(self):
+        with mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=True), \
+                mock.patch.object(modelo_sentimientos, "obtener_agrupador",
+                                  return_value=AgrupadorFalso(error=queue.Full())):
+            self.assertFalse(modelo_sentimientos.predecir("texto")["ok"])
+
+    def test_error_del_lote(self):
+        def procesar(textos):
+            raise ValueError("modelo roto")
+
+        agrupador = lotes.AgrupadorPredicciones(procesar, espera_maxima=0)
+        with self.assertRaises(ValueError):
+            agrupador.predecir("a", timeout=5)
+
+    def test_base_exception_no_deja_futuros_sin_terminar(self):
+        def procesar(textos):
+            raise Parada()
+
+        agrupador = lotes.AgrupadorPredicciones(procesar, espera_maxima=0)
+        # El hilo muere con la excepcion (sin imprimirla) y el siguiente envio arranca otro
+        with mock.patch.object(threading, "excepthook"):
+            with self.assertRaises(RuntimeError):
+                agrupador.predecir("a", timeout=5)
+            agrupador._hilo.join(5)
+            with self.assertRaises(RuntimeError):
+                agrupador.predecir("b", timeout=5)
+            agrupador._hilo.join(5)
+
+    @override_settings(SENTIMIENTOS_LOTE_MAXIMO=64, SENTIMIENTOS_LOTE_TIMEOUT_S=0.05)
+    def test_predecir_no_espera_para_siempre(self):
+        continuar = threading.Event()
+
+        def procesar(textos):
+            continuar.wait(5)
+            return textos
+
+        agrupador = lotes.AgrupadorPredicciones(procesar, espera_maxima=0)
+        with mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=True), \
+                mock.patch.object(modelo_sentimientos, "obtener_agrupador", return_value=agrupador):
+            resultado = modelo_sentimientos.predecir("texto")
+        continuar.set()
+        self.assertFalse(resultado["ok"])
+
+
+class DuplicadosTests(TestCase):
+
+    BASE = "la atencion en la guardia fue muy lenta y desordenada hoy esperamos cuatro horas con el nene"
+
+    def parecido(self, final):
+        return f"{self.BASE} {final}"
+
+    def grupos(self):
+        return dict(Comment.objects.values_list("texto", "duplicado_de__texto"))
+
+    def test_agrupa_casi_duplicados(self):
+        primero, segundo, distinto = crear_comentarios(
+            [self.parecido("ayer"), self.parecido("anoche"), "excelente trato de la enfermera de pediatria"])
+
+        self.assertEqual(self.grupos(), {primero.texto: None, segundo.texto: primero.texto, distinto.texto: None})
+        self.assertEqual(duplicados.buscar_parecidos(self.parecido("hoy"))[0][0], primero.pk)
+        self.assertEqual(duplicados.resumen()["casi_duplicados"], 1)
+
+    def test_comentario_etiquetado_reemplaza_al_representante_sin_etiqueta(self):
+        sin_etiqueta = crear_comentarios([self.parecido("ayer"), self.parecido("anoche")], etiqueta="")
+        etiquetado, = crear_comentarios([self.parecido("temprano")], etiqueta="negativo")
+        posterior, = crear_comentarios([self.parecido("tarde")], etiqueta="")
+
+        grupos = self.grupos()
+        self.assertIsNone(grupos[etiquetado.texto])
+        for comentario in sin_etiqueta + [posterior]:
+            self.assertEqual(grupos[comentario.texto], etiquetado.texto)
+        self.assertFalse(BandaLSH.objects.filter(comentario=sin_etiqueta[0]).exists())
+        self.assertEqual(list(Comment.objects.filter(duplicado_de=None, etiqueta__in=reentrenamiento.ETIQUETAS)),
+                         [etiquetado])
+
+    def test_etiquetas_distintas_forman_grupos_distintos(self):
+        positivo, = crear_comentarios([self.parecido("ayer")], etiqueta="positivo")
+        negativo, otro_negativo = crear_comentarios([self.parecido("anoche"), self.parecido("tarde")],
+                                                   etiqueta="negativo")
+        otro_positivo, = crear_comentarios([self.parecido("temprano")], etiqueta="positivo")
+
+        grupos = self.grupos()
+        self.assertIsNone(grupos[positivo.texto])
+        self.assertIsNone(grupos[negativo.texto])
+        self.assertEqual(grupos[otro_negativo.texto], negativo.texto)
+        self.assertEqual(grupos[otro_positivo.texto], positivo.texto)
+
+    def test_carga_masiva_en_uno_o_varios_bloques(self):
+        filas = [("", "ayer"), ("", "anoche"), ("positivo", "temprano"), ("", "tarde")]
+        for tamano_bloque in (1000, 2, 1):
+            with self.subTest(tamano_bloque=tamano_bloque):
+                Comment.objects.all().delete()
+                BandaLSH.objects.all().delete()
+                # bulk_create no envia senales: los agrupa registrar_pendientes
+                comentarios = Comment.objects.bulk_create(
+                    Comment(fecha="2026-01-05", texto=self.parecido(final), etiqueta=etiqueta)
+                    for etiqueta, final in filas)
+                resultado = duplicados.registrar_pendientes(tamano_bloque=tamano_bloque)
+
+                self.assertEqual(resultado["revisados"], 4)
+                self.assertEqual(resultado["casi_duplicados"], 3)
+                etiquetado = comentarios[2].texto
+                self.assertEqual(self.grupos(), {c.texto: (None if c.texto == etiquetado else etiquetado)
+                                                 for c in comentarios})
+                self.assertEqual(set(BandaLSH.objects.values_list("comentario__texto", flat=True)), {etiquetado})
+
+
+class ExportarNumpyTests(TestCase):
+
+    def test_publica_version_despues_de_exportar(self):
+        pasos = []
+        with mock.patch.object(modelo_sentimientos, "modelo_disponible", return_value=True), \
+                mock.patch.object(modelo_sentimientos, "leer_modelo", return_value=(object(), object())), \
+                mock.patch.object(modelo_sentimientos, "publicar_archivo",
+                                  side_effect=lambda ruta, escribir: pasos.append(ruta)), \
+                mock.patch.object(modelo_sentimientos, "publicar_version",
+                                  side_effect=lambda motor: pasos.append(motor) or "v2"):
+            call_command("exportar_numpy", stdout=io.StringIO())
+
+        motor = modelo_sentimientos.obtener_motor("mlp")
+        self.assertEqual(pasos, [motor.npz_path, motor.int8_path, motor])
+
+
+class TendenciasTests(TestCase):
+
+    # Fechas en el borde de semanas (domingo / lunes) y de meses
+    FECHAS = ["2026-01-04", "2026-01-05", "2026-01-31", "2026-02-01", "2026-02-02", "2026-03-15"]
+
+    def resumen(self):
+        # Las filas que quedan en 0 despues de restar equivalen a no tener fila
+        return {(periodo, inicio, valor): total for periodo, inicio, valor, total in
+                ResumenSentimiento.objects.exclude(total=0).values_list("periodo", "inicio", "sentimiento", "total")}
+
+    def nuevo(self, i, etiqueta="", predicha=None, fecha=None):
+        return Comment(fecha=fecha or self.FECHAS[i % len(self.FECHAS)], texto=f"comentario {i}",
+                       etiqueta=etiqueta, etiqueta_predicha=predicha)
+
+    def test_incremental_igual_a_reconstruir(self):
+        # Uno por uno con save() (senales) y en bloque (sin senales, los suma registrar_nuevos)
+        for i in range(12):
+            self.nuevo(i, etiqueta=("positivo", "negativo", "")[i % 3], predicha="negativo").save()
+        Comment.objects.bulk_create([self.nuevo(i, predicha=("positivo", None)[i % 2]) for i in range(12, 30)])
+        Comment.objects.bulk_create([Comment(fecha=None, texto="sin fecha", etiqueta="positivo")])
+        self.assertEqual(tendencias.registrar_nuevos(tamano_bloque=7), 19)
+
+        # Cambios de etiqueta y de fecha, borrados y predicciones nuevas en bloque
+        for comentario in Comment.objects.filter(texto__in=["comentario 0", "comentario 2", "comentario 13"]):
+            comentario.etiqueta = "negativo"
+            comentario.fecha = "2026-04-01"
+            comentario.save()
+        Comment.objects.get(texto="comentario 4").delete()
+        Comment.objects.get(texto="comentario 12").delete()
+        sin_etiqueta = Comment.objects.filter(etiqueta="").values_list("pk", flat=True)
+        puntuacion.guardar_predicciones([("positivo", 0.9, "lineal:v2", pk) for pk in sin_etiqueta])
+        Comment.objects.bulk_create([self.nuevo(i, predicha="negativo") for i in range(30, 34)])
+        tendencias.registrar_nuevos()
+
+        incremental = self.resumen()
+        tendencias.reconstruir()
+        self.assertEqual(incremental, self.resumen())
+
+        # Cada comentario con fecha y sentimiento cuenta una vez por periodo
+        contados = Comment.objects.exclude(fecha=None).count()
+        for periodo in tendencias.PERIODOS:
+            self.assertEqual(sum(total for (p, _, _), total in incremental.items() if p == periodo), contados)
+
+    def test_comentario_confirmado_despues_con_id_menor(self):
+        # Una carga con ids mas bajos se confirma despues de que se sumaron ids mas altos
+        Comment.objects.bulk_create([Comment(pk=pk, fecha="2026-01-05", texto=f"comentario {pk}", etiqueta="positivo")
+                                     for pk in (100, 101)])
+        tendencias.registrar_nuevos()
+        tardio, = Comment.objects.bulk_create([Comment(pk=50, fecha="2026-01-05", texto="tardio",
+                                                       etiqueta="negativo")])
+        # Leido antes de sumarse: guardarlo despues no lo vuelve a sumar
+        leido = Comment.objects.get(pk=50)
+        self.assertEqual(tendencias.registrar_nuevos(), 1)
+        leido.texto = "tardio editado"
+        leido.save()
+
+        incremental = self.resumen()
+        self.assertEqual(incremental[("dia", datetime.date(2026, 1, 5), "negativo")], 1)
+        tendencias.reconstruir()
+        self.assertEqual(incremental, self.resumen())
+
+        # Borrarlo resta lo que se habia sumado (sin totales negativos)
+        tardio.delete()
+        self.assertFalse(ResumenSentimiento.objects.filter(total__lt=0).exists())
+        self.assertNotIn(("dia", datetime.date(2026, 1, 5), "negativo"), self.resumen())
+
+    def test_serie_semanal(self):
+        Comment.objects.bulk_create([
+            self.nuevo(0, etiqueta="positivo", fecha="2026-01-05"),
+            self.nuevo(1, etiqueta="negativo", fecha="2026-01-11"),
+            self.nuevo(2, predicha="negativo", fecha="2026-01-12"),
+        ])
+        tendencias.registrar_nuevos()
+        self.assertEqual(tendencias.serie("semana"), [
+            {"inicio": "2026-01-05", "positivo": 1, "negativo": 1},
+            {"inicio": "2026-01-12", "positivo": 0, "negativo": 1},
+        ])
+        self.assertEqual(tendencias.serie("mes", desde=datetime.date(2026, 1, 20)),
+                         [{"inicio": "2026-01-01", "positivo": 1, "negativo": 2}])
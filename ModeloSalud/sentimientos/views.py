@@ -1,27 +1,32 @@
+import datetime
+import json
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.conf import settings
 from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from ModeloSalud import ejecucion
 from .models import Comment
-from . import modelo_sentimientos
-import pandas as pd
+from . import cola_puntuacion, exportacion, frases, ingesta, modelo_sentimientos, reentrenamiento, tendencias
+from .busqueda import pagina_comentarios
+from .contadores import obtener_contadores
 
 
 # Vista de la pagina principal
 def home(request):
-    # Contar comentarios
-    total = Comment.objects.count()
-    positivos = Comment.objects.filter(etiqueta="positivo").count()
-    negativos = Comment.objects.filter(etiqueta="negativo").count()
+    # Contar comentarios (una sola consulta, guardada en cache; ver contadores.py)
+    contadores = obtener_contadores()
     
-    # Ver si el modelo esta entrenado
-    modelo, _ = modelo_sentimientos.cargar_modelo()
-    modelo_entrenado = modelo is not None
+    # Ver si el modelo esta entrenado (solo revisa que existan los archivos)
+    modelo_entrenado = modelo_sentimientos.modelo_disponible()
     
     # Enviar datos a la plantilla
     context = {
-        'total': total,
-        'positivos': positivos,
-        'negativos': negativos,
+        'total': contadores['total'],
+        'positivos': contadores['positivos'],
+        'negativos': contadores['negativos'],
         'modelo_entrenado': modelo_entrenado,
     }
     return render(request, 'sentimientos/home.html', context)
@@ -38,16 +43,25 @@ def entrenar(request):
             messages.error(request, 'Necesitas al menos 10 comentarios para entrenar el modelo.')
             return redirect('sentimientos_home')
         
-        # Convertir comentarios a formato DataFrame (tabla)
-        datos = list(comentarios.values('texto', 'etiqueta'))
-        df = pd.DataFrame(datos)
+        # Entrenar el modelo: incremental (solo comentarios nuevos + repaso) si conviene,
+        # o completo si se marca "desde cero" (ver reentrenamiento.py)
+        modo = 'completo' if request.POST.get('completo') else 'auto'
+        resultado = reentrenamiento.reentrenar(modo)
         
-        # Entrenar el modelo
-        resultado = modelo_sentimientos.entrenar_modelo(df)
+        if not resultado['ok']:
+            messages.error(request, resultado['error'])
+            return render(request, 'sentimientos/entrenar.html')
+        if resultado.get('sin_cambios'):
+            messages.info(request, 'No hay comentarios nuevos desde el último entrenamiento: el modelo ya está al día.')
+            return render(request, 'sentimientos/entrenar.html')
         
         # Mostrar mensaje de exito con la precision
         precision = resultado["accuracy_test"]
-        messages.success(request, f'Modelo entrenado exitosamente. Precisión: {precision:.2%}')
+        if resultado['incremental']:
+            tipo = f"incremental, {resultado['nuevos']} comentarios nuevos"
+        else:
+            tipo = "completo"
+        messages.success(request, f'Modelo entrenado exitosamente ({tipo}). Precisión: {precision:.2%}')
         
         # Pasar los gráficos a la plantilla
         context = {
@@ -84,44 +98,224 @@ def predecir(request):
     return render(request, 'sentimientos/predecir.html', context)
 
 
+# Funcion que lee y valida el cuerpo de las APIs de lote: {"textos": ["comentario 1", ...]}
+# Devuelve (textos, None) o (None, respuesta de error)
+def leer_lote(request):
+    try:
+        datos = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return None, JsonResponse({'ok': False, 'error': 'El cuerpo debe ser JSON valido'}, status=400)
+    
+    textos = datos.get('textos') if isinstance(datos, dict) else datos
+    if not isinstance(textos, list) or not all(isinstance(t, str) for t in textos):
+        return None, JsonResponse({'ok': False, 'error': 'Se espera una lista "textos" con comentarios'}, status=400)
+    
+    maximo = getattr(settings, 'SENTIMIENTOS_LOTE_API_MAXIMO', 10000)
+    if len(textos) > maximo:
+        return None, JsonResponse({'ok': False, 'error': f'Maximo {maximo} comentarios por llamada'}, status=413)
+    
+    if not modelo_sentimientos.modelo_disponible():
+        return None, JsonResponse({'ok': False, 'error': 'Modelo no entrenado aún.'}, status=503)
+    return textos, None
 
 
-# Vista para buscar comentarios por texto o filtrar por sentimiento
-def buscar(request):
-    # Obtener todos los comentarios ordenados del mas nuevo al mas viejo
-    comentarios = Comment.objects.all().order_by('-id')
+# API para clasificar muchos comentarios en una sola llamada
+# Recibe JSON: {"textos": ["comentario 1", "comentario 2", ...]}
+@csrf_exempt
+@require_POST
+def predecir_lote(request):
+    textos, error = leer_lote(request)
+    if error is not None:
+        return error
     
-    # Obtener parametros de busqueda del formulario
-    query = request.GET.get('q', '')
-    filtro = request.GET.get('filtro', '')
+    resultados = modelo_sentimientos.predecir_lote(textos)
+    return JsonResponse({'ok': True, 'total': len(resultados), 'resultados': resultados})
+
+
+# Versiones async (ASGI) de las APIs de prediccion: la prediccion corre en el pool de
+# ModeloSalud/ejecucion.py y el event loop sigue atendiendo otras peticiones.
+# Responden 503 si hay demasiado trabajo en curso y 504 si no termina a tiempo.
+
+# Recibe JSON: {"texto": "comentario"}
+@csrf_exempt
+@require_POST
+@ejecucion.vista_async
+async def predecir_async(request):
+    try:
+        datos = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'ok': False, 'error': 'El cuerpo debe ser JSON valido'}, status=400)
     
-    # Si hay texto de busqueda, filtrar comentarios
-    if query:
-        comentarios = comentarios.filter(texto__icontains=query)
+    texto = datos.get('texto') if isinstance(datos, dict) else None
+    if not isinstance(texto, str) or not texto.strip():
+        return JsonResponse({'ok': False, 'error': 'Se espera un "texto" no vacio'}, status=400)
     
-    # Si eligieron un filtro (positivo o negativo), aplicarlo
-    if filtro in ['positivo', 'negativo']:
-        comentarios = comentarios.filter(etiqueta=filtro)
+    resultado = await modelo_sentimientos.predecir_async(texto)
+    return JsonResponse(resultado, status=200 if resultado.get('ok') else 503)
+
+
+# Recibe JSON: {"textos": [...]} como predecir_lote. En un proceso aparte si EJECUCION_PROCESOS > 0
+@csrf_exempt
+@require_POST
+@ejecucion.vista_async
+async def predecir_lote_async(request):
+    textos, error = leer_lote(request)
+    if error is not None:
+        return error
     
+    resultados = await ejecucion.ejecutar(modelo_sentimientos.predecir_lote, textos, en_proceso=True)
+    return JsonResponse({'ok': True, 'total': len(resultados), 'resultados': resultados})
+
+
+# API de ingesta continua (kioscos): recibe comentarios en JSON Lines, uno por linea:
+# {"texto": "...", "etiqueta": "positivo" (opcional), "fecha": "AAAA-MM-DD" (opcional)}
+# El cuerpo se lee linea por linea (no se carga entero en memoria), se inserta en lotes
+# y los comentarios nuevos se puntuan en segundo plano (ver cola_puntuacion.py).
+# Si la cola de puntuacion esta llena responde 503 con las lineas ya cargadas:
+# el cliente debe reenviar desde la linea siguiente despues de Retry-After segundos.
+@csrf_exempt
+@require_POST
+def ingesta_comentarios(request):
+    cola = cola_puntuacion.obtener_cola() if modelo_sentimientos.modelo_disponible() else None
+    espera = getattr(settings, 'SENTIMIENTOS_INGESTA_ESPERA_S', 2)
+
+    def al_insertar(filas):
+        return cola.encolar(filas, timeout=espera)
+
+    resultado = ingesta.cargar_comentarios_jsonl(
+        request,
+        tamano_lote=getattr(settings, 'SENTIMIENTOS_INGESTA_LOTE', ingesta.TAMANO_LOTE_JSONL),
+        al_insertar=al_insertar if cola is not None else None,
+    )
+    resultado['puntuacion'] = cola.estado() if cola is not None else None
+    if not resultado['completa']:
+        resultado['ok'] = False
+        resultado['error'] = (f"La cola de puntuacion esta llena: se cargaron las primeras {resultado['lineas']} "
+                              f"lineas, reenviar las siguientes mas tarde")
+        respuesta = JsonResponse(resultado, status=503)
+        respuesta['Retry-After'] = str(max(1, int(espera)))
+        return respuesta
+    return JsonResponse(resultado)
+
+
+# Funcion para leer el filtro de sentimiento de la URL ("" si no es valido)
+def leer_filtro(request):
+    filtro = request.GET.get('filtro', '')
+    return filtro if filtro in ['positivo', 'negativo'] else ''
+
+
+# Vista para buscar comentarios por texto o filtrar por sentimiento
+def buscar(request):
+    # Obtener parametros de busqueda del formulario
+    query = request.GET.get('q', '').strip()
+    filtro = leer_filtro(request)
+
+    # Paginacion por cursor: "despues" es el ultimo comentario de la pagina anterior
+    comentarios, siguiente = pagina_comentarios(
+        query, filtro, request.GET.get('despues'),
+        getattr(settings, 'SENTIMIENTOS_BUSQUEDA_POR_PAGINA', 50),
+    )
+
     # Enviar resultados a la pagina
     context = {
         'comentarios': comentarios,
         'query': query,
         'filtro': filtro,
+        'primera_pagina': not request.GET.get('despues'),
+        'siguiente': siguiente,
     }
     return render(request, 'sentimientos/buscar.html', context)
 
 
-
-
-
 # Vista para mostrar la lista de todos los comentarios
 def listar_comentarios(request):
-    # Traer los ultimos 100 comentarios de la base de datos
-    # Se ordenan del mas reciente al mas antiguo con -id
-    comentarios = Comment.objects.all().order_by('-id')[:100]
+    # Traer 100 comentarios, del mas reciente al mas antiguo
+    # Las paginas siguientes se piden con ?despues=<ultimo id>
+    comentarios, siguiente = pagina_comentarios(despues=request.GET.get('despues'), cantidad=100)
     
     # Mostrar en la pagina
-    context = {'comentarios': comentarios}
+    context = {
+        'comentarios': comentarios,
+        'primera_pagina': not request.GET.get('despues'),
+        'siguiente': siguiente,
+    }
     return render(request, 'sentimientos/listar.html', context)
 
+
+# API para listar o buscar comentarios de a paginas
+# Parametros GET: q, filtro, despues (cursor que devolvio la pagina anterior), cantidad
+def api_comentarios(request):
+    try:
+        cantidad = min(500, max(1, int(request.GET.get('cantidad', 100))))
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'cantidad debe ser un numero'}, status=400)
+
+    comentarios, siguiente = pagina_comentarios(
+        request.GET.get('q', '').strip(), leer_filtro(request), request.GET.get('despues'), cantidad,
+    )
+    resultados = [
+        {
+            'id': comentario.id,
+            'fecha': comentario.fecha.isoformat() if comentario.fecha else None,
+            'texto': comentario.texto,
+            'etiqueta': comentario.etiqueta,
+            'etiqueta_predicha': comentario.etiqueta_predicha,
+            'confianza_predicha': comentario.confianza_predicha,
+        }
+        for comentario in comentarios
+    ]
+    return JsonResponse({'ok': True, 'resultados': resultados, 'siguiente': siguiente})
+
+
+# Descarga de todos los comentarios en CSV o JSON Lines (?formato=csv|jsonl&filtro=...)
+# Se envia en streaming, de a bloques, sin cargar la tabla en memoria
+def exportar_comentarios(request):
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportacion.FORMATOS:
+        return JsonResponse({'ok': False, 'error': 'formato debe ser csv o jsonl'}, status=400)
+
+    respuesta = StreamingHttpResponse(
+        exportacion.exportar(formato, leer_filtro(request)),
+        content_type=exportacion.FORMATOS[formato],
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="comentarios.{formato}"'
+    return respuesta
+
+
+# API de tendencias: positivos y negativos por dia, semana o mes
+# ?periodo=dia|semana|mes&desde=AAAA-MM-DD&hasta=AAAA-MM-DD (las fechas son opcionales)
+# Se lee la tabla de resumen (ver tendencias.py), no los comentarios
+def api_tendencias(request):
+    periodo = request.GET.get('periodo', 'semana')
+    if periodo not in tendencias.PERIODOS:
+        return JsonResponse({'ok': False, 'error': 'periodo debe ser dia, semana o mes'}, status=400)
+    try:
+        desde, hasta = (
+            datetime.date.fromisoformat(request.GET[nombre]) if request.GET.get(nombre) else None
+            for nombre in ('desde', 'hasta')
+        )
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'desde y hasta deben ser fechas AAAA-MM-DD'}, status=400)
+
+    serie = tendencias.serie(periodo, desde, hasta)
+    return JsonResponse({'ok': True, 'periodo': periodo, 'serie': serie})
+
+
+# API de frases: las que mas se asocian a un sentimiento
+# ?sentimiento=negativo|positivo&cantidad=20&minimo=5 (minimo: comentarios en los que aparece)
+# Se lee la tabla que calcula el comando analizar_frases (ver frases.py)
+def api_frases(request):
+    buscado = request.GET.get('sentimiento', 'negativo')
+    if buscado not in ('positivo', 'negativo'):
+        return JsonResponse({'ok': False, 'error': 'sentimiento debe ser positivo o negativo'}, status=400)
+    try:
+        # Un slice con cantidad negativa no es valido en un QuerySet: se lleva a 1..500
+        cantidad = max(1, min(int(request.GET.get('cantidad', 20)), 500))
+        minimo = int(request.GET.get('minimo', frases.MINIMO_COMENTARIOS))
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'cantidad y minimo deben ser numeros'}, status=400)
+    if minimo < 0:
+        return JsonResponse({'ok': False, 'error': 'minimo no puede ser negativo'}, status=400)
+
+    return JsonResponse({'ok': True, 'sentimiento': buscado,
+                         'frases': frases.principales(buscado, cantidad, minimo)})